@@ -1,225 +1,351 @@
 import sqlite3
 import os
+import queue
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "inventory.db")
+from backend.core import metrics
+from backend.core.migrations import run_migrations, check_schema
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+DB_PATH = os.environ.get(
+    "INVENTORY_DB_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "inventory.db")
+)
+
+# --------------------------
+# POOL / CONNECTION TUNING (override via env vars)
+# --------------------------
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "16"))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE", "256"))
+CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", "20000"))            # page cache per connection
+MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))       # wait on another process' write lock
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that reports statement time, rows and slow queries to
+    backend.core.metrics. Rows read by iterating the cursor directly
+    are not counted (no per-row hook).
+    """
+
+    _sql = ""
+    _op = "OTHER"
+    _exec_seconds = 0.0
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._sql, self._op = sql, metrics.sql_op(sql)
+        self._exec_seconds = time.perf_counter() - started
+        metrics.observe_statement(sql, self._op, self._exec_seconds, self.rowcount)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._sql, self._op = sql, metrics.sql_op(sql)
+        self._exec_seconds = time.perf_counter() - started
+        metrics.observe_statement(sql, self._op, self._exec_seconds, self.rowcount)
+        return self
+
+    def _timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        result = fetch(*args)
+        rows = len(result) if isinstance(result, list) else int(result is not None)
+        metrics.observe_fetch(self._sql, self._op, self._exec_seconds,
+                              time.perf_counter() - started, rows)
+        return result
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that goes back to its pool on close().
+    Existing code that does `conn = get_connection() ... conn.close()`
+    keeps working unchanged and transparently reuses connections.
+
+    Cursors (including conn.execute) are InstrumentedCursor, and
+    commit/rollback are timed as COMMIT/ROLLBACK statements.
+    """
+
+    _pool = None
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        started = time.perf_counter()
+        super().commit()
+        metrics.observe_statement("COMMIT", "COMMIT", time.perf_counter() - started)
+
+    def rollback(self):
+        started = time.perf_counter()
+        super().rollback()
+        metrics.observe_statement("ROLLBACK", "ROLLBACK", time.perf_counter() - started)
+
+    def close(self):
+        if self._pool is None:
+            super().close()
+        else:
+            self._pool.release(self)
+
+    def _really_close(self):
+        super().close()
+
+
+def _casefold(value):
+    # SQLite's LIKE and lower() only fold ASCII: "são" would not match "SÃO"
+    return value.casefold() if isinstance(value, str) else value
+
+
+def open_connection(db_path: str = DB_PATH) -> PooledConnection:
+    """
+    New connection with the app's PRAGMAs. Not pooled: close() really
+    closes it (the pool and the writer thread both build on this).
+    """
+    conn = sqlite3.connect(
+        db_path,
+        factory=PooledConnection,
+        check_same_thread=False,          # pooled connections hop between worker threads
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
     conn.row_factory = sqlite3.Row
+    conn.create_function("casefold", 1, _casefold, deterministic=True)
+
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
     return conn
 
-def initialize_database():
-    conn = get_connection()
-    cur = conn.cursor()
 
-    # --------------------------
-    # USERS
-    # --------------------------
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
+class ConnectionPool:
+    """
+    Bounded LIFO pool of pre-configured SQLite connections.
 
-    # --------------------------
-    # PRODUCTS
-    # --------------------------
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS products (
-            code TEXT PRIMARY KEY,
-            category TEXT NOT NULL,
-            subcategory TEXT,
-            description TEXT NOT NULL,
-            unit TEXT NOT NULL,
-            stock INTEGER NOT NULL DEFAULT 0
-        )
-    """)
+    - at most `max_size` connections are open at the same time
+    - callers wait up to `timeout` seconds when every connection is busy
+    - connections that are never closed are reclaimed when garbage collected
+    """
 
-    # --------------------------
-    # SUPPLIERS
-    # --------------------------
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS suppliers (
-            cnpj TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            address TEXT,
-            neighborhood TEXT,
-            city TEXT,
-            state TEXT,
-            cep TEXT,
-            seller TEXT,
-            cellphone TEXT,
-            pix TEXT
-        )
-    """)
+    def __init__(self, db_path: str, max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
 
-    # --------------------------
-    # PURCHASE ORDERS
-    # --------------------------
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS purchase_orders (
-    po_number INTEGER PRIMARY KEY AUTOINCREMENT,
-    po_code TEXT UNIQUE,
-
-    -- Supplier
-    supplier_cnpj TEXT NOT NULL,
-    supplier_name TEXT,
-    supplier_address TEXT,
-    supplier_neighborhood TEXT,
-    supplier_city TEXT,
-    supplier_state TEXT,
-    supplier_cep TEXT,
-    supplier_pix TEXT,
-    supplier_contact TEXT,
-
-    -- Buyer
-    buyer_cnpj TEXT,
-    buyer_name TEXT,
-    buyer_address TEXT,
-    buyer_neighborhood TEXT,
-    buyer_city TEXT,
-    buyer_state TEXT,
-    buyer_cep TEXT,
-    buyer_pix TEXT,
-    buyer_contact TEXT,
-
-    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-    received_at TEXT,                     -- ✅ ADD THIS LINE
-    status TEXT DEFAULT 'OPEN',
-    notes TEXT
-)
-    """)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
 
     # --------------------------
-    # PO ITEMS
+    # CONNECTION SETUP
     # --------------------------
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS po_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            po_number INTEGER NOT NULL,
-            item_code TEXT,
-            description TEXT,
-            unit TEXT,
-            qty INTEGER,
-            unit_price REAL,
-            line_total REAL,
-            FOREIGN KEY (po_number) REFERENCES purchase_orders(po_number)
-        )
-    """)
+    def _connect(self):
+        conn = open_connection(self.db_path)
+        conn._pool = self
+        weakref.finalize(conn, self._forget)
+        return conn
+
+    def _forget(self):
+        # A pooled connection was garbage collected without close()
+        with self._lock:
+            self._open -= 1
 
     # --------------------------
-    # PO RECEIVED (HEADER)
+    # ACQUIRE / RELEASE
     # --------------------------
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS po_received (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            po_number INTEGER NOT NULL,
-            received_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    def acquire(self) -> PooledConnection:
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self._hits += 1
+            return conn
+        except queue.Empty:
+            pass
 
-            -- Supplier
-            supplier_cnpj TEXT,
-            supplier_name TEXT,
+        with self._lock:
+            can_open = self._open < self.max_size
+            if can_open:
+                self._open += 1
+                self._misses += 1
 
-            -- Buyer (MISSING BEFORE — NOW FIXED)
-            buyer_cnpj TEXT,
-            buyer_name TEXT,
+        if can_open:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                raise
 
-            total_value REAL,
-            notes TEXT
-        )
-    """)
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise sqlite3.OperationalError(
+                f"Timed out after {self.timeout}s waiting for a database connection"
+            )
+        finally:
+            with self._lock:
+                self._waits += 1
+                self._wait_time += time.perf_counter() - started
 
-    # --------------------------
-    # PO RECEIVED ITEMS (DETAILS)
-    # --------------------------
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS po_received_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            po_received_id INTEGER NOT NULL,
-            product_code TEXT NOT NULL,
-            description TEXT,
-            unit TEXT,
-            qty REAL,
-            unit_price REAL,
-            line_total REAL,
-            FOREIGN KEY (po_received_id) REFERENCES po_received(id)
-        )
-    """)
+        return conn
 
-    # --------------------------
-    # ENTRIES HISTORY (LOG OF INVENTORY RECEIPTS)
-    # --------------------------
-    cur.execute("""
-            CREATE TABLE IF NOT EXISTS entries_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                po_number INTEGER,
-                supplier_cnpj TEXT,
-                product_code TEXT,
-                description TEXT,
-                unit TEXT,
-                qty REAL,
-                unit_cost REAL,
-                line_total REAL,
-                received_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+    def release(self, conn: PooledConnection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            # Broken connection: drop it instead of handing it out again
+            conn._pool = None
+            conn._really_close()
+            return
 
-    # --------------------------
-    # EXITS (HEADER)
-    # --------------------------
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS exits (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            exit_code TEXT UNIQUE,
-            destination TEXT NOT NULL,
-            created_by INTEGER,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            notes TEXT
-        )
-    """)
+        self._idle.put(conn)
 
-    # --------------------------
-    # EXIT ITEMS (DETAILS)
-    # --------------------------
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS exit_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            exit_id INTEGER NOT NULL,
-            product_code TEXT NOT NULL,
-            description TEXT,
-            unit TEXT,
-            qty REAL NOT NULL,
-            unit_cost REAL,
-            line_total REAL,
-            FOREIGN KEY (exit_id) REFERENCES exits(id),
-            FOREIGN KEY (product_code) REFERENCES products(code)
-        )
-    """)
+    def close_all(self):
+        """Closes every idle connection (used on shutdown and in tests)."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn._pool = None
+            conn._really_close()
 
     # --------------------------
-    # EXITS HISTORY (AUDIT LOG)
+    # METRICS
     # --------------------------
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS exits_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            exit_id INTEGER,
-            product_code TEXT,
-            qty REAL,
-            changed_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            changed_by INTEGER,
-            action TEXT
-        )
-    """)
-
-    conn.commit()
-    conn.close()
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "open": self._open,
+                "idle": self._idle.qsize(),
+                "in_use": self._open - self._idle.qsize(),
+                "hits": self._hits,
+                "misses": self._misses,
+                "waits": self._waits,
+                "wait_time_seconds": round(self._wait_time, 6),
+                "timeouts": self._timeouts
+            }
+
+
+pool = ConnectionPool(DB_PATH)
+metrics.register_collector(metrics.stats_collector("db_pool", pool.stats))
+
+
+def get_connection():
+    """
+    Returns a pooled connection. Call close() to hand it back to the pool.
+    """
+    return pool.acquire()
+
+
+@contextmanager
+def db_connection(conn: sqlite3.Connection = None):
+    """
+    Context manager around a pooled connection.
+
+        with db_connection() as conn:
+            conn.execute(...)
+
+    If `conn` is given (caller already inside a transaction) it is yielded
+    as-is and left open, mirroring subtract_quantity(conn=...).
+    """
+    if conn is not None:
+        yield conn
+        return
+
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+# --------------------------
+# READER THREADS (async read path)
+# --------------------------
+_reader = threading.local()
+
+
+def open_reader_connection():
+    """
+    Thread initializer for the reader pool (executors.py): each reader
+    thread keeps one read-only WAL connection for its whole life.
+    """
+    conn = open_connection(DB_PATH)
+    conn.execute("PRAGMA query_only = ON")
+    _reader.conn = conn
+
+
+def reader_connection() -> PooledConnection:
+    """The calling reader thread's connection."""
+    return _reader.conn
+
+
+def get_db():
+    """
+    FastAPI dependency:  def route(conn = Depends(get_db))
+    """
+    with db_connection() as conn:
+        yield conn
+
+
+def pool_stats() -> dict:
+    return pool.stats()
+
+
+def initialize_database():
+    """
+    Creates / upgrades the schema through the migration runner.
+    Only pending migrations are applied; an up-to-date database costs
+    a single version lookup.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(DB_PATH)), exist_ok=True)
+
+    with db_connection() as conn:
+        check_schema(conn)
+        applied = run_migrations(conn)
+
+    if applied:
+        print(f"Applied database migrations: {applied}")
+
+    return applied
+
 
 if __name__ == "__main__":
     # Running this file will initialize/migrate the DB schema.
     # Useful for local development or CI steps.
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     initialize_database()
     print(f"Database initialized at: {DB_PATH}")
@@ -0,0 +1,156 @@
+"""
+Rendered-document cache (PO and exit PDFs).
+
+Entries are keyed by (kind, document id) and stamped with a digest of
+everything the renderer reads (header, items, renderer version), so a
+stale entry can never be served: a changed document simply misses.
+
+Two tiers:
+- memory: LRU bounded by total bytes (DOC_CACHE_MEMORY_MB)
+- disk:   one file per document under DOC_CACHE_DIR, written only for
+          documents that can no longer change (exits, received or
+          cancelled POs) so they survive restarts
+"""
+import glob
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from backend.core import metrics
+from backend.core.database import DB_PATH
+
+
+DOC_CACHE_DIR = os.environ.get(
+    "DOC_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "doc_cache")
+)
+DOC_CACHE_MEMORY_BYTES = int(float(os.environ.get("DOC_CACHE_MEMORY_MB", "64")) * 1024 * 1024)
+
+
+def document_digest(*parts) -> str:
+    """Stable content hash of the data a document is rendered from."""
+    raw = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+class DocumentCache:
+
+    def __init__(self, directory: str = DOC_CACHE_DIR, max_memory_bytes: int = DOC_CACHE_MEMORY_BYTES):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+
+        self._memory = OrderedDict()     # (kind, id) -> (digest, bytes)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    # --------------------------
+    # DISK LAYOUT
+    # --------------------------
+    def _path(self, kind: str, doc_id, digest: str) -> str:
+        return os.path.join(self.directory, kind, f"{doc_id}-{digest}.pdf")
+
+    def _disk_files(self, kind: str, doc_id) -> list:
+        return glob.glob(os.path.join(self.directory, kind, f"{doc_id}-*.pdf"))
+
+    # --------------------------
+    # MEMORY TIER
+    # --------------------------
+    def _remember(self, key, digest: str, data: bytes):
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old[1])
+
+            if len(data) > self.max_memory_bytes:
+                return
+
+            self._memory[key] = (digest, data)
+            self._memory_bytes += len(data)
+
+            while self._memory_bytes > self.max_memory_bytes:
+                _, (_, evicted) = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    # --------------------------
+    # PUBLIC API
+    # --------------------------
+    def get(self, kind: str, doc_id, digest: str):
+        key = (kind, str(doc_id))
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] == digest:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return entry[1]
+
+        try:
+            with open(self._path(kind, doc_id, digest), "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        with self._lock:
+            self._disk_hits += 1
+        self._remember(key, digest, data)
+        return data
+
+    def put(self, kind: str, doc_id, digest: str, data: bytes, persist: bool = False):
+        self._remember((kind, str(doc_id)), digest, data)
+
+        if not persist:
+            return
+
+        path = self._path(kind, doc_id, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        for stale in self._disk_files(kind, doc_id):
+            if stale != path:
+                self._remove(stale)
+
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def invalidate(self, kind: str, doc_id):
+        with self._lock:
+            old = self._memory.pop((kind, str(doc_id)), None)
+            if old is not None:
+                self._memory_bytes -= len(old[1])
+            self._invalidations += 1
+
+        for path in self._disk_files(kind, doc_id):
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations
+            }
+
+
+doc_cache = DocumentCache()
+metrics.register_collector(metrics.stats_collector("doc_cache", doc_cache.stats))
@@ -0,0 +1,282 @@
+"""
+Dedicated worker pools for CPU-heavy work.
+
+bcrypt verification and PDF/Excel rendering used to run in sync routes
+on Starlette's shared thread pool, so a burst of logins or report
+downloads starved the cheap JSON endpoints. They now run in separate,
+size-configurable process pools awaited from async routes:
+
+    pdf = await render_pool.run(render_po_pdf, header, items)
+
+The reader pool is the thread-based one behind the async read path
+(backend/services/read_service.py). The export pool produces the chunks
+of streaming downloads one next() at a time:
+
+    return StreamingResponse(export_pool.stream(chunks))
+
+Each pool admits at most `workers + max_queue` tasks; beyond that the
+request fails fast with 503 + Retry-After instead of queueing forever.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException
+
+from backend.core import metrics
+from backend.core.database import open_reader_connection
+from backend.core.pdf_templates import preload_templates
+
+
+_END = object()
+
+
+def _timed_call(fn, args):
+    # Runs inside the worker so busy time excludes queueing
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def _close_quietly(chunks):
+    try:
+        chunks.close()
+    except (AttributeError, ValueError):
+        pass
+
+
+class WorkerPool:
+
+    def __init__(self, name: str, workers: int, max_queue: int,
+                 kind: str = "process", initializer=None):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self.initializer = initializer
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._busy_seconds = 0.0
+        self._wait_seconds = 0.0
+
+    # --------------------------
+    # EXECUTOR LIFECYCLE
+    # --------------------------
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    # spawn: children never inherit open SQLite handles or locks
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=self.initializer
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix=self.name,
+                        initializer=self.initializer
+                    )
+            return self._executor
+
+    def start(self):
+        self._get_executor()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # --------------------------
+    # ADMISSION + EXECUTION
+    # --------------------------
+    def _admit(self):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Server busy ({self.name}), please retry",
+                    headers={"Retry-After": "1"}
+                )
+            self._in_flight += 1
+            self._submitted += 1
+
+    def _done(self, total: float, busy: float, ok: bool):
+        with self._lock:
+            self._in_flight -= 1
+            self._busy_seconds += busy
+            self._wait_seconds += max(0.0, total - busy)
+            if ok:
+                self._completed += 1
+            else:
+                self._failed += 1
+
+    async def run(self, fn, *args, task: str = None):
+        """Runs fn(*args) on the pool and awaits the result (`task`: metrics label, default fn's name)."""
+        self._admit()
+        started = time.perf_counter()
+        busy, ok = 0.0, False
+        try:
+            future = self._get_executor().submit(_timed_call, fn, args)
+            busy, result = await asyncio.wrap_future(future)
+            ok = True
+            metrics.task_latency.observe(self.name, task or getattr(fn, "__name__", "task"), value=busy)
+            return result
+        except BrokenProcessPool:
+            # A worker died (OOM, kill): start a fresh pool next time
+            self.shutdown()
+            raise HTTPException(status_code=503, detail=f"Worker pool {self.name} restarted, please retry")
+        finally:
+            self._done(time.perf_counter() - started, busy, ok)
+
+    def stream(self, chunks, task: str = "stream"):
+        """
+        Async iterable over a blocking iterator, each next() running on
+        the pool (threads only). Admission happens here, before the
+        response starts, and the stream keeps its slot until it ends or
+        the client goes away.
+        """
+        self._admit()
+        return _PooledStream(self, iter(chunks), task)
+
+    # --------------------------
+    # METRICS
+    # --------------------------
+    def stats(self) -> dict:
+        with self._lock:
+            uptime = max(time.monotonic() - self._started_at, 1e-9)
+            return {
+                "name": self.name,
+                "kind": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.workers),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "busy_seconds": round(self._busy_seconds, 4),
+                "queue_wait_seconds": round(self._wait_seconds, 4),
+                "utilization": round(self._busy_seconds / (self.workers * uptime), 4)
+            }
+
+
+class _PooledStream:
+    """WorkerPool.stream() result; gives the admission slot back exactly once."""
+
+    def __init__(self, pool: WorkerPool, chunks, task: str):
+        self.pool = pool
+        self.chunks = chunks
+        self.task = task
+        self._released = False
+
+    def _release(self, busy: float, wait: float, ok: bool):
+        if not self._released:
+            self._released = True
+            self.pool._done(busy + wait, busy, ok)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        busy, wait, ok = 0.0, 0.0, False
+        future = None
+        try:
+            executor = self.pool._get_executor()
+            while True:
+                started = time.perf_counter()
+                future = executor.submit(_timed_call, next, (self.chunks, _END))
+                step, chunk = await asyncio.wrap_future(future)
+                busy += step
+                wait += max(0.0, time.perf_counter() - started - step)
+                if chunk is _END:
+                    break
+                yield chunk
+            ok = True
+            metrics.task_latency.observe(self.pool.name, self.task, value=busy)
+        finally:
+            # Client gone mid-chunk: close the generator once that next() returns
+            if future is not None and not future.done():
+                chunks = self.chunks
+                future.add_done_callback(lambda _: _close_quietly(chunks))
+            else:
+                _close_quietly(self.chunks)
+            self._release(busy, wait, ok)
+
+    def __del__(self):
+        # Response dropped before its body was iterated
+        if not self._released:
+            _close_quietly(self.chunks)
+            self._release(0.0, 0.0, False)
+
+
+# ======================================================
+# POOLS (size via env vars)
+# ======================================================
+
+auth_pool = WorkerPool(
+    "auth",
+    workers=int(os.environ.get("AUTH_WORKERS", "2")),
+    max_queue=int(os.environ.get("AUTH_QUEUE_LIMIT", "32"))
+)
+
+render_pool = WorkerPool(
+    "render",
+    workers=int(os.environ.get("RENDER_WORKERS", "2")),
+    max_queue=int(os.environ.get("RENDER_QUEUE_LIMIT", "16")),
+    initializer=preload_templates
+)
+
+# Threads, not processes: SQLite releases the GIL while it works, and
+# each thread keeps its own read-only connection (database.py)
+reader_pool = WorkerPool(
+    "reader",
+    workers=int(os.environ.get("READER_THREADS", "4")),
+    max_queue=int(os.environ.get("READER_QUEUE_LIMIT", "256")),
+    kind="thread",
+    initializer=open_reader_connection
+)
+
+# Streaming exports: one slot per download for its whole duration, a
+# thread only while a chunk is being encoded
+export_pool = WorkerPool(
+    "export",
+    workers=int(os.environ.get("EXPORT_THREADS", "2")),
+    max_queue=int(os.environ.get("EXPORT_QUEUE_LIMIT", "8")),
+    kind="thread"
+)
+
+POOLS = (auth_pool, render_pool, reader_pool, export_pool)
+
+
+def start_pools():
+    for p in POOLS:
+        p.start()
+
+
+def shutdown_pools():
+    for p in POOLS:
+        p.shutdown()
+
+
+def executor_stats() -> list:
+    return [p.stats() for p in POOLS]
+
+
+metrics.register_collector(metrics.stats_collector("worker_pool", executor_stats, label="name"))
@@ -0,0 +1,134 @@
+"""
+Streaming tabular imports (CSV, XLSX), the reading side of exports.py.
+
+read_table() returns the header and an iterator of (row_number, values)
+that pulls rows from the file as it is consumed, so an import runs in
+memory proportional to one batch whatever the file size:
+
+    header, rows = read_table("csv", upload.file)
+    for row_number, values in rows:
+        ...
+
+Row numbers are the ones a spreadsheet shows (header = 1). XLSX needs
+the optional openpyxl package (read-only mode, no full workbook load).
+"""
+import codecs
+import csv
+import os
+
+from fastapi import HTTPException
+
+
+# format -> accepted file extensions
+IMPORT_FORMATS = {
+    "csv": (".csv", ".txt"),
+    "xlsx": (".xlsx", ".xlsm"),
+}
+
+
+def detect_format(filename: str = None, fmt: str = None) -> str:
+    """Explicit `fmt`, else the file extension."""
+    if fmt:
+        if fmt not in IMPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown import format: {fmt}")
+        return fmt
+
+    ext = os.path.splitext(filename or "")[1].lower()
+    for name, extensions in IMPORT_FORMATS.items():
+        if ext in extensions:
+            return name
+    raise HTTPException(status_code=400, detail="Cannot tell the file format, pass format=csv or format=xlsx")
+
+
+def _cell(value):
+    """Normalizes a cell: trimmed text, None for blanks, 12.0 -> 12."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+# ======================================================
+# CSV
+# ======================================================
+
+def _sniff_delimiter(sample: str) -> str:
+    # Excel in pt-BR locales saves CSV with ';'
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t").delimiter
+    except csv.Error:
+        return ","
+
+
+def _read_csv(fileobj):
+    # utf-8-sig drops the BOM written by Excel (and by our own CSV export)
+    text = codecs.getreader("utf-8-sig")(fileobj, errors="replace")
+    first = text.readline()
+    if not first:
+        raise HTTPException(status_code=400, detail="The file is empty")
+
+    delimiter = _sniff_delimiter(first)
+    header = [_cell(v) for v in next(csv.reader([first], delimiter=delimiter))]
+
+    def rows():
+        reader = csv.reader(text, delimiter=delimiter)
+        for values in reader:
+            if any(v.strip() for v in values):
+                # line_num counts physical lines (quoted newlines included)
+                yield reader.line_num + 1, [_cell(v) for v in values]
+
+    return header, rows()
+
+
+# ======================================================
+# XLSX (optional: openpyxl)
+# ======================================================
+
+def _load_openpyxl():
+    try:
+        import openpyxl
+    except ImportError:
+        raise HTTPException(status_code=400, detail="XLSX import requires the openpyxl package")
+    return openpyxl
+
+
+def _read_xlsx(fileobj):
+    openpyxl = _load_openpyxl()
+    try:
+        book = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid XLSX file: {e}")
+
+    sheet = book.worksheets[0]
+    values = sheet.iter_rows(values_only=True)
+    try:
+        header = [_cell(v) for v in next(values)]
+    except StopIteration:
+        book.close()
+        raise HTTPException(status_code=400, detail="The file is empty")
+
+    def rows():
+        try:
+            for n, row in enumerate(values, start=2):
+                cells = [_cell(v) for v in row]
+                if any(c is not None for c in cells):
+                    yield n, cells
+        finally:
+            book.close()
+
+    return header, rows()
+
+
+# ======================================================
+# PUBLIC API
+# ======================================================
+
+def read_table(fmt: str, fileobj):
+    """(header, iterator of (row_number, values)) for a binary file object."""
+    if fmt == "xlsx":
+        return _read_xlsx(fileobj)
+    return _read_csv(fileobj)
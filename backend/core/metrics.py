@@ -0,0 +1,344 @@
+"""
+In-process metrics in the Prometheus text format.
+
+No client library: counters and histograms are plain dicts keyed by
+label values, guarded by one lock each, and rendered on scrape by
+render_metrics(). Sources:
+
+- MetricsMiddleware: latency, in-flight count and response size per
+  route template (never the raw path, so labels stay bounded);
+- InstrumentedCursor (database.py): statement time and rows per SQL
+  verb, lock wait on BEGIN IMMEDIATE, and the slow-query log;
+- WriteQueue (writer.py): queue wait and group-commit batch size;
+- WorkerPool.run (executors.py): render / auth task time per function;
+- stream_export (exports.py): export time and bytes per format;
+- collectors: pool, cache and executor stats read at scrape time.
+
+SLOW_QUERY_MS > 0 prints every statement slower than the threshold.
+"""
+import os
+import threading
+import time
+
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "0"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+# ======================================================
+# METRIC TYPES
+# ======================================================
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(v) -> str:
+    if isinstance(v, float):
+        if v == float("inf"):
+            return "+Inf"
+        return repr(round(v, 9))
+    return str(v)
+
+
+class Counter:
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for values, v in items:
+            yield f"{self.name}{_labels(self.labels, values)} {_number(v)}"
+
+
+class Gauge(Counter):
+
+    kind = "gauge"
+
+    def set(self, *label_values, value: float):
+        with self._lock:
+            self._values[label_values] = value
+
+    def dec(self, *label_values, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._values = {}            # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, *label_values, value: float):
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def totals(self) -> tuple:
+        """(count, sum) over every label set."""
+        with self._lock:
+            return (sum(s[-1] for s in self._values.values()),
+                    sum(s[-2] for s in self._values.values()))
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for values, state in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, state):
+                cumulative += n
+                le = 'le="%s"' % _number(float(bound))
+                yield f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_labels(self.labels, values, le)} {state[-1]}"
+            yield f"{self.name}_sum{_labels(self.labels, values)} {_number(state[-2])}"
+            yield f"{self.name}_count{_labels(self.labels, values)} {state[-1]}"
+
+
+# ======================================================
+# REGISTRY
+# ======================================================
+
+_metrics = []
+_collectors = []
+
+
+def _register(metric):
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(fn):
+    """fn() -> iterable of (name, kind, help, {labels}, value), called on scrape."""
+    _collectors.append(fn)
+    return fn
+
+
+# --------------------------
+# HTTP
+# --------------------------
+http_requests = _register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+http_latency = _register(Histogram(
+    "http_request_duration_seconds", "Request latency (until the last body byte is sent)", ("method", "route")))
+http_in_flight = _register(Gauge(
+    "http_requests_in_flight", "Requests currently being served", ("method",)))
+http_response_size = _register(Histogram(
+    "http_response_size_bytes", "Response body size", ("method", "route"), buckets=SIZE_BUCKETS))
+
+# --------------------------
+# DATABASE
+# --------------------------
+db_statement_latency = _register(Histogram(
+    "db_statement_duration_seconds", "SQL statement execution time by verb", ("op",)))
+db_rows = _register(Counter(
+    "db_rows_total", "Rows returned (fetched) or affected by SQL statements", ("op", "kind")))
+db_fetch_seconds = _register(Counter(
+    "db_fetch_seconds_total", "Time spent fetching result rows", ("op",)))
+db_lock_wait = _register(Histogram(
+    "db_lock_wait_seconds", "Time to acquire the write lock (BEGIN IMMEDIATE)"))
+db_slow_queries = _register(Counter(
+    "db_slow_queries_total", "Statements slower than SLOW_QUERY_MS", ("op",)))
+writer_queue_wait = _register(Histogram(
+    "db_writer_queue_wait_seconds", "Time a write job waited for the writer thread"))
+writer_batch_size = _register(Histogram(
+    "db_writer_batch_size", "Write jobs committed together (group commit)",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)))
+
+# --------------------------
+# RENDERING / EXPORTS
+# --------------------------
+task_latency = _register(Histogram(
+    "worker_task_duration_seconds", "Worker pool task run time (excludes queueing)", ("pool", "task")))
+export_latency = _register(Histogram(
+    "export_duration_seconds", "Streaming export time, first to last chunk", ("format",)))
+export_bytes = _register(Counter(
+    "export_bytes_total", "Bytes produced by streaming exports", ("format",)))
+
+
+# ======================================================
+# SQL HELPERS
+# ======================================================
+
+_SQL_VERBS = {
+    "SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH",
+    "BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE",
+    "PRAGMA", "CREATE", "DROP", "ALTER", "ANALYZE", "VACUUM",
+}
+
+
+def sql_op(sql: str) -> str:
+    """Leading SQL verb (bounded label set)."""
+    head = sql.lstrip()[:16].split(None, 1)
+    verb = head[0].upper() if head else ""
+    return verb if verb in _SQL_VERBS else "OTHER"
+
+
+def observe_statement(sql: str, op: str, seconds: float, rows: int = -1):
+    db_statement_latency.observe(op, value=seconds)
+    if rows > 0:
+        db_rows.inc(op, "affected", amount=rows)
+    if op == "BEGIN":
+        mode = sql.upper()
+        if "IMMEDIATE" in mode or "EXCLUSIVE" in mode:
+            db_lock_wait.observe(value=seconds)
+    check_slow(sql, op, seconds)
+
+
+def observe_fetch(sql: str, op: str, exec_seconds: float, fetch_seconds: float, rows: int):
+    db_fetch_seconds.inc(op, amount=fetch_seconds)
+    if rows:
+        db_rows.inc(op, "fetched", amount=rows)
+    # Already logged at execute time if execution alone was slow
+    if exec_seconds * 1000 < SLOW_QUERY_MS:
+        check_slow(sql, op, exec_seconds + fetch_seconds, rows)
+
+
+def check_slow(sql: str, op: str, seconds: float, rows: int = None):
+    if SLOW_QUERY_MS <= 0 or seconds * 1000 < SLOW_QUERY_MS:
+        return
+    db_slow_queries.inc(op)
+    text = " ".join(sql.split())
+    if len(text) > 500:
+        text = text[:500] + "..."
+    suffix = f", {rows} rows" if rows is not None else ""
+    print(f"Slow query ({seconds * 1000:.1f} ms{suffix}): {text}")
+
+
+# ======================================================
+# ASGI MIDDLEWARE
+# ======================================================
+
+def _route_template(scope) -> str:
+    # Set by the router once a route matched; raw paths would explode labels
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return (scope.get("root_path") or "") + route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware), so streaming and
+    file responses pass through unbuffered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        http_in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec(method)
+            route = _route_template(scope)
+            http_requests.inc(method, route, str(status))
+            http_latency.observe(method, route, value=time.perf_counter() - started)
+            http_response_size.observe(method, route, value=size)
+
+
+# ======================================================
+# EXPOSITION
+# ======================================================
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def stats_collector(prefix: str, stats_fn, label: str = None):
+    """
+    Collector exposing the numeric fields of an existing stats() dict as
+    gauges named {prefix}_{field}. stats_fn may return a list of dicts,
+    told apart by the `label` field (e.g. one dict per worker pool).
+    """
+    def collect():
+        stats = stats_fn()
+        for entry in stats if isinstance(stats, list) else [stats]:
+            labels = {label: entry[label]} if label else {}
+            for key, value in entry.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                yield f"{prefix}_{key}", "gauge", f"{prefix} {key}", labels, value
+
+    collect.__name__ = f"{prefix}_collector"
+    return collect
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+
+    # Samples of one name must be contiguous: group them first
+    families = {}
+    for collect in _collectors:
+        try:
+            samples = list(collect())
+        except Exception as e:
+            print(f"Metrics collector {collect.__name__} failed: {e}")
+            continue
+        for name, kind, help, labels, value in samples:
+            if value is None:
+                continue
+            family = families.setdefault(name, (kind, help, []))
+            family[2].append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(float(value))}")
+
+    for name, (kind, help, samples) in families.items():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,924 @@
+"""
+Versioned schema migrations.
+
+Every step is registered with @migration(version, description) and runs
+exactly once, in order, inside a single write transaction. Applied
+versions are recorded in the `schema_version` table, so starting the app
+against an up-to-date database costs a single SELECT.
+
+Steps must be idempotent (IF NOT EXISTS, add_column(), ...) so that
+databases created before this runner existed can be adopted safely.
+"""
+import sqlite3
+
+MIGRATIONS = []
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+# ======================================================
+# HELPERS
+# ======================================================
+
+def add_column(cur: sqlite3.Cursor, table: str, column: str, decl: str):
+    """ALTER TABLE ... ADD COLUMN, skipped when the column already exists."""
+    cols = {r[1] for r in cur.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column not in cols:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _ensure_version_table(cur: sqlite3.Cursor):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not row:
+        return 0
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+# ======================================================
+# RUNNER
+# ======================================================
+
+def run_migrations(conn: sqlite3.Connection) -> list:
+    """
+    Applies every pending migration and returns the versions applied.
+    Safe to call from several processes at once: the version check is
+    repeated after taking the write lock.
+    """
+    if current_version(conn) == latest_version():
+        return []
+
+    applied = []
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        _ensure_version_table(cur)
+        version = current_version(conn)
+
+        for number, description, step in MIGRATIONS:
+            if number <= version:
+                continue
+            step(cur)
+            cur.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (number, description)
+            )
+            applied.append(number)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    if applied:
+        conn.execute("PRAGMA optimize")
+
+    return applied
+
+
+def check_schema(conn: sqlite3.Connection):
+    """
+    Startup guard: refuses to run against a database migrated by a newer
+    version of the code.
+    """
+    version = current_version(conn)
+    if version > latest_version():
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this build "
+            f"supports ({latest_version()})"
+        )
+    return version
+
+
+# ======================================================
+# MIGRATIONS
+# ======================================================
+
+@migration(1, "baseline schema")
+def _baseline_schema(cur: sqlite3.Cursor):
+
+    # --------------------------
+    # USERS
+    # --------------------------
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # --------------------------
+    # PRODUCTS
+    # --------------------------
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS products (
+            code TEXT PRIMARY KEY,
+            category TEXT NOT NULL,
+            subcategory TEXT,
+            description TEXT NOT NULL,
+            unit TEXT NOT NULL,
+            stock INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    # --------------------------
+    # SUPPLIERS
+    # --------------------------
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS suppliers (
+            cnpj TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            address TEXT,
+            neighborhood TEXT,
+            city TEXT,
+            state TEXT,
+            cep TEXT,
+            seller TEXT,
+            cellphone TEXT,
+            pix TEXT
+        )
+    """)
+
+    # --------------------------
+    # PURCHASE ORDERS
+    # --------------------------
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS purchase_orders (
+    po_number INTEGER PRIMARY KEY AUTOINCREMENT,
+    po_code TEXT UNIQUE,
+
+    -- Supplier
+    supplier_cnpj TEXT NOT NULL,
+    supplier_name TEXT,
+    supplier_address TEXT,
+    supplier_neighborhood TEXT,
+    supplier_city TEXT,
+    supplier_state TEXT,
+    supplier_cep TEXT,
+    supplier_pix TEXT,
+    supplier_contact TEXT,
+
+    -- Buyer
+    buyer_cnpj TEXT,
+    buyer_name TEXT,
+    buyer_address TEXT,
+    buyer_neighborhood TEXT,
+    buyer_city TEXT,
+    buyer_state TEXT,
+    buyer_cep TEXT,
+    buyer_pix TEXT,
+    buyer_contact TEXT,
+
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    received_at TEXT,                     -- ✅ ADD THIS LINE
+    status TEXT DEFAULT 'OPEN',
+    notes TEXT
+)
+    """)
+
+    # --------------------------
+    # PO ITEMS
+    # --------------------------
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS po_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            po_number INTEGER NOT NULL,
+            item_code TEXT,
+            description TEXT,
+            unit TEXT,
+            qty INTEGER,
+            unit_price REAL,
+            line_total REAL,
+            FOREIGN KEY (po_number) REFERENCES purchase_orders(po_number)
+        )
+    """)
+
+    # --------------------------
+    # PO RECEIVED (HEADER)
+    # --------------------------
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS po_received (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            po_number INTEGER NOT NULL,
+            received_at TEXT DEFAULT CURRENT_TIMESTAMP,
+
+            -- Supplier
+            supplier_cnpj TEXT,
+            supplier_name TEXT,
+
+            -- Buyer (MISSING BEFORE — NOW FIXED)
+            buyer_cnpj TEXT,
+            buyer_name TEXT,
+
+            total_value REAL,
+            notes TEXT
+        )
+    """)
+
+    # --------------------------
+    # PO RECEIVED ITEMS (DETAILS)
+    # --------------------------
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS po_received_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            po_received_id INTEGER NOT NULL,
+            product_code TEXT NOT NULL,
+            description TEXT,
+            unit TEXT,
+            qty REAL,
+            unit_price REAL,
+            line_total REAL,
+            FOREIGN KEY (po_received_id) REFERENCES po_received(id)
+        )
+    """)
+
+    # --------------------------
+    # ENTRIES HISTORY (LOG OF INVENTORY RECEIPTS)
+    # --------------------------
+    cur.execute("""
+            CREATE TABLE IF NOT EXISTS entries_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                po_number INTEGER,
+                supplier_cnpj TEXT,
+                product_code TEXT,
+                description TEXT,
+                unit TEXT,
+                qty REAL,
+                unit_cost REAL,
+                line_total REAL,
+                received_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    # --------------------------
+    # EXITS (HEADER)
+    # --------------------------
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS exits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            exit_code TEXT UNIQUE,
+            destination TEXT NOT NULL,
+            created_by INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            notes TEXT
+        )
+    """)
+
+    # --------------------------
+    # EXIT ITEMS (DETAILS)
+    # --------------------------
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS exit_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            exit_id INTEGER NOT NULL,
+            product_code TEXT NOT NULL,
+            description TEXT,
+            unit TEXT,
+            qty REAL NOT NULL,
+            unit_cost REAL,
+            line_total REAL,
+            FOREIGN KEY (exit_id) REFERENCES exits(id),
+            FOREIGN KEY (product_code) REFERENCES products(code)
+        )
+    """)
+
+    # --------------------------
+    # EXITS HISTORY (AUDIT LOG)
+    # --------------------------
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS exits_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            exit_id INTEGER,
+            product_code TEXT,
+            qty REAL,
+            changed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            changed_by INTEGER,
+            action TEXT
+        )
+    """)
+
+
+@migration(2, "secondary and covering indexes")
+def _secondary_indexes(cur: sqlite3.Cursor):
+    # Detail lookups (header -> lines)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_po_items_po_number ON po_items(po_number)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_exit_items_exit_id ON exit_items(exit_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_po_received_po_number ON po_received(po_number)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_po_received_items_header ON po_received_items(po_received_id)")
+
+    # Entries history: newest-first listing and per-product history
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_entries_history_received_at ON entries_history(received_at, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_entries_history_product ON entries_history(product_code, received_at)")
+
+    # Exits: date listing, destination filter, product -> exits lookups
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_exits_created_at ON exits(created_at, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_exits_destination ON exits(destination)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_exit_items_product ON exit_items(product_code, exit_id)")
+
+    # Purchase orders: status filter and the list screen (covering)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_purchase_orders_status ON purchase_orders(status, created_at)")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_purchase_orders_created_at
+        ON purchase_orders(created_at, po_number, po_code, supplier_name, status)
+    """)
+
+    cur.execute("ANALYZE")
+
+
+@migration(3, "catalog version counter and product filter indexes")
+def _catalog_version(cur: sqlite3.Cursor):
+    # Single-row counter bumped by triggers on every products change.
+    # Lets GET /api/products answer If-None-Match without reading products.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    cur.execute("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 1)")
+
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_products_catalog_version_{event.lower()}
+            AFTER {event} ON products
+            BEGIN
+                UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+            END
+        """)
+
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_products_category ON products(category, subcategory)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_products_stock ON products(stock)")
+
+
+@migration(4, "full-text product search index")
+def _products_fts(cur: sqlite3.Cursor):
+    # The index stores its own copy of the searchable columns and is keyed
+    # by code (not products.rowid, which VACUUM may renumber).
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            code, description, category, subcategory,
+            tokenize = "unicode61 remove_diacritics 2 tokenchars '-_./'",
+            prefix = '1 2 3 4'
+        )
+    """)
+
+    delete_old = """
+        DELETE FROM products_fts WHERE rowid IN (
+            SELECT rowid FROM products_fts
+            WHERE products_fts MATCH 'code:"' || replace(old.code, '"', '""') || '"'
+              AND code = old.code
+        );
+    """
+    insert_new = """
+        INSERT INTO products_fts (code, description, category, subcategory)
+        VALUES (new.code, new.description, new.category, new.subcategory);
+    """
+
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_insert AFTER INSERT ON products
+        BEGIN {insert_new} END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_delete AFTER DELETE ON products
+        BEGIN {delete_old} END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_update
+        AFTER UPDATE OF code, description, category, subcategory ON products
+        BEGIN {delete_old} {insert_new} END
+    """)
+
+    cur.execute("DELETE FROM products_fts")
+    cur.execute("""
+        INSERT INTO products_fts (code, description, category, subcategory)
+        SELECT code, description, category, subcategory FROM products
+    """)
+
+
+@migration(5, "document number sequences")
+def _document_sequences(cur: sqlite3.Cursor):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS document_sequences (
+            prefix TEXT PRIMARY KEY,
+            next_value INTEGER NOT NULL
+        )
+    """)
+    # PO codes used to be PO + po_number: continue from there
+    cur.execute("""
+        INSERT OR IGNORE INTO document_sequences (prefix, next_value)
+        SELECT 'PO', COALESCE(MAX(po_number), 0) + 1 FROM purchase_orders
+    """)
+    cur.execute("INSERT OR IGNORE INTO document_sequences (prefix, next_value) VALUES ('EX', 1)")
+
+
+@migration(6, "denormalized supplier name on entries_history")
+def _entries_supplier_name(cur: sqlite3.Cursor):
+    # Filled by receive_po at insert time; the entries list no longer joins suppliers
+    add_column(cur, "entries_history", "supplier_name", "TEXT")
+    # Existing rows keep the name the list used to show (suppliers.name)
+    cur.execute("""
+        UPDATE entries_history
+        SET supplier_name = COALESCE(
+            (SELECT s.name FROM suppliers s WHERE s.cnpj = entries_history.supplier_cnpj),
+            (SELECT po.supplier_name FROM purchase_orders po WHERE po.po_number = entries_history.po_number)
+        )
+        WHERE supplier_name IS NULL
+    """)
+
+    # Filters of the paginated entries list (received_at, id order)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_entries_history_supplier ON entries_history(supplier_cnpj, received_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_entries_history_po ON entries_history(po_number, received_at)")
+
+
+@migration(7, "stock movement ledger and checkpoints")
+def _stock_ledger(cur: sqlite3.Cursor):
+    # Append-only: one row per stock change, with the balance it left behind
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_code TEXT NOT NULL,
+            delta REAL NOT NULL,
+            balance_after REAL NOT NULL,
+            reason TEXT NOT NULL,
+            ref INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_product ON stock_movements(product_code, created_at)")
+
+    # Periodic per-product snapshots of products.stock
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS stock_checkpoints (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_code TEXT NOT NULL,
+            balance REAL NOT NULL,
+            last_movement_id INTEGER NOT NULL,
+            taken_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stock_checkpoints_product ON stock_checkpoints(product_code, taken_at)")
+
+    # History before the ledger is unknown: open it with today's stock
+    cur.execute("""
+        INSERT INTO stock_movements (product_code, delta, balance_after, reason)
+        SELECT code, COALESCE(stock, 0), COALESCE(stock, 0), 'opening' FROM products
+    """)
+
+
+@migration(8, "dashboard summary tables")
+def _dashboard_summaries(cur: sqlite3.Cursor):
+    # Kept current by the triggers below, inside the same transaction as
+    # the write (receive_po, create_exit, PO status changes, product edits),
+    # so /api/dashboard/summary never scans history.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS dashboard_categories (
+            category TEXT PRIMARY KEY,
+            product_count INTEGER NOT NULL DEFAULT 0,
+            stock_qty REAL NOT NULL DEFAULT 0,
+            stock_value REAL NOT NULL DEFAULT 0
+        )
+    """)
+
+    # Per-product valuation (last purchase cost) as last applied to the totals
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS product_values (
+            product_code TEXT PRIMARY KEY,
+            unit_cost REAL NOT NULL DEFAULT 0,
+            value REAL NOT NULL DEFAULT 0
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS dashboard_po_status (
+            status TEXT PRIMARY KEY,
+            po_count INTEGER NOT NULL DEFAULT 0,
+            total_value REAL NOT NULL DEFAULT 0
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS dashboard_daily (
+            day TEXT PRIMARY KEY,
+            entry_lines INTEGER NOT NULL DEFAULT 0,
+            entry_qty REAL NOT NULL DEFAULT 0,
+            entry_value REAL NOT NULL DEFAULT 0,
+            exit_count INTEGER NOT NULL DEFAULT 0,
+            exit_lines INTEGER NOT NULL DEFAULT 0,
+            exit_qty REAL NOT NULL DEFAULT 0
+        )
+    """)
+
+    # --------------------------
+    # PRODUCTS -> categories / value
+    # --------------------------
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_products_ai AFTER INSERT ON products BEGIN
+            INSERT INTO product_values (product_code, unit_cost)
+            VALUES (NEW.code, COALESCE((
+                SELECT unit_cost FROM entries_history
+                WHERE product_code = NEW.code
+                ORDER BY received_at DESC, id DESC LIMIT 1
+            ), 0))
+            ON CONFLICT(product_code) DO NOTHING;
+
+            UPDATE product_values SET value = COALESCE(NEW.stock, 0) * unit_cost
+            WHERE product_code = NEW.code;
+
+            INSERT INTO dashboard_categories (category, product_count, stock_qty, stock_value)
+            VALUES (COALESCE(NEW.category, ''), 1, COALESCE(NEW.stock, 0),
+                    (SELECT value FROM product_values WHERE product_code = NEW.code))
+            ON CONFLICT(category) DO UPDATE SET
+                product_count = product_count + 1,
+                stock_qty = stock_qty + excluded.stock_qty,
+                stock_value = stock_value + excluded.stock_value;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_products_au AFTER UPDATE OF stock, category ON products BEGIN
+            UPDATE dashboard_categories SET
+                product_count = product_count - 1,
+                stock_qty = stock_qty - COALESCE(OLD.stock, 0),
+                stock_value = stock_value - COALESCE((SELECT value FROM product_values WHERE product_code = OLD.code), 0)
+            WHERE category = COALESCE(OLD.category, '');
+
+            UPDATE product_values SET value = COALESCE(NEW.stock, 0) * unit_cost
+            WHERE product_code = NEW.code;
+
+            INSERT INTO dashboard_categories (category, product_count, stock_qty, stock_value)
+            VALUES (COALESCE(NEW.category, ''), 1, COALESCE(NEW.stock, 0),
+                    COALESCE((SELECT value FROM product_values WHERE product_code = NEW.code), 0))
+            ON CONFLICT(category) DO UPDATE SET
+                product_count = product_count + 1,
+                stock_qty = stock_qty + excluded.stock_qty,
+                stock_value = stock_value + excluded.stock_value;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_products_ad AFTER DELETE ON products BEGIN
+            UPDATE dashboard_categories SET
+                product_count = product_count - 1,
+                stock_qty = stock_qty - COALESCE(OLD.stock, 0),
+                stock_value = stock_value - COALESCE((SELECT value FROM product_values WHERE product_code = OLD.code), 0)
+            WHERE category = COALESCE(OLD.category, '');
+            DELETE FROM product_values WHERE product_code = OLD.code;
+        END
+    """)
+
+    # --------------------------
+    # ENTRIES -> daily + purchase cost
+    # --------------------------
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_entries_ai AFTER INSERT ON entries_history BEGIN
+            INSERT INTO dashboard_daily (day, entry_lines, entry_qty, entry_value)
+            VALUES (date(NEW.received_at), 1, COALESCE(NEW.qty, 0), COALESCE(NEW.line_total, 0))
+            ON CONFLICT(day) DO UPDATE SET
+                entry_lines = entry_lines + 1,
+                entry_qty = entry_qty + excluded.entry_qty,
+                entry_value = entry_value + excluded.entry_value;
+
+            -- Revalue the product's stock at its latest purchase cost
+            UPDATE dashboard_categories SET stock_value = stock_value + (
+                SELECT COALESCE(p.stock, 0) * NEW.unit_cost - v.value
+                FROM products p JOIN product_values v ON v.product_code = p.code
+                WHERE p.code = NEW.product_code
+            )
+            WHERE NEW.unit_cost IS NOT NULL
+              AND category = (SELECT COALESCE(category, '') FROM products WHERE code = NEW.product_code)
+              AND EXISTS (SELECT 1 FROM product_values WHERE product_code = NEW.product_code);
+
+            UPDATE product_values SET
+                unit_cost = NEW.unit_cost,
+                value = COALESCE((SELECT stock FROM products WHERE code = NEW.product_code), 0) * NEW.unit_cost
+            WHERE NEW.unit_cost IS NOT NULL AND product_code = NEW.product_code;
+        END
+    """)
+
+    # --------------------------
+    # EXITS -> daily
+    # --------------------------
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_exits_ai AFTER INSERT ON exits BEGIN
+            INSERT INTO dashboard_daily (day, exit_count) VALUES (date(NEW.created_at), 1)
+            ON CONFLICT(day) DO UPDATE SET exit_count = exit_count + 1;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_exit_items_ai AFTER INSERT ON exit_items BEGIN
+            INSERT INTO dashboard_daily (day, exit_lines, exit_qty)
+            VALUES ((SELECT date(created_at) FROM exits WHERE id = NEW.exit_id), 1, COALESCE(NEW.qty, 0))
+            ON CONFLICT(day) DO UPDATE SET
+                exit_lines = exit_lines + 1,
+                exit_qty = exit_qty + excluded.exit_qty;
+        END
+    """)
+
+    # --------------------------
+    # PURCHASE ORDERS -> status counts / value
+    # --------------------------
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_po_ai AFTER INSERT ON purchase_orders BEGIN
+            INSERT INTO dashboard_po_status (status, po_count) VALUES (COALESCE(NEW.status, ''), 1)
+            ON CONFLICT(status) DO UPDATE SET po_count = po_count + 1;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_po_au AFTER UPDATE OF status ON purchase_orders
+        WHEN COALESCE(OLD.status, '') != COALESCE(NEW.status, '') BEGIN
+            UPDATE dashboard_po_status SET
+                po_count = po_count - 1,
+                total_value = total_value - (SELECT COALESCE(SUM(line_total), 0) FROM po_items WHERE po_number = OLD.po_number)
+            WHERE status = COALESCE(OLD.status, '');
+
+            INSERT INTO dashboard_po_status (status, po_count, total_value)
+            VALUES (COALESCE(NEW.status, ''), 1,
+                    (SELECT COALESCE(SUM(line_total), 0) FROM po_items WHERE po_number = NEW.po_number))
+            ON CONFLICT(status) DO UPDATE SET
+                po_count = po_count + 1,
+                total_value = total_value + excluded.total_value;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_po_ad AFTER DELETE ON purchase_orders BEGIN
+            UPDATE dashboard_po_status SET
+                po_count = po_count - 1,
+                total_value = total_value - (SELECT COALESCE(SUM(line_total), 0) FROM po_items WHERE po_number = OLD.po_number)
+            WHERE status = COALESCE(OLD.status, '');
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_po_items_ai AFTER INSERT ON po_items BEGIN
+            UPDATE dashboard_po_status SET total_value = total_value + COALESCE(NEW.line_total, 0)
+            WHERE status = (SELECT COALESCE(status, '') FROM purchase_orders WHERE po_number = NEW.po_number);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_po_items_au AFTER UPDATE OF line_total ON po_items BEGIN
+            UPDATE dashboard_po_status
+            SET total_value = total_value + COALESCE(NEW.line_total, 0) - COALESCE(OLD.line_total, 0)
+            WHERE status = (SELECT COALESCE(status, '') FROM purchase_orders WHERE po_number = NEW.po_number);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_po_items_ad AFTER DELETE ON po_items BEGIN
+            UPDATE dashboard_po_status SET total_value = total_value - COALESCE(OLD.line_total, 0)
+            WHERE status = (SELECT COALESCE(status, '') FROM purchase_orders WHERE po_number = OLD.po_number);
+        END
+    """)
+
+    # --------------------------
+    # BACKFILL from existing data
+    # --------------------------
+    cur.execute("""
+        INSERT OR REPLACE INTO product_values (product_code, unit_cost, value)
+        SELECT code, unit_cost, COALESCE(stock, 0) * unit_cost
+        FROM (
+            SELECT p.code, p.stock, COALESCE((
+                SELECT unit_cost FROM entries_history
+                WHERE product_code = p.code AND unit_cost IS NOT NULL
+                ORDER BY received_at DESC, id DESC LIMIT 1
+            ), 0) AS unit_cost
+            FROM products p
+        )
+    """)
+    cur.execute("DELETE FROM dashboard_categories")
+    cur.execute("""
+        INSERT INTO dashboard_categories (category, product_count, stock_qty, stock_value)
+        SELECT COALESCE(p.category, ''), COUNT(*), COALESCE(SUM(p.stock), 0), COALESCE(SUM(v.value), 0)
+        FROM products p JOIN product_values v ON v.product_code = p.code
+        GROUP BY COALESCE(p.category, '')
+    """)
+    cur.execute("DELETE FROM dashboard_po_status")
+    cur.execute("""
+        INSERT INTO dashboard_po_status (status, po_count, total_value)
+        SELECT COALESCE(po.status, ''), COUNT(*), COALESCE(SUM(t.total), 0)
+        FROM purchase_orders po
+        LEFT JOIN (
+            SELECT po_number, SUM(line_total) AS total FROM po_items GROUP BY po_number
+        ) t ON t.po_number = po.po_number
+        GROUP BY COALESCE(po.status, '')
+    """)
+    cur.execute("DELETE FROM dashboard_daily")
+    cur.execute("""
+        INSERT INTO dashboard_daily (day, entry_lines, entry_qty, entry_value)
+        SELECT date(received_at), COUNT(*), COALESCE(SUM(qty), 0), COALESCE(SUM(line_total), 0)
+        FROM entries_history
+        WHERE received_at IS NOT NULL
+        GROUP BY date(received_at)
+    """)
+    cur.execute("""
+        INSERT INTO dashboard_daily (day, exit_count, exit_lines, exit_qty)
+        SELECT e.day, e.n, COALESCE(i.lines, 0), COALESCE(i.qty, 0)
+        FROM (SELECT date(created_at) AS day, COUNT(*) AS n FROM exits WHERE created_at IS NOT NULL GROUP BY day) e
+        LEFT JOIN (
+            SELECT date(x.created_at) AS day, COUNT(*) AS lines, SUM(it.qty) AS qty
+            FROM exit_items it JOIN exits x ON x.id = it.exit_id
+            GROUP BY day
+        ) i ON i.day = e.day
+        WHERE true
+        ON CONFLICT(day) DO UPDATE SET
+            exit_count = excluded.exit_count,
+            exit_lines = excluded.exit_lines,
+            exit_qty = excluded.exit_qty
+    """)
+
+
+@migration(9, "weighted-average product costs")
+def _product_costs(cur: sqlite3.Cursor):
+    # Running weighted-average cost per product, updated by receive_po
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS product_costs (
+            product_code TEXT PRIMARY KEY,
+            avg_cost REAL NOT NULL,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # No replay of the full history: start from the average purchase price
+    cur.execute("""
+        INSERT OR IGNORE INTO product_costs (product_code, avg_cost)
+        SELECT product_code, SUM(line_total) / SUM(qty)
+        FROM entries_history
+        WHERE product_code IS NOT NULL AND qty > 0 AND line_total IS NOT NULL
+        GROUP BY product_code
+        HAVING SUM(qty) > 0
+    """)
+
+    # Dashboard value now follows product_costs instead of the last receipt
+    cur.execute("DROP TRIGGER IF EXISTS dash_entries_ai")
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_entries_ai AFTER INSERT ON entries_history BEGIN
+            INSERT INTO dashboard_daily (day, entry_lines, entry_qty, entry_value)
+            VALUES (date(NEW.received_at), 1, COALESCE(NEW.qty, 0), COALESCE(NEW.line_total, 0))
+            ON CONFLICT(day) DO UPDATE SET
+                entry_lines = entry_lines + 1,
+                entry_qty = entry_qty + excluded.entry_qty,
+                entry_value = entry_value + excluded.entry_value;
+        END
+    """)
+    for event in ("INSERT", "UPDATE OF avg_cost"):
+        name = "dash_costs_ai" if event == "INSERT" else "dash_costs_au"
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON product_costs BEGIN
+                UPDATE dashboard_categories SET stock_value = stock_value + (
+                    SELECT COALESCE(p.stock, 0) * NEW.avg_cost - v.value
+                    FROM products p JOIN product_values v ON v.product_code = p.code
+                    WHERE p.code = NEW.product_code
+                )
+                WHERE category = (SELECT COALESCE(category, '') FROM products WHERE code = NEW.product_code)
+                  AND EXISTS (SELECT 1 FROM product_values WHERE product_code = NEW.product_code);
+
+                UPDATE product_values SET
+                    unit_cost = NEW.avg_cost,
+                    value = COALESCE((SELECT stock FROM products WHERE code = NEW.product_code), 0) * NEW.avg_cost
+                WHERE product_code = NEW.product_code;
+            END
+        """)
+
+    # New products start from their average cost, if one exists
+    cur.execute("DROP TRIGGER IF EXISTS dash_products_ai")
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_products_ai AFTER INSERT ON products BEGIN
+            INSERT INTO product_values (product_code, unit_cost)
+            VALUES (NEW.code, COALESCE((SELECT avg_cost FROM product_costs WHERE product_code = NEW.code), 0))
+            ON CONFLICT(product_code) DO NOTHING;
+
+            UPDATE product_values SET value = COALESCE(NEW.stock, 0) * unit_cost
+            WHERE product_code = NEW.code;
+
+            INSERT INTO dashboard_categories (category, product_count, stock_qty, stock_value)
+            VALUES (COALESCE(NEW.category, ''), 1, COALESCE(NEW.stock, 0),
+                    (SELECT value FROM product_values WHERE product_code = NEW.code))
+            ON CONFLICT(category) DO UPDATE SET
+                product_count = product_count + 1,
+                stock_qty = stock_qty + excluded.stock_qty,
+                stock_value = stock_value + excluded.stock_value;
+        END
+    """)
+
+    # Revalue what the dashboard already holds
+    cur.execute("""
+        UPDATE product_values SET
+            unit_cost = COALESCE((SELECT avg_cost FROM product_costs WHERE product_code = product_values.product_code), 0),
+            value = COALESCE((SELECT stock FROM products WHERE code = product_values.product_code), 0)
+                  * COALESCE((SELECT avg_cost FROM product_costs WHERE product_code = product_values.product_code), 0)
+    """)
+    cur.execute("""
+        UPDATE dashboard_categories SET stock_value = COALESCE((
+            SELECT SUM(v.value)
+            FROM products p JOIN product_values v ON v.product_code = p.code
+            WHERE COALESCE(p.category, '') = dashboard_categories.category
+        ), 0)
+    """)
+
+
+@migration(10, "purchase order totals and list indexes")
+def _po_totals(cur: sqlite3.Cursor):
+    # Line count and value carried on the header, kept by po_items triggers
+    add_column(cur, "purchase_orders", "item_count", "INTEGER NOT NULL DEFAULT 0")
+    add_column(cur, "purchase_orders", "total_value", "REAL NOT NULL DEFAULT 0")
+
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS po_totals_ai AFTER INSERT ON po_items BEGIN
+            UPDATE purchase_orders SET
+                item_count = item_count + 1,
+                total_value = total_value + COALESCE(NEW.line_total, 0)
+            WHERE po_number = NEW.po_number;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS po_totals_au AFTER UPDATE OF po_number, line_total ON po_items BEGIN
+            UPDATE purchase_orders SET
+                item_count = item_count - 1,
+                total_value = total_value - COALESCE(OLD.line_total, 0)
+            WHERE po_number = OLD.po_number;
+
+            UPDATE purchase_orders SET
+                item_count = item_count + 1,
+                total_value = total_value + COALESCE(NEW.line_total, 0)
+            WHERE po_number = NEW.po_number;
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS po_totals_ad AFTER DELETE ON po_items BEGIN
+            UPDATE purchase_orders SET
+                item_count = item_count - 1,
+                total_value = total_value - COALESCE(OLD.line_total, 0)
+            WHERE po_number = OLD.po_number;
+        END
+    """)
+
+    cur.execute("""
+        UPDATE purchase_orders SET
+            item_count = (SELECT COUNT(*) FROM po_items WHERE po_number = purchase_orders.po_number),
+            total_value = (SELECT COALESCE(SUM(line_total), 0) FROM po_items WHERE po_number = purchase_orders.po_number)
+    """)
+
+    # Dashboard status totals read the header instead of summing po_items
+    cur.execute("DROP TRIGGER IF EXISTS dash_po_au")
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_po_au AFTER UPDATE OF status ON purchase_orders
+        WHEN COALESCE(OLD.status, '') != COALESCE(NEW.status, '') BEGIN
+            UPDATE dashboard_po_status SET
+                po_count = po_count - 1,
+                total_value = total_value - OLD.total_value
+            WHERE status = COALESCE(OLD.status, '');
+
+            INSERT INTO dashboard_po_status (status, po_count, total_value)
+            VALUES (COALESCE(NEW.status, ''), 1, NEW.total_value)
+            ON CONFLICT(status) DO UPDATE SET
+                po_count = po_count + 1,
+                total_value = total_value + excluded.total_value;
+        END
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS dash_po_ad")
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS dash_po_ad AFTER DELETE ON purchase_orders BEGIN
+            UPDATE dashboard_po_status SET
+                po_count = po_count - 1,
+                total_value = total_value - OLD.total_value
+            WHERE status = COALESCE(OLD.status, '');
+        END
+    """)
+
+    # Keyset pages on (created_at, po_number), optionally within a status or supplier
+    cur.execute("DROP INDEX IF EXISTS idx_purchase_orders_status")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_purchase_orders_status ON purchase_orders(status, created_at, po_number)")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_purchase_orders_supplier
+        ON purchase_orders(supplier_cnpj, created_at, po_number)
+    """)
+    cur.execute("DROP INDEX IF EXISTS idx_purchase_orders_created_at")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_purchase_orders_created_at
+        ON purchase_orders(created_at, po_number, po_code, supplier_name, status, item_count, total_value)
+    """)
+    cur.execute("ANALYZE purchase_orders")
+
+
+@migration(11, "drop unusable exits destination index")
+def _drop_exits_destination_index(cur: sqlite3.Cursor):
+    # The destination filter is a casefolded substring match, which no index can serve
+    cur.execute("DROP INDEX IF EXISTS idx_exits_destination")
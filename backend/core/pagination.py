@@ -0,0 +1,36 @@
+"""
+Opaque keyset-pagination cursors.
+
+A cursor is the sort key of the last row of a page, e.g.
+(created_at, id), JSON-encoded and base64url'd so clients treat it as a
+token and pass it back unchanged as `?cursor=...`.
+"""
+import base64
+import json
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> list:
+    """Returns the `size` key values stored in the cursor or raises 400."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    return values
+
+
+def like_pattern(text: str) -> str:
+    """Case-insensitive substring pattern for `col LIKE ? ESCAPE '\\'`."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
@@ -0,0 +1,167 @@
+"""
+PDF background templates (PO and exit request).
+
+The PNG backgrounds are decoded and compressed into a PDF image XObject
+once per process instead of on every request / page. Each document then
+wraps that image in a form XObject on first use, so a multi-page PDF
+embeds the image once and every page just references the form:
+
+    draw_background(c, "po", page_w, page_h)
+
+Paths are resolved relative to the package, not the working directory.
+Templates are re-read when the file on disk changes (checked at most
+every PDF_TEMPLATE_CHECK_SECONDS).
+"""
+import copy
+import os
+import threading
+import time
+from pathlib import Path
+
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfdoc import PDFImageXObject
+
+from backend.core import metrics
+
+
+ASSETS_DIR = Path(__file__).resolve().parents[2] / "frontend" / "assets"
+
+TEMPLATES = {
+    "po": "po_template.png",
+    "exit": "EXITS-MODEL.png",
+}
+
+CHECK_INTERVAL_SECONDS = float(os.environ.get("PDF_TEMPLATE_CHECK_SECONDS", "2"))
+
+
+class _Template:
+
+    def __init__(self, name: str, path: Path, signature, xobject):
+        self.name = name
+        self.path = path
+        self.signature = signature
+        self.xobject = xobject
+        self.checked_at = time.monotonic()
+
+
+class TemplateRegistry:
+
+    def __init__(self, assets_dir: Path = ASSETS_DIR, templates: dict = TEMPLATES,
+                 check_interval: float = CHECK_INTERVAL_SECONDS):
+        self.assets_dir = Path(assets_dir)
+        self.templates = dict(templates)
+        self.check_interval = check_interval
+        self._loaded = {}
+        self._lock = threading.Lock()
+        self._reloads = 0
+        self._errors = 0
+
+    # --------------------------
+    # LOADING
+    # --------------------------
+    def path(self, name: str) -> Path:
+        return self.assets_dir / self.templates[name]
+
+    def signature(self, name: str):
+        """(mtime_ns, size) of the template file, or None if it is missing."""
+        try:
+            st = self.path(name).stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, name: str, signature):
+        path = self.path(name)
+        try:
+            reader = ImageReader(str(path))
+            # Decodes + deflates the pixels; done once, shared by every document
+            xobject = PDFImageXObject(f"tpl_{name}_img", reader)
+        except Exception as e:
+            self._errors += 1
+            print(f"PDF template '{name}' could not be loaded from {path}: {e}")
+            xobject = None
+        return _Template(name, path, signature, xobject)
+
+    def get(self, name: str):
+        """Compiled image XObject for a template, or None if unavailable."""
+        now = time.monotonic()
+        with self._lock:
+            tpl = self._loaded.get(name)
+            if tpl is not None and now - tpl.checked_at < self.check_interval:
+                return tpl.xobject
+
+            signature = self.signature(name)
+            if tpl is not None and tpl.signature == signature:
+                tpl.checked_at = now
+                return tpl.xobject
+
+            if tpl is not None:
+                self._reloads += 1
+            tpl = self._load(name, signature)
+            self._loaded[name] = tpl
+            return tpl.xobject
+
+    def load_all(self):
+        for name in self.templates:
+            self.get(name)
+
+    def reload(self):
+        with self._lock:
+            self._loaded.clear()
+        self.load_all()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": {n: t.xobject is not None for n, t in self._loaded.items()},
+                "reloads": self._reloads,
+                "errors": self._errors,
+            }
+
+
+registry = TemplateRegistry()
+metrics.register_collector(metrics.stats_collector("pdf_templates", registry.stats))
+
+
+def preload_templates():
+    """Worker-pool initializer: decode templates before the first render."""
+    registry.load_all()
+
+
+def template_signature(name: str):
+    """Part of the document digest, so a changed background re-renders cached PDFs."""
+    return registry.signature(name)
+
+
+# ======================================================
+# DRAWING
+# ======================================================
+
+def _register_image(c, xobject) -> str:
+    # Same bookkeeping Canvas.drawImage does, minus re-encoding the pixels
+    doc = c._doc
+    reg_name = doc.getXObjectName(xobject.name)
+    if reg_name not in doc.idToObject:
+        doc.Reference(copy.copy(xobject), reg_name)
+    return reg_name
+
+
+def draw_background(c, name: str, page_w, page_h):
+    """
+    Draws template `name` stretched over the current page.
+    The image is placed in a per-document form XObject on first use.
+    """
+    form_name = f"tpl_{name}"
+    if not c.hasForm(form_name):
+        xobject = registry.get(name)
+        if xobject is None:
+            return
+        reg_name = _register_image(c, xobject)
+        c.beginForm(form_name, lowerx=0, lowery=0, upperx=page_w, uppery=page_h)
+        c.saveState()
+        c.scale(page_w, page_h)
+        c._code.append(f"/{reg_name} Do")
+        c._formsinuse.append(xobject.name)
+        c.restoreState()
+        c.endForm()
+    c.doForm(form_name)
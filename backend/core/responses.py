@@ -0,0 +1,83 @@
+"""
+Conditional / partial responses for immutable byte payloads
+(cached PDFs): ETag + If-None-Match (304) and single-range Range
+requests (206 / 416).
+"""
+from fastapi import Request, Response
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [t.strip() for t in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _parse_range(header: str, size: int):
+    """
+    Returns (start, end) inclusive for a single 'bytes=' range,
+    None to ignore the header, or False when it cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+
+    start_s, _, end_s = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_s == "":                       # bytes=-500 (suffix)
+            length = int(end_s)
+            if length <= 0:
+                return False
+            return max(0, size - length), size - 1
+
+        start = int(start_s)
+        end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or end < start:
+        return False
+
+    return start, min(end, size - 1)
+
+
+def not_modified(request: Request, etag: str):
+    """304 response when the client already holds `etag`, else None."""
+    etag = f'"{etag}"'
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    return None
+
+
+def bytes_response(request: Request, data: bytes, etag: str, media_type: str,
+                   headers: dict = None) -> Response:
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    etag = f'"{etag}"'
+    base = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        **(headers or {})
+    }
+
+    # If-Range: only honour Range when the client's copy is current
+    if_range = request.headers.get("if-range")
+    byte_range = None
+    if not if_range or if_range.strip() == etag:
+        byte_range = _parse_range(request.headers.get("range"), len(data))
+
+    if byte_range is False:
+        return Response(status_code=416, headers={**base, "Content-Range": f"bytes */{len(data)}"})
+
+    if byte_range:
+        start, end = byte_range
+        return Response(
+            content=data[start:end + 1],
+            status_code=206,
+            media_type=media_type,
+            headers={**base, "Content-Range": f"bytes {start}-{end}/{len(data)}"}
+        )
+
+    return Response(content=data, media_type=media_type, headers=base)
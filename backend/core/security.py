@@ -1,8 +1,14 @@
+import hashlib
+import time
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
+from backend.core import metrics
+from backend.core.cache import TTLCache
 from backend.services.jwt_service import verify_access_token
-from backend.services.auth_service import get_user
+from backend.services.auth_service import cached_user, get_user, user_cache_stats
+from backend.services.read_service import read
 
 
 # ====================================
@@ -11,19 +17,45 @@ from backend.services.auth_service import get_user
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Decoded access-token payloads, keyed by token hash, kept until "exp"
+_token_cache = TTLCache(maxsize=4096, ttl=60)
+
+
+def _decode_access_token(token: str):
+    key = hashlib.sha256(token.encode()).hexdigest()
+
+    payload = _token_cache.get(key)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            return payload
+        _token_cache.invalidate(key)
+        return None
+
+    payload = verify_access_token(token)
+    if payload:
+        _token_cache.set(key, payload, ttl=max(0, payload.get("exp", 0) - time.time()))
+    return payload
+
+
+metrics.register_collector(metrics.stats_collector("token_cache", _token_cache.stats))
+metrics.register_collector(metrics.stats_collector("user_cache", user_cache_stats))
+
+
+def auth_cache_stats() -> dict:
+    return {
+        "tokens": _token_cache.stats(),
+        "users": user_cache_stats()
+    }
+
 
 # ====================================
 # USER AUTH DEPENDENCY
 # ====================================
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    """
-    Validates the access token and returns the user object.
-    Used as a dependency on all protected routes.
-    """
-
-    # 1. Verify token integrity + expiration
-    payload = verify_access_token(token)
+def _token_subject(token: str) -> str:
+    """Username from a valid access token, else 401."""
+    # Verify token integrity + expiration (cached until exp)
+    payload = _decode_access_token(token)
     if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -37,12 +69,38 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
             detail="Token missing subject"
         )
 
-    # 2. Retrieve user from the database
-    user = get_user(username)
+    return username
+
+
+def _require_user(user):
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
-
     return user
+
+
+def get_current_user(token: str = Depends(oauth2_scheme)):
+    """
+    Validates the access token and returns the user object.
+    Used as a dependency on all protected routes.
+    """
+    username = _token_subject(token)
+
+    # Retrieve user (in-process cache, then database)
+    return _require_user(get_user(username))
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme)):
+    """
+    get_current_user for async routes: runs on the event loop, and a
+    user-cache miss is read on the reader pool instead of a worker thread.
+    """
+    username = _token_subject(token)
+
+    user = cached_user(username)
+    if user is None:
+        user = await read(get_user, username)
+
+    return _require_user(user)
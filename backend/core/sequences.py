@@ -0,0 +1,92 @@
+"""
+Document-number sequences (exit codes).
+
+Numbers come from the `document_sequences` table (one counter per
+prefix). Each process reserves a block of numbers with a single short
+job on the database writer and then hands them out from memory, so
+allocation costs a lock acquire in the common case and one UPDATE per
+block.
+
+Numbers are unique across threads and processes. They are not gapless:
+a process that stops before using its whole block skips the rest.
+
+Allocate before queueing the write that uses the code, never from inside
+a writer job: the reservation would run inline in that job's savepoint
+and be undone if the job failed, while the block stayed handed out.
+"""
+import threading
+
+from backend.core.writer import writer
+
+
+# prefix -> (code format, numbers reserved per trip to the database)
+SEQUENCES = {
+    "EX": ("EX-{:06d}", 100),
+}
+
+# PO codes are not allocated here: the create job derives them from
+# po_number (po_service), so they can never drift apart
+
+DEFAULT_BLOCK_SIZE = 50
+
+
+def _reserve_locked(cur, prefix: str, size: int) -> int:
+    cur.execute(
+        "INSERT OR IGNORE INTO document_sequences (prefix, next_value) VALUES (?, 1)",
+        (prefix,)
+    )
+    start = cur.execute(
+        "SELECT next_value FROM document_sequences WHERE prefix = ?", (prefix,)
+    ).fetchone()[0]
+    cur.execute(
+        "UPDATE document_sequences SET next_value = next_value + ? WHERE prefix = ?",
+        (size, prefix)
+    )
+    return start
+
+
+class SequenceAllocator:
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks = {}
+        self._blocks = {}       # prefix -> [next_value, end_exclusive]
+
+    def _lock_for(self, prefix: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(prefix, threading.Lock())
+
+    def _reserve(self, prefix: str, size: int) -> list:
+        start = writer.run(_reserve_locked, prefix, size)
+        return [start, start + size]
+
+    def next_values(self, prefix: str, count: int = 1) -> list:
+        """Returns `count` increasing, never-reused numbers for `prefix`."""
+        block_size = SEQUENCES.get(prefix, (None, DEFAULT_BLOCK_SIZE))[1]
+
+        values = []
+        with self._lock_for(prefix):
+            while len(values) < count:
+                block = self._blocks.get(prefix)
+                if block is None or block[0] >= block[1]:
+                    block = self._reserve(prefix, max(block_size, count - len(values)))
+                    self._blocks[prefix] = block
+
+                take = min(block[1] - block[0], count - len(values))
+                values.extend(range(block[0], block[0] + take))
+                block[0] += take
+
+        return values
+
+
+allocator = SequenceAllocator()
+
+
+def next_codes(prefix: str, count: int = 1) -> list:
+    fmt = SEQUENCES.get(prefix, (prefix + "-{:06d}", None))[0]
+    return [fmt.format(n) for n in allocator.next_values(prefix, count)]
+
+
+def next_code(prefix: str) -> str:
+    """next_code("EX") -> "EX-000123" """
+    return next_codes(prefix, 1)[0]
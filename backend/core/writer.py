@@ -0,0 +1,251 @@
+"""
+Single-writer queue for write transactions.
+
+SQLite admits one writer at a time. Request threads that each ran their
+own BEGIN IMMEDIATE queued up on the database lock and, under bursts,
+failed with "database is locked". Write transactions are now jobs handed
+to one writer thread, which owns the only write connection:
+
+    exit_id = writer.run(_create_exit_locked, exit_code, destination, items)
+
+A job is fn(cur, *args), the contract of the existing *_locked helpers:
+it runs inside an open transaction and never BEGINs or COMMITs. The
+writer takes every job already queued (up to WRITER_MAX_BATCH), runs each
+in its own SAVEPOINT and commits them together (group commit), so a
+burst of small writes costs one lock acquire and one WAL commit. A job
+that raises is rolled back to its savepoint and its exception is raised
+in the caller; the rest of the batch still commits. Results are handed
+back only after the COMMIT.
+
+If the batch COMMIT itself fails, every job is retried alone, so jobs
+must only touch the database; callers invalidate caches after run()
+returns. A job that itself calls writer.run() gets its call run inline,
+in a nested savepoint, instead of deadlocking on its own queue.
+
+Writers in other processes are still arbitrated by SQLite's
+busy_timeout (database.py).
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from fastapi import HTTPException
+
+from backend.core import metrics
+from backend.core.database import DB_PATH, open_connection
+
+
+MAX_BATCH = int(os.environ.get("WRITER_MAX_BATCH", "64"))
+LINGER_SECONDS = float(os.environ.get("WRITER_LINGER_MS", "0")) / 1000      # wait for more jobs before committing
+QUEUE_LIMIT = int(os.environ.get("WRITER_QUEUE_LIMIT", "1000"))
+
+
+class _Job:
+
+    __slots__ = ("fn", "args", "future", "enqueued_at")
+
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class _TransactionLost(Exception):
+    """A job error that also ended the batch transaction."""
+
+
+class WriteQueue:
+
+    def __init__(self, db_path: str, max_batch: int = MAX_BATCH,
+                 linger: float = LINGER_SECONDS, max_queue: int = QUEUE_LIMIT):
+        self.db_path = db_path
+        self.max_batch = max(1, max_batch)
+        self.linger = linger
+        self.max_queue = max_queue
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._conn = None
+        self._writer_ident = None
+
+        self._submitted = 0
+        self._committed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._batches = 0
+        self._retried_batches = 0
+        self._largest_batch = 0
+
+    # --------------------------
+    # LIFECYCLE
+    # --------------------------
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 30):
+        """Commits what is queued, then stops the thread (restarted by the next submit)."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+    # --------------------------
+    # SUBMIT
+    # --------------------------
+    def submit(self, fn, *args) -> Future:
+        """Queues fn(cur, *args); the future resolves after its batch commits."""
+        if threading.get_ident() == self._writer_ident:
+            return self._run_inline(fn, args)
+
+        with self._lock:
+            if self._queue.qsize() >= self.max_queue:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server busy (database writer), please retry",
+                    headers={"Retry-After": "1"}
+                )
+            self._submitted += 1
+
+        self.start()
+        job = _Job(fn, args)
+        self._queue.put(job)
+        return job.future
+
+    def run(self, fn, *args):
+        """Blocking submit: returns fn's result or raises its exception."""
+        return self.submit(fn, *args).result()
+
+    def _run_inline(self, fn, args) -> Future:
+        future = Future()
+        cur = self._conn.cursor()
+        cur.execute("SAVEPOINT write_nested")
+        try:
+            future.set_result(fn(cur, *args))
+            cur.execute("RELEASE write_nested")
+        except Exception as e:
+            cur.execute("ROLLBACK TO write_nested")
+            cur.execute("RELEASE write_nested")
+            future.set_exception(e)
+        return future
+
+    # --------------------------
+    # WRITER THREAD
+    # --------------------------
+    def _next_batch(self, first: _Job):
+        """`first` plus whatever else is queued (waiting up to `linger`). Second value: stop requested."""
+        batch = [first]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _loop(self):
+        conn = open_connection(self.db_path)
+        self._conn = conn
+        self._writer_ident = threading.get_ident()
+        try:
+            stop = False
+            while not stop:
+                job = self._queue.get()
+                if job is None:
+                    break
+                batch, stop = self._next_batch(job)
+                batch = [j for j in batch if j.future.set_running_or_notify_cancel()]
+                if batch:
+                    self._run_batch(conn, batch)
+        finally:
+            self._conn = None
+            self._writer_ident = None
+            conn.close()
+
+    def _run_job(self, cur, job: _Job):
+        cur.execute("SAVEPOINT write_job")
+        try:
+            value = job.fn(cur, *job.args)
+            cur.execute("RELEASE write_job")
+            return True, value
+        except Exception as e:
+            if not cur.connection.in_transaction:
+                raise _TransactionLost() from e
+            cur.execute("ROLLBACK TO write_job")
+            cur.execute("RELEASE write_job")
+            return False, e
+
+    def _run_batch(self, conn, batch: list, retry: bool = False):
+        if not retry:
+            started = time.perf_counter()
+            for job in batch:
+                metrics.writer_queue_wait.observe(value=started - job.enqueued_at)
+            metrics.writer_batch_size.observe(value=len(batch))
+
+        cur = conn.cursor()
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            outcomes = [self._run_job(cur, job) for job in batch]
+            conn.commit()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if len(batch) > 1:
+                # One bad job (or the COMMIT) took the batch down: isolate
+                with self._lock:
+                    self._retried_batches += 1
+                for job in batch:
+                    self._run_batch(conn, [job], retry=True)
+                return
+            outcomes = [(False, e.__cause__ if isinstance(e, _TransactionLost) else e)]
+
+        with self._lock:
+            self._batches += 1
+            self._largest_batch = max(self._largest_batch, len(batch))
+            for ok, _ in outcomes:
+                if ok:
+                    self._committed += 1
+                else:
+                    self._failed += 1
+
+        for job, (ok, value) in zip(batch, outcomes):
+            if ok:
+                job.future.set_result(value)
+            else:
+                job.future.set_exception(value)
+
+    # --------------------------
+    # METRICS
+    # --------------------------
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "queued": self._queue.qsize(),
+                "max_batch": self.max_batch,
+                "submitted": self._submitted,
+                "committed": self._committed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "batches": self._batches,
+                "retried_batches": self._retried_batches,
+                "largest_batch": self._largest_batch,
+                "mean_batch": round((self._committed + self._failed) / self._batches, 3) if self._batches else 0.0
+            }
+
+
+writer = WriteQueue(DB_PATH)
+metrics.register_collector(metrics.stats_collector("db_writer", writer.stats))
+
@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -9,14 +12,47 @@ from backend.routers import (
     exits,
     exits_print,
     po,
+    batch_print,
+    stock,
+    dashboard,
+    valuation,
+    metrics,
     auth,
     pages
 )
 
-from backend.core.database import initialize_database
+from backend.core.database import initialize_database, pool
+from backend.core.executors import start_pools, shutdown_pools
+from backend.core.metrics import MetricsMiddleware
+from backend.core.writer import writer
+from backend.core.pdf_templates import registry as pdf_templates
+from backend.services.batch_print_service import shutdown_jobs
+from backend.services.stock_service import run_checkpoints, CHECKPOINT_INTERVAL_SECONDS
+
+
+# -------------------------
+# STARTUP / SHUTDOWN
+# -------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Applies pending schema migrations once per process start
+    initialize_database()
+    writer.start()
+    pdf_templates.load_all()
+    start_pools()
+    checkpoints = None
+    if CHECKPOINT_INTERVAL_SECONDS > 0:
+        checkpoints = asyncio.create_task(run_checkpoints())
+    yield
+    if checkpoints is not None:
+        checkpoints.cancel()
+    shutdown_jobs()
+    shutdown_pools()
+    writer.stop()
+    pool.close_all()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # -------------------------
 # CORS CONFIGURATION
@@ -30,9 +66,9 @@ app.add_middleware(
 )
 
 # -------------------------
-# DATABASE INITIALIZATION
+# METRICS (outermost: times the whole request, CORS included)
 # -------------------------
-initialize_database()
+app.add_middleware(MetricsMiddleware)
 
 # -------------------------
 # ROUTERS
@@ -49,6 +85,11 @@ app.include_router(exits.router, prefix="/api/exits", tags=["Exits"])
 app.include_router(exits_print.router, prefix="/api/exits-print", tags=["Exits Print"])
 
 app.include_router(po.router, prefix="/api/po", tags=["Purchase Orders"])
+app.include_router(batch_print.router, prefix="/api/print", tags=["Batch Print"])
+app.include_router(stock.router, prefix="/api/stock", tags=["Stock"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
+app.include_router(valuation.router, prefix="/api/valuation", tags=["Valuation"])
+app.include_router(metrics.router, tags=["Metrics"])
 
 # Pages router (must remain public)
 app.include_router(pages.router)
@@ -1,15 +1,16 @@
 # backend/routers/auth.py
 from fastapi import APIRouter, HTTPException, Response, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import bcrypt
 
-from backend.services.auth_service import get_user, verify_password
+from backend.services.auth_service import get_user, verify_password, create_first_user
 from backend.services.jwt_service import (
     create_access_token,
     create_refresh_token,
     verify_refresh_token
 )
 from backend.core.database import get_connection
+from backend.core.executors import auth_pool
 
 router = APIRouter()
 
@@ -49,18 +50,20 @@ def is_user_table_empty():
 # LOGIN ROUTE (bootstrap + normal)
 # ===================================
 @router.post("/login")
-def login(user: UserLogin, response: Response):
+async def login(user: UserLogin, response: Response):
 
     # BOOTSTRAP MODE
-    if is_user_table_empty():
+    if await run_in_threadpool(is_user_table_empty):
         if user.username == BOOTSTRAP_USERNAME and user.password == BOOTSTRAP_PASSWORD:
             return {"bootstrap": True}
         else:
             raise HTTPException(400, "Invalid bootstrap credentials")
 
-    # NORMAL LOGIN
-    user_record = get_user(user.username)
-    if not user_record or not verify_password(user.password, user_record["password_hash"]):
+    # NORMAL LOGIN (bcrypt runs in the auth process pool)
+    user_record = await run_in_threadpool(get_user, user.username)
+    if not user_record or not await auth_pool.run(
+        verify_password, user.password, user_record["password_hash"]
+    ):
         raise HTTPException(400, "Invalid username or password")
 
     # Generate tokens
@@ -90,22 +93,10 @@ def login(user: UserLogin, response: Response):
 @router.post("/bootstrap-create-admin")
 def bootstrap_create_admin(payload: BootstrapAdmin):
 
-    if not is_user_table_empty():
+    # Cheap check before hashing; create_first_user re-checks under the write lock
+    if not is_user_table_empty() or not create_first_user(payload.username, payload.password):
         raise HTTPException(403, "Bootstrap mode disabled — users already exist.")
 
-    conn = get_connection()
-    cur = conn.cursor()
-
-    hashed = bcrypt.hashpw(payload.password.encode(), bcrypt.gensalt()).decode()
-
-    cur.execute("""
-        INSERT INTO users (username, password_hash)
-        VALUES (?, ?)
-    """, (payload.username, hashed))
-
-    conn.commit()
-    conn.close()
-
     return {"success": True, "message": "Master admin account created."}
 
 
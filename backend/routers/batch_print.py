@@ -0,0 +1,67 @@
+# backend/routers/batch_print.py
+from datetime import date
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse
+from pydantic import BaseModel, Field
+
+from backend.core.security import get_current_user
+from backend.services.batch_print_service import (
+    resolve_ids,
+    start_job,
+    get_job,
+    cancel_job,
+)
+
+router = APIRouter()
+
+
+class BatchPrintRequest(BaseModel):
+    kind: Literal["po", "exit"]
+    format: Literal["pdf", "zip"] = "zip"
+    ids: Optional[List[int]] = Field(None, max_length=5000)
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+
+def _job_response(job, status_code: int = 200):
+    body = job.to_dict()
+    body["status_url"] = f"/api/print/jobs/{job.id}"
+    if job.status == "done":
+        body["download_url"] = f"/api/print/jobs/{job.id}/download"
+    return JSONResponse(body, status_code=status_code)
+
+
+@router.post("/batch")
+async def create_batch(payload: BatchPrintRequest, user = Depends(get_current_user)):
+    """
+    Starts a batch print of POs or exits, selected by ids or by a
+    created_at range. Returns 202 with the job to poll for progress.
+    """
+    ids = await run_in_threadpool(
+        resolve_ids, payload.kind, payload.ids, payload.date_from, payload.date_to
+    )
+    job = start_job(payload.kind, payload.format, ids, user)
+    return _job_response(job, status_code=202)
+
+
+@router.get("/jobs/{job_id}")
+def batch_status(job_id: str, user = Depends(get_current_user)):
+    return _job_response(get_job(job_id, user))
+
+
+@router.get("/jobs/{job_id}/download")
+def batch_download(job_id: str, user = Depends(get_current_user)):
+    job = get_job(job_id, user)
+    if job.status != "done":
+        return _job_response(job, status_code=409)
+
+    return FileResponse(job.path, media_type=job.media_type, filename=job.filename)
+
+
+@router.delete("/jobs/{job_id}")
+def batch_cancel(job_id: str, user = Depends(get_current_user)):
+    cancel_job(get_job(job_id, user))
+    return {"status": "ok"}
@@ -0,0 +1,19 @@
+# backend/routers/dashboard.py
+from fastapi import APIRouter, Depends, Query
+
+from backend.core.security import get_current_user
+from backend.services.dashboard_service import get_summary
+
+router = APIRouter()
+
+
+@router.get("/summary")
+def dashboard_summary(
+    days: int = Query(30, ge=1, le=366, description="Days of entries/exits history"),
+    user = Depends(get_current_user)
+):
+    """
+    Inventory value, stock per category, PO counts/values per status and
+    daily entries/exits, all read from incrementally maintained tables.
+    """
+    return get_summary(days)
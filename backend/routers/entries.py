@@ -1,68 +1,65 @@
-from fastapi import APIRouter, HTTPException, Response, Depends
-from backend.core.database import get_connection
-from backend.core.security import get_current_user
-import pandas as pd
-import io
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from backend.core.executors import export_pool
+from backend.core.exports import EXPORT_FORMATS
+from backend.core.security import get_current_user_async
+from backend.services.entries_service import list_entries, export_entries
+from backend.services.read_service import read
 
 router = APIRouter()
 
 
 @router.get("/")
-def list_entries(user = Depends(get_current_user)):
-    conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT 
-            eh.id,
-            eh.received_at,
-            eh.po_number,
-            eh.supplier_cnpj,
-            eh.product_code AS product_code,
-            eh.description,
-            eh.unit,
-            eh.qty,
-            eh.unit_cost,
-            eh.line_total,
-            s.name AS supplier_name
-        FROM entries_history eh
-        LEFT JOIN suppliers s ON s.cnpj = eh.supplier_cnpj
-        ORDER BY eh.received_at DESC
-    """)
-
-    rows = cur.fetchall()
-    conn.close()
-
-    return {"entries": [dict(r) for r in rows]}
+async def list_entries_route(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    supplier: Optional[str] = Query(None, description="Supplier CNPJ or part of its name"),
+    product_code: Optional[str] = None,
+    po_number: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    user = Depends(get_current_user_async)
+):
+    """
+    Entries history, newest first. Pass `limit` for keyset pagination
+    (then `cursor` = the previous page's next_cursor); without it the
+    full filtered list is returned.
+    """
+    return await read(
+        list_entries,
+        date_from=date_from,
+        date_to=date_to,
+        supplier=supplier,
+        product_code=product_code,
+        po_number=po_number,
+        limit=limit,
+        cursor=cursor
+    )
 
 
 @router.get("/export")
-def export_entries_to_excel(user = Depends(get_current_user)):
-    conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT 
-            id, received_at, po_number, supplier_cnpj,
-            product_code, description, unit,
-            qty, unit_cost, line_total
-        FROM entries_history
-        ORDER BY received_at DESC
-    """)
-
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-
-    df = pd.DataFrame(rows)
-
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Entries")
-
-    output.seek(0)
+async def export_entries_route(
+    format: str = Query("xlsx", regex="^(xlsx|csv|parquet)$"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    supplier: Optional[str] = Query(None, description="Supplier CNPJ or part of its name"),
+    product_code: Optional[str] = None,
+    po_number: Optional[int] = None,
+    user = Depends(get_current_user_async)
+):
+    """
+    Streams the entries history as XLSX (default), CSV or Parquet,
+    page by page, so memory stays flat and the download starts at once.
+    Pages are queried and encoded on the export pool (503 when full).
+    """
+    chunks = export_entries(format, date_from, date_to, supplier, product_code, po_number)
+    media_type, ext = EXPORT_FORMATS[format]
 
-    return Response(
-        content=output.read(),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=entries_history.xlsx"}
+    return StreamingResponse(
+        export_pool.stream(chunks, task=f"entries_{format}"),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=entries_history.{ext}"}
     )
@@ -4,10 +4,12 @@ from typing import List, Optional
 from datetime import date
 import traceback
 
-from backend.core.security import get_current_user
+from backend.core.security import get_current_user, get_current_user_async
+from backend.services.read_service import read
 from backend.services.exits_service import (
     create_exit,
-    get_all_exits,
+    create_exits,
+    list_exits,
     get_exit_details
 )
 
@@ -31,6 +33,10 @@ class ExitCreate(BaseModel):
     items: List[ExitItemInput]
 
 
+class ExitBulkCreate(BaseModel):
+    exits: List[ExitCreate] = Field(..., min_length=1, max_length=1000)
+
+
 class ExitItemResponse(BaseModel):
     product_code: str
     description: Optional[str]
@@ -74,6 +80,9 @@ def create_exit_route(payload: ExitCreate, user = Depends(get_current_user)):
         )
         return result
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         print("\n================ EXIT CREATE ERROR ================")
         traceback.print_exc()
@@ -81,12 +90,42 @@ def create_exit_route(payload: ExitCreate, user = Depends(get_current_user)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# ============================================================
+# BULK CREATE (warehouse scanner batches)
+# ============================================================
+
+@router.post("/bulk")
+def create_exits_bulk_route(payload: ExitBulkCreate, user = Depends(get_current_user)):
+    """
+    Create many exits in one request and one write transaction.
+    Exits that fail validation are returned under "failed" by index.
+    """
+    try:
+        result = create_exits(
+            exits=[ex.dict() for ex in payload.exits],
+            created_by=user["id"]
+        )
+        return {
+            "success": not result["failed"],
+            "data": result
+        }
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        print("\n================ EXIT BULK ERROR ================")
+        traceback.print_exc()
+        print("=================================================\n")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # ============================================================
 # LIST EXITS (filter, sort, pagination)
 # ============================================================
 
 @router.get("/list")
-def list_exits_route(
+async def list_exits_route(
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=500),
     destination: Optional[str] = None,
@@ -94,37 +133,41 @@ def list_exits_route(
     date_from: Optional[date] = None,
     date_to: Optional[date] = None,
     sort: str = Query("desc", regex="^(asc|desc)$"),
-    user = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    with_total: bool = True,
+    user = Depends(get_current_user_async)
 ):
     """
     Advanced exit listing with filters and pagination.
+    Filtering, sorting and paging run in SQL; pass `cursor` (the
+    previous page's next_cursor) for keyset pagination.
     """
     try:
-        all_exits = get_all_exits()
-
-        filtered = all_exits
-
-        if destination:
-            filtered = [e for e in filtered if destination.lower() in e["destination"].lower()]
-        if date_from:
-            filtered = [e for e in filtered if e["created_at"] >= date_from.isoformat()]
-        if date_to:
-            filtered = [e for e in filtered if e["created_at"] <= date_to.isoformat()]
-
-        filtered = sorted(filtered, key=lambda e: e["created_at"], reverse=(sort == "desc"))
-
-        start = (page - 1) * limit
-        end = start + limit
-        paginated = filtered[start:end]
+        result = await read(
+            list_exits,
+            destination=destination,
+            product_code=product_code,
+            date_from=date_from,
+            date_to=date_to,
+            sort=sort,
+            page=page,
+            limit=limit,
+            cursor=cursor,
+            with_total=with_total
+        )
 
         return {
             "success": True,
-            "total": len(filtered),
+            "total": result["total"],
             "page": page,
             "limit": limit,
-            "data": paginated
+            "next_cursor": result["next_cursor"],
+            "data": result["data"]
         }
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         print("\n================ EXIT LIST ERROR ================")
         traceback.print_exc()
@@ -137,12 +180,12 @@ def list_exits_route(
 # ============================================================
 
 @router.get("/{exit_id}", response_model=ExitDetailResponse)
-def exit_detail_route(exit_id: int, user = Depends(get_current_user)):
+async def exit_detail_route(exit_id: int, user = Depends(get_current_user_async)):
     """
     Return exit header + items
     """
     try:
-        details = get_exit_details(exit_id)
+        details = await read(get_exit_details, exit_id)
         if not details:
             raise HTTPException(status_code=404, detail="Exit not found")
         return details
@@ -0,0 +1,23 @@
+# backend/routers/metrics.py
+import hmac
+import os
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+from backend.core.metrics import render_metrics, CONTENT_TYPE
+
+router = APIRouter()
+
+# Scrapers usually cannot log in: optionally require a static bearer token
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(authorization: str = Header(None)):
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+    body = await run_in_threadpool(render_metrics)
+    return Response(body, media_type=CONTENT_TYPE)
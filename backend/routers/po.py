@@ -1,360 +1,147 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
-from backend.core.database import get_connection
-from backend.core.security import get_current_user
-from backend.services.po_service import receive_po
-import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import ImageReader
-from reportlab.lib import colors
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import date
+from backend.core.security import get_current_user, get_current_user_async
+from backend.core.responses import bytes_response, not_modified
+from backend.services.po_service import (
+    create_po, create_pos, list_pos, get_po_details, set_po_status, receive_po, receive_pos, get_po_document
+)
+from backend.services.read_service import read
+from backend.services.pdf_service import po_file_number
+from backend.services.document_service import po_digest, get_po_pdf
 
 router = APIRouter()
 
 
-@router.post("/create/")
-def create_po(payload: dict, user = Depends(get_current_user)):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        # insert header
-        cur.execute("""
-          INSERT INTO purchase_orders (
-              po_code,
-              supplier_cnpj, supplier_name, supplier_address, supplier_neighborhood,
-              supplier_city, supplier_state, supplier_cep, supplier_pix, supplier_contact,
+class POItemInput(BaseModel):
+    code: str = Field(..., min_length=1, example="P001")
+    description: Optional[str] = Field(None, example="Parafuso 6mm")   # default: catalog
+    unit: Optional[str] = Field(None, example="UN")                    # default: catalog
+    qty: float = Field(..., gt=0, example=10)
+    price: float = Field(..., ge=0, example=2.50)
 
-              buyer_cnpj, buyer_name, buyer_address, buyer_neighborhood,
-              buyer_city, buyer_state, buyer_cep, buyer_pix, buyer_contact,
 
-              notes
-          )
-          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            None,
-            payload.get("supplier_cnpj"),
-            payload.get("supplier_name"),
-            payload.get("supplier_address"),
-            payload.get("supplier_neighborhood"),
-            payload.get("supplier_city"),
-            payload.get("supplier_state"),
-            payload.get("supplier_cep"),
-            payload.get("supplier_pix"),
-            payload.get("supplier_contact"),
+class POCreate(BaseModel):
+    supplier_cnpj: Optional[str] = None
+    supplier_name: Optional[str] = None
+    supplier_address: Optional[str] = None
+    supplier_neighborhood: Optional[str] = None
+    supplier_city: Optional[str] = None
+    supplier_state: Optional[str] = None
+    supplier_cep: Optional[str] = None
+    supplier_pix: Optional[str] = None
+    supplier_contact: Optional[str] = None
 
-            payload.get("buyer_cnpj"),
-            payload.get("buyer_name"),
-            payload.get("buyer_address"),
-            payload.get("buyer_neighborhood"),
-            payload.get("buyer_city"),
-            payload.get("buyer_state"),
-            payload.get("buyer_cep"),
-            payload.get("buyer_pix"),
-            payload.get("buyer_contact"),
+    buyer_cnpj: Optional[str] = None
+    buyer_name: Optional[str] = None
+    buyer_address: Optional[str] = None
+    buyer_neighborhood: Optional[str] = None
+    buyer_city: Optional[str] = None
+    buyer_state: Optional[str] = None
+    buyer_cep: Optional[str] = None
+    buyer_pix: Optional[str] = None
+    buyer_contact: Optional[str] = None
 
-            payload.get("notes", "")
-        ))
+    notes: Optional[str] = ""
+    items: List[POItemInput] = Field(..., min_length=1)
 
-        po_number = cur.lastrowid
-        po_code = f"PO{po_number:06d}"
 
-        cur.execute("UPDATE purchase_orders SET po_code = ? WHERE po_number = ?",
-                    (po_code, po_number))
+class POBulkCreate(BaseModel):
+    purchase_orders: List[POCreate] = Field(..., min_length=1, max_length=500)
 
-        # insert items
-        items = payload.get("items", [])
-        for it in items:
-            qty = float(it.get("qty", 0))
-            price = float(it.get("price", 0))
-            line_total = qty * price
 
-            cur.execute("""
-              INSERT INTO po_items (po_number, item_code, description, unit, qty, unit_price, line_total)
-              VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                po_number,
-                it.get("code"),
-                it.get("description"),
-                it.get("unit"),
-                qty,
-                price,
-                line_total
-            ))
+class BulkReceive(BaseModel):
+    po_numbers: List[int] = Field(..., min_length=1, max_length=500)
 
-        conn.commit()
-        return {"po_number": po_number, "po_code": po_code}
 
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+@router.post("/create/")
+def create_po_route(payload: POCreate, user = Depends(get_current_user)):
+    """
+    Create a draft (OPEN) PO. Item codes and units are validated against
+    the product catalog; blank descriptions and units are filled from it.
+    """
+    return create_po(payload.dict())
+
 
-    finally:
-        conn.close()
+@router.post("/bulk")
+def create_pos_bulk_route(payload: POBulkCreate, user = Depends(get_current_user)):
+    """
+    Create many draft POs in one request and one write transaction.
+    POs that fail validation are returned under "failed" by index.
+    """
+    result = create_pos([po.dict() for po in payload.purchase_orders])
+    return {
+        "success": not result["failed"],
+        "data": result
+    }
 
 
 @router.get("/")
-def list_pos(user = Depends(get_current_user)):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT po_number, po_code, supplier_name, created_at, status FROM purchase_orders ORDER BY created_at DESC")
-    rows = cur.fetchall()
-    conn.close()
-    return {"purchase_orders": [dict(r) for r in rows]}
+async def list_pos_route(
+    status: Optional[str] = Query(None, regex="^(OPEN|APPROVED|RECEIVED|CANCELLED)$"),
+    supplier: Optional[str] = Query(None, description="CNPJ, or part of the supplier name"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    sort: str = Query("desc", regex="^(asc|desc)$"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    user = Depends(get_current_user_async)
+):
+    """
+    PO headers with item count and total value, newest first.
+    Pass the previous page's next_cursor as `cursor` for the next page.
+    """
+    result = await read(
+        list_pos,
+        status=status,
+        supplier=supplier,
+        date_from=date_from,
+        date_to=date_to,
+        sort=sort,
+        limit=limit,
+        cursor=cursor,
+        with_total=with_total
+    )
+    return {
+        "purchase_orders": result["data"],
+        "total": result["total"],
+        "next_cursor": result["next_cursor"]
+    }
 
 
 @router.get("/{po_number}/")
-def get_po(po_number: int, user = Depends(get_current_user)):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT
-            po_number,
-            po_code,
-
-            supplier_cnpj, supplier_name, supplier_address, supplier_neighborhood,
-            supplier_city, supplier_state, supplier_cep, supplier_pix, supplier_contact,
-
-            buyer_cnpj, buyer_name, buyer_address, buyer_neighborhood,
-            buyer_city, buyer_state, buyer_cep, buyer_pix, buyer_contact,
-
-            created_at, status, notes
-        FROM purchase_orders
-        WHERE po_number = ?
-    """, (po_number,))
-    header = cur.fetchone()
-    cur.execute("SELECT item_code, description, unit, qty, unit_price, line_total FROM po_items WHERE po_number = ?", (po_number,))
-    items = cur.fetchall()
-    conn.close()
-    return {"header": dict(header) if header else None, "items": [dict(r) for r in items]}
+async def get_po(po_number: int, user = Depends(get_current_user_async)):
+    return await read(get_po_details, po_number)
 
 
 @router.post("/{po_number}/status")
 def update_po_status(po_number: int, payload: dict, user = Depends(get_current_user)):
     new_status = payload.get("status")
-
-    if new_status not in ("OPEN", "APPROVED", "CANCELLED"):
-        raise HTTPException(status_code=400, detail="Invalid status")
-
-    conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute("SELECT status FROM purchase_orders WHERE po_number = ?", (po_number,))
-    row = cur.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="PO not found")
-
-    current_status = row["status"]
-
-    # Business rules
-    if current_status != "OPEN":
-        raise HTTPException(status_code=400, detail="Cannot change status of non-OPEN PO")
-
-    cur.execute("""
-        UPDATE purchase_orders
-        SET status = ?
-        WHERE po_number = ?
-    """, (new_status, po_number))
-
-    conn.commit()
-    conn.close()
-
+    set_po_status(po_number, new_status)
     return {"success": True, "new_status": new_status}
 
 
 @router.get("/{po_number}/pdf/", response_class=StreamingResponse)
-def download_po_pdf(po_number: int, user = Depends(get_current_user)):
-    # Fetch PO Data
-    conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT
-            po_number, po_code,
-            supplier_cnpj, supplier_name, supplier_address, supplier_neighborhood,
-            supplier_city, supplier_state, supplier_cep, supplier_pix, supplier_contact,
-            buyer_cnpj, buyer_name, buyer_address, buyer_neighborhood,
-            buyer_city, buyer_state, buyer_cep, buyer_pix, buyer_contact,
-            created_at, status, notes
-        FROM purchase_orders
-        WHERE po_number = ?
-    """, (po_number,))
-    row = cur.fetchone()
-    if not row:
+async def download_po_pdf(po_number: int, request: Request, user = Depends(get_current_user)):
+    # Fetch PO Data (thread pool); render only on a cache miss
+    doc = await run_in_threadpool(get_po_document, po_number)
+    if not doc:
         raise HTTPException(status_code=404, detail="PO not found")
-    header = dict(row)
-
-    cur.execute("""
-        SELECT item_code, description, unit, qty, unit_price, line_total
-        FROM po_items
-        WHERE po_number = ?
-    """, (po_number,))
-    items = [dict(r) for r in cur.fetchall()]
-    conn.close()
-
-    # PDF Setup
-    buffer = io.BytesIO()
-    PAGE_WIDTH, PAGE_HEIGHT = A4
-    c = canvas.Canvas(buffer, pagesize=A4)
-
-    # Background template
-    template_path = "frontend/assets/po_template.png"
-    try:
-        bg = ImageReader(template_path)
-        c.drawImage(bg, 0, 0, width=PAGE_WIDTH, height=PAGE_HEIGHT)
-    except:
-        bg = None
-
-    # Format money helper
-    def fmt(v):
-        try:
-            return f"R$ {float(v):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        except:
-            return str(v)
-
-    c.setFont("Helvetica", 9)
-
-    # MANUAL COORDINATES — EDIT FREELY
-    pix_x = 65; pix_y = PAGE_HEIGHT - 162
-    date_x = 190; date_y = PAGE_HEIGHT - 162
-    seller_name_x = 375; seller_name_y = PAGE_HEIGHT - 162
-    seller_phone_x = 455; seller_phone_y = PAGE_HEIGHT - 162
-
-    supplier_center_x = 170
-    buyer_center_x    = 420
 
-    supplier_start_y = PAGE_HEIGHT - 80
-    buyer_start_y    = PAGE_HEIGHT - 80
+    digest = po_digest(doc)
+    po_clean = po_file_number(doc["header"])
+    headers = {"Content-Disposition": f"attachment; filename=PO_{po_clean}.pdf"}
 
-    line_spacing = 12
+    cached = not_modified(request, digest)
+    if cached is not None:
+        return cached
 
-    # DRAW TOP FIELDS
-    supplier_contact = header.get("supplier_contact", "")
-    parts = supplier_contact.split("-")
-
-    seller_name = parts[0].strip() if len(parts) > 0 else ""
-    seller_phone = parts[1].strip() if len(parts) > 1 else ""
-
-    c.drawString(pix_x, pix_y, header.get("supplier_pix",""))
-    c.drawString(date_x, date_y, header.get("created_at","")[:10])
-    c.drawString(seller_name_x, seller_name_y, seller_name)
-    c.drawString(seller_phone_x, seller_phone_y, seller_phone)
-
-    # CENTERED SUPPLIER BLOCK
-    y = supplier_start_y
-
-    def center(text, cx, y_pos):
-        c.drawCentredString(cx, y_pos, text)
-
-    center(header.get("supplier_cnpj",""), supplier_center_x, y); y -= line_spacing
-    center(header.get("supplier_name",""), supplier_center_x, y); y -= line_spacing
-    center(header.get("supplier_address",""), supplier_center_x, y); y -= line_spacing
-    center(
-        f"{header.get('supplier_neighborhood','')} - "
-        f"{header.get('supplier_city','')} - "
-        f"{header.get('supplier_state','')}",
-        supplier_center_x, y
-    ); y -= line_spacing
-    center(header.get("supplier_cep",""), supplier_center_x, y); y -= line_spacing
-
-    # CENTERED BUYER BLOCK
-    y = buyer_start_y
-
-    center(header.get("buyer_cnpj",""), buyer_center_x, y); y -= line_spacing
-    center(header.get("buyer_name",""), buyer_center_x, y); y -= line_spacing
-    center(header.get("buyer_address",""), buyer_center_x, y); y -= line_spacing
-    center(
-        f"{header.get('buyer_neighborhood','')} - "
-        f"{header.get('buyer_city','')} - "
-        f"{header.get('buyer_state','')}",
-        buyer_center_x, y
-    ); y -= line_spacing
-    center(header.get("buyer_cep",""), buyer_center_x, y); y -= line_spacing
-
-    # PO NUMBER
-    po_raw = header.get("po_code") or header.get("po_number")
-    po_clean = str(po_raw).replace("PO","")
-
-    po_x = 485
-    po_y = PAGE_HEIGHT - 48
-
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(po_x, po_y, po_clean)
-    c.setFont("Helvetica", 9)
-
-    # ITEMS TABLE
-    table_xs = {
-        "code": 58,
-        "desc": 105,
-        "unit": 312,
-        "qty": 348,
-        "unit_price": 400,
-        "total": 480
-    }
-    table_y_start = PAGE_HEIGHT - 240
-    row_height = 18
-    max_rows_per_page = 18
-
-    c.setFont("Helvetica", 9)
-    y = table_y_start - row_height
-    subtotal = 0.0
-    row_count = 0
-
-    for it in items:
-        if row_count >= max_rows_per_page:
-            c.showPage()
-            try:
-                if bg:
-                    c.drawImage(bg, 0, 0, width=PAGE_WIDTH, height=PAGE_HEIGHT)
-            except:
-                pass
-
-            c.setFont("Helvetica-Bold", 9)
-            c.drawString(table_xs["code"], table_y_start, "Code")
-            c.drawString(table_xs["desc"], table_y_start, "Description")
-            c.drawString(table_xs["unit"], table_y_start, "Unit")
-            c.drawString(table_xs["qty"], table_y_start, "Qty")
-            c.drawString(table_xs["unit_price"], table_y_start, "Unit Price")
-            c.drawString(table_xs["total"], table_y_start, "Total")
-
-            c.setFont("Helvetica", 9)
-            y = table_y_start - row_height
-            row_count = 0
-
-        code  = it.get("item_code") or it.get("code") or ""
-        desc  = (it.get("description") or "")[:80]
-        unit  = it.get("unit") or ""
-        qty   = it.get("qty") or 0
-        price = it.get("unit_price") or it.get("price") or 0
-        total = it.get("line_total") or (float(qty) * float(price))
-
-        c.drawString(table_xs["code"], y, str(code))
-        c.drawString(table_xs["desc"], y, desc)
-        c.drawString(table_xs["unit"], y, unit)
-        c.drawRightString(table_xs["qty"] + 20, y, str(qty))
-        c.drawRightString(table_xs["unit_price"] + 40, y, fmt(price))
-        c.drawRightString(table_xs["total"] + 40, y, fmt(total))
-
-        subtotal += float(total or 0)
-        y -= row_height
-        row_count += 1
-
-    # TOTAL
-    total_x = 397.5
-    total_y = 100.5
-
-    c.setFillColorRGB(1, 1, 1)
-    c.setFont("Helvetica-Bold", 10)
-    c.drawRightString(total_x + 120, total_y - 18, fmt(subtotal))
-
-    c.showPage()
-    c.save()
-    buffer.seek(0)
-
-    return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=PO_{po_clean}.pdf"}
-    )
+    pdf = await get_po_pdf(doc, digest)
+    return bytes_response(request, pdf, digest, "application/pdf", headers)
 
 
 @router.put("/{po_number}/receive")
@@ -372,3 +159,19 @@ def receive_purchase_order(po_number: int, user = Depends(get_current_user)):
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.put("/receive-bulk")
+def receive_purchase_orders(payload: BulkReceive, user = Depends(get_current_user)):
+    """
+    Receive many APPROVED POs in one call and one write transaction.
+    POs that cannot be received are listed under "failed".
+    """
+    try:
+        result = receive_pos(payload.po_numbers)
+        return {
+            "success": not result["failed"],
+            "data": result
+        }
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
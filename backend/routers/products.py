@@ -1,25 +1,88 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, UploadFile, File
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional
+import hashlib
+import json
+
 from backend.services.product_service import (
-    get_all_products,
+    get_catalog_version,
+    list_products,
+    iter_products,
+    search_products,
     get_product_by_code,
     insert_product,
-    update_product
+    update_product,
+    import_products
 )
-from backend.core.security import get_current_user
+from backend.core.imports import detect_format, read_table
+from backend.core.security import get_current_user, get_current_user_async
+from backend.services.read_service import read
 
 router = APIRouter()
 
-# GET ALL PRODUCTS
+
+def _catalog_etag(version: int, request: Request) -> str:
+    # Same catalog version + same query => same representation
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    digest = hashlib.sha1(query.encode()).hexdigest()[:12]
+    return f'W/"catalog-{version}-{digest}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [t.strip() for t in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+# GET ALL PRODUCTS (filters, projection, cursor pagination, NDJSON dump)
 @router.get("")
 @router.get("/")
-def api_get_products(current_user = Depends(get_current_user)):
-    return {"products": get_all_products()}
+async def api_get_products(
+    request: Request,
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    low_stock: Optional[float] = Query(None, description="Only products with stock <= this value"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    cursor: Optional[str] = None,
+    format: str = Query("json", regex="^(json|ndjson)$"),
+    current_user = Depends(get_current_user_async)
+):
+    version = await read(get_catalog_version)
+    etag = _catalog_etag(version, request)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    # Unchanged catalog: answer from the version counter alone
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+    if format == "ndjson":
+        rows = iter_products(category, subcategory, low_stock, field_list)
+        lines = (json.dumps(r) + "\n" for r in rows)
+        return StreamingResponse(lines, media_type="application/x-ndjson", headers=headers)
+
+    result = await read(list_products, category, subcategory, low_stock, field_list, limit, cursor)
+    return JSONResponse(result, headers=headers)
+
+
+# SEARCH PRODUCTS (typeahead) — declared before /{code}
+@router.get("/search")
+async def api_search_products(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    current_user = Depends(get_current_user_async)
+):
+    return {"products": await read(search_products, q, limit)}
 
 
 # GET PRODUCT BY CODE
 @router.get("/{code}")
-def api_get_product(code: str, current_user = Depends(get_current_user)):
-    product = get_product_by_code(code)
+async def api_get_product(code: str, current_user = Depends(get_current_user_async)):
+    product = await read(get_product_by_code, code)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return {"product": product}
@@ -51,3 +114,21 @@ def api_update_product(item: dict, current_user = Depends(get_current_user)):
         int(item["stock"])
     )
     return {"status": "ok", "message": "Item updated successfully"}
+
+
+# BULK IMPORT / UPSERT (CSV or XLSX)
+@router.post("/import")
+def api_import_products(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, regex="^(csv|xlsx)$", description="Default: from the file extension"),
+    dry_run: bool = False,
+    current_user = Depends(get_current_user)
+):
+    """
+    Creates or updates products from a spreadsheet with the columns
+    code, category, subcategory, description, unit and (optionally)
+    stock. Returns counts and a per-row error report; with dry_run=true
+    the file is only validated against the current catalog.
+    """
+    header, rows = read_table(detect_format(file.filename, format), file.file)
+    return import_products(header, rows, dry_run)
@@ -0,0 +1,54 @@
+# backend/routers/stock.py
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from backend.core.security import get_current_user
+from backend.services.stock_service import (
+    stock_at,
+    stock_at_all,
+    list_movements,
+    create_checkpoint,
+)
+
+router = APIRouter()
+
+
+# STOCK OF ALL PRODUCTS AT A POINT IN TIME
+@router.get("/at")
+def get_stock_at_all(
+    at: datetime = Query(..., description="UTC timestamp, e.g. 2025-01-31T23:59:59"),
+    category: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=5000),
+    cursor: Optional[str] = None,
+    user = Depends(get_current_user)
+):
+    return stock_at_all(at, category, limit, cursor)
+
+
+# STOCK OF ONE PRODUCT AT A POINT IN TIME
+@router.get("/{code}/at")
+def get_stock_at(
+    code: str,
+    at: datetime = Query(..., description="UTC timestamp, e.g. 2025-01-31T23:59:59"),
+    user = Depends(get_current_user)
+):
+    return stock_at(code, at)
+
+
+# MOVEMENT LEDGER OF ONE PRODUCT
+@router.get("/{code}/movements")
+def get_movements(
+    code: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    user = Depends(get_current_user)
+):
+    return list_movements(code, limit, cursor)
+
+
+# SNAPSHOT CURRENT STOCK (also runs periodically)
+@router.post("/checkpoints")
+def post_checkpoint(user = Depends(get_current_user)):
+    return create_checkpoint()
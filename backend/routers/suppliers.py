@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
-from backend.core.database import get_connection
-from backend.core.security import get_current_user
+from backend.core.security import get_current_user, get_current_user_async
+from backend.services.read_service import read
+from backend.services.supplier_service import list_suppliers, register_supplier
 
 router = APIRouter()
 
@@ -8,78 +9,31 @@ router = APIRouter()
 # GET ALL SUPPLIERS
 # -----------------------------
 @router.get("/", tags=["Suppliers"])
-def get_suppliers(user = Depends(get_current_user)):
-    conn = get_connection()
-    cur = conn.cursor()
+async def get_suppliers(user = Depends(get_current_user_async)):
     try:
-        cur.execute("""
-            SELECT 
-                cnpj, 
-                name, 
-                address, 
-                neighborhood, 
-                city, 
-                state, 
-                cep, 
-                seller, 
-                cellphone, 
-                pix
-            FROM suppliers
-        """)
-        rows = cur.fetchall()
-        suppliers = [dict(row) for row in rows]
-        return {"suppliers": suppliers}
+        return {"suppliers": await read(list_suppliers)}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
 
 # -----------------------------
 # REGISTER SUPPLIER
 # -----------------------------
 @router.post("/register/", tags=["Suppliers"])
-def register_supplier(item: dict, user = Depends(get_current_user)):
-    conn = get_connection()
-    cur = conn.cursor()
-
+def register_supplier_route(item: dict, user = Depends(get_current_user)):
     # Basic validation
     if not item.get("cnpj") or not item.get("name"):
         raise HTTPException(status_code=400, detail="CNPJ and Name are required.")
 
     try:
-        cur.execute("""
-            INSERT INTO suppliers (
-                cnpj,
-                name,
-                address,
-                neighborhood,
-                city,
-                state,
-                cep,
-                seller,
-                cellphone,
-                pix
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            item["cnpj"],
-            item["name"],
-            item.get("address", ""),
-            item.get("neighborhood", ""),
-            item.get("city", ""),
-            item.get("state", ""),
-            item.get("cep", ""),
-            item.get("seller", ""),
-            item.get("cellphone", ""),
-            item.get("pix", "")
-        ))
-
-        conn.commit()
+        register_supplier(item)
         return {"status": "ok", "message": "Supplier registered successfully."}
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         # UNIQUE constraint or any other problem
         raise HTTPException(status_code=409, detail=f"Supplier already exists or DB error: {str(e)}")
-
-    finally:
-        conn.close()
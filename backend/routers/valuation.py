@@ -0,0 +1,31 @@
+# backend/routers/valuation.py
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from backend.core.security import get_current_user
+from backend.services.cost_service import get_valuation, get_cost_of_goods
+
+router = APIRouter()
+
+
+# STOCK VALUED AT WEIGHTED-AVERAGE COST
+@router.get("/")
+def valuation(
+    category: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=5000),
+    cursor: Optional[str] = None,
+    user = Depends(get_current_user)
+):
+    return get_valuation(category, limit, cursor)
+
+
+# COST OF GOODS ISSUED (EXITS) IN A PERIOD
+@router.get("/cogs")
+def cost_of_goods(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user = Depends(get_current_user)
+):
+    return get_cost_of_goods(date_from, date_to)
@@ -1,7 +1,10 @@
 from passlib.context import CryptContext
-from backend.core.database import get_connection
+from backend.core.database import db_connection
+from backend.core.writer import writer
+from backend.core.cache import TTLCache
 from datetime import datetime, timedelta
 from jose import jwt
+import os
 
 
 SECRET_KEY = "change_this_later_to_a_strong_random_key"
@@ -10,6 +13,12 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Authenticated user records, keyed by username.
+# Invalidated on user creation; the TTL bounds
+# staleness for changes made outside this process.
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "300"))
+_user_cache = TTLCache(maxsize=1024, ttl=USER_CACHE_TTL_SECONDS)
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -18,39 +27,74 @@ def verify_password(plain: str, hashed: str) -> bool:
 
 import sqlite3
 
-def create_user(username: str, password: str):
-    hashed_pw = hash_password(password)
-    conn = get_connection()
-    cur = conn.cursor()
-
+def _create_user_locked(cur, username: str, password_hash: str):
     try:
         cur.execute(
             "INSERT INTO users (username, password_hash) VALUES (?, ?)",
-            (username, hashed_pw)
+            (username, password_hash)
         )
-        conn.commit()
     except sqlite3.IntegrityError:
-        conn.rollback()
         raise ValueError("User already exists")
-    finally:
-        conn.close()
 
 
-def get_user(username: str):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT id, username, password_hash FROM users WHERE username = ?", (username,))
-    row = cur.fetchone()
-    conn.close()
+def _create_first_user_locked(cur, username: str, password_hash: str) -> bool:
+    # Checked inside the write transaction: two bootstrap calls can't both win
+    if cur.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+        return False
+    _create_user_locked(cur, username, password_hash)
+    return True
+
+
+def create_user(username: str, password: str):
+    """Inserts a user (a job on the database writer); ValueError if the name is taken."""
+    writer.run(_create_user_locked, username, hash_password(password))
+    invalidate_user(username)
+
+
+def create_first_user(username: str, password: str) -> bool:
+    """Bootstrap admin: inserts the user only while the table is empty."""
+    created = writer.run(_create_first_user_locked, username, hash_password(password))
+    if created:
+        invalidate_user(username)
+    return created
+
+
+def invalidate_user(username: str):
+    """Drops the cached record; call after any change to the users row."""
+    _user_cache.invalidate(username)
+
+
+def user_cache_stats() -> dict:
+    return _user_cache.stats()
+
+
+def cached_user(username: str):
+    """The cached user record, or None without touching the database."""
+    user = _user_cache.get(username)
+    return dict(user) if user is not None else None
+
+
+def get_user(username: str, conn: sqlite3.Connection = None):
+    user = cached_user(username)
+    if user is not None:
+        return user
+
+    with db_connection(conn) as conn:
+        row = conn.execute(
+            "SELECT id, username, password_hash FROM users WHERE username = ?", (username,)
+        ).fetchone()
 
     if row is None:
         return None
 
-    return {
+    user = {
         "id": row[0],
         "username": row[1],
         "password_hash": row[2]
     }
+    _user_cache.set(username, user)
+
+    return dict(user)
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
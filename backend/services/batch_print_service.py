@@ -0,0 +1,346 @@
+"""
+Batch printing of POs and exit requests (month-end downloads).
+
+A job resolves its documents from explicit ids or a created_at range,
+loads them with two queries, then either:
+
+- "zip": renders the documents in parallel on the render worker pool
+  (through the document cache, so already rendered PDFs are reused) and
+  writes each one into a ZIP as soon as it is ready;
+- "pdf": draws every document into one multi-page PDF in a single
+  worker, so the background template is embedded once for the file.
+
+Jobs run in the background. Clients poll get_job() for progress and
+download the file once the status is "done". Finished jobs and their
+files are dropped after BATCH_JOB_TTL_SECONDS.
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+import zipfile
+from datetime import date, timedelta
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from backend.core.database import db_connection
+from backend.core.doc_cache import DOC_CACHE_DIR
+from backend.core.executors import render_pool
+from backend.services.document_service import po_digest, exit_digest, get_po_pdf, get_exit_pdf
+from backend.services.exits_service import get_exit_documents
+from backend.services.pdf_service import po_file_number, render_po_batch_pdf, render_exit_batch_pdf
+from backend.services.po_service import get_po_documents
+
+
+BATCH_DIR = os.environ.get("BATCH_PRINT_DIR", os.path.join(DOC_CACHE_DIR, "batch"))
+BATCH_MAX_DOCUMENTS = int(os.environ.get("BATCH_PRINT_MAX_DOCUMENTS", "500"))
+BATCH_MAX_ACTIVE_JOBS = int(os.environ.get("BATCH_PRINT_MAX_ACTIVE_JOBS", "4"))
+BATCH_JOB_TTL_SECONDS = int(os.environ.get("BATCH_JOB_TTL_SECONDS", "3600"))
+
+# Render retries when the pool is momentarily full (503 from admission)
+RENDER_RETRIES = 3
+
+
+# ======================================================
+# DOCUMENT KINDS
+# ======================================================
+
+async def _render_po(doc: dict) -> bytes:
+    return await get_po_pdf(doc, po_digest(doc))
+
+
+async def _render_exit(doc: dict) -> bytes:
+    return await get_exit_pdf(doc, exit_digest(doc))
+
+
+KINDS = {
+    "po": {
+        "table": "purchase_orders",
+        "id_column": "po_number",
+        "load": get_po_documents,
+        "doc_id": lambda doc: doc["header"]["po_number"],
+        "filename": lambda doc: f"PO_{po_file_number(doc['header'])}.pdf",
+        "render_one": _render_po,
+        "render_merged": render_po_batch_pdf,
+    },
+    "exit": {
+        "table": "exits",
+        "id_column": "id",
+        "load": get_exit_documents,
+        "doc_id": lambda doc: doc["exit"]["id"],
+        "filename": lambda doc: f"EXIT_{doc['exit']['id']}.pdf",
+        "render_one": _render_exit,
+        "render_merged": render_exit_batch_pdf,
+    },
+}
+
+FORMATS = {
+    "pdf": ("application/pdf", "pdf"),
+    "zip": ("application/zip", "zip"),
+}
+
+
+def resolve_ids(kind: str, ids: list = None, date_from: date = None, date_to: date = None) -> list:
+    """
+    Document ids for a batch: the given ids (deduplicated, order kept) or
+    every document created in [date_from, date_to] (date_to inclusive).
+    """
+    spec = KINDS[kind]
+
+    if ids:
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > BATCH_MAX_DOCUMENTS:
+            raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_DOCUMENTS} documents per batch")
+        return ids
+
+    if not date_from and not date_to:
+        raise HTTPException(status_code=400, detail="Provide ids or a date range")
+
+    where, params = [], []
+    if date_from:
+        where.append("created_at >= ?")
+        params.append(date_from.isoformat())
+    if date_to:
+        where.append("created_at < ?")
+        params.append((date_to + timedelta(days=1)).isoformat())
+
+    with db_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT {spec['id_column']}
+            FROM {spec['table']}
+            WHERE {" AND ".join(where)}
+            ORDER BY created_at, {spec['id_column']}
+            LIMIT ?
+        """, (*params, BATCH_MAX_DOCUMENTS + 1)).fetchall()
+
+    if len(rows) > BATCH_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range matches more than {BATCH_MAX_DOCUMENTS} documents, narrow it down"
+        )
+    if not rows:
+        raise HTTPException(status_code=404, detail="No documents in the given range")
+
+    return [r[0] for r in rows]
+
+
+# ======================================================
+# JOBS
+# ======================================================
+
+class BatchJob:
+
+    def __init__(self, kind: str, fmt: str, ids: list, created_by: int = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.format = fmt
+        self.ids = ids
+        self.created_by = created_by
+
+        self.status = "queued"       # queued -> running -> done | failed | cancelled
+        self.stage = None            # loading -> rendering -> done
+        self.total = len(ids)
+        self.completed = 0
+        self.failed = []             # [{"id", "detail"}]
+        self.error = None
+
+        self.path = None
+        self.size = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.task = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @property
+    def filename(self) -> str:
+        return f"{self.kind.upper()}_BATCH_{self.id[:8]}.{FORMATS[self.format][1]}"
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.format][0]
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "format": self.format,
+            "status": self.status,
+            "stage": self.stage,
+            "total": self.total,
+            "completed": self.completed,
+            "progress": round((self.completed + len(self.failed)) / self.total, 4) if self.total else 1.0,
+            "failed": self.failed,
+            "error": self.error,
+            "size": self.size,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def _remove_file(path: str):
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _purge_expired():
+    cutoff = time.time() - BATCH_JOB_TTL_SECONDS
+    with _jobs_lock:
+        expired = [j for j in _jobs.values() if j.finished_at and j.finished_at < cutoff]
+        for job in expired:
+            del _jobs[job.id]
+    for job in expired:
+        _remove_file(job.path)
+
+
+def get_job(job_id: str, user: dict) -> BatchJob:
+    """Job owned by `user`, or 404."""
+    _purge_expired()
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None or job.created_by != user.get("id"):
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+
+def start_job(kind: str, fmt: str, ids: list, user: dict) -> BatchJob:
+    """Registers a job and schedules it on the running event loop."""
+    _purge_expired()
+    with _jobs_lock:
+        if sum(1 for j in _jobs.values() if j.active) >= BATCH_MAX_ACTIVE_JOBS:
+            raise HTTPException(
+                status_code=503,
+                detail="Too many batch print jobs running, please retry",
+                headers={"Retry-After": "5"}
+            )
+        job = BatchJob(kind, fmt, ids, user.get("id"))
+        _jobs[job.id] = job
+
+    job.task = asyncio.get_running_loop().create_task(_run_job(job))
+    return job
+
+
+def cancel_job(job: BatchJob):
+    if job.task is not None and not job.task.done():
+        job.task.cancel()
+    with _jobs_lock:
+        _jobs.pop(job.id, None)
+    _remove_file(job.path)
+
+
+def shutdown_jobs():
+    """Cancels running jobs and removes their files (app shutdown)."""
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+        _jobs.clear()
+    for job in jobs:
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+        _remove_file(job.path)
+
+
+# ======================================================
+# EXECUTION
+# ======================================================
+
+async def _run_job(job: BatchJob):
+    spec = KINDS[job.kind]
+    job.status = "running"
+    job.stage = "loading"
+    try:
+        docs = await run_in_threadpool(spec["load"], job.ids)
+
+        found = {spec["doc_id"](d) for d in docs}
+        job.failed.extend({"id": i, "detail": "Not found"} for i in job.ids if i not in found)
+        if not docs:
+            raise HTTPException(status_code=404, detail="None of the requested documents exist")
+
+        os.makedirs(BATCH_DIR, exist_ok=True)
+        job.path = os.path.join(BATCH_DIR, f"{job.id}.{FORMATS[job.format][1]}")
+
+        job.stage = "rendering"
+        if job.format == "pdf":
+            await _write_merged(job, spec, docs)
+        else:
+            await _write_zip(job, spec, docs)
+
+        job.size = os.path.getsize(job.path)
+        job.stage = "done"
+        job.status = "done"
+    except asyncio.CancelledError:
+        job.status = "cancelled"
+        _remove_file(job.path)
+        raise
+    except HTTPException as e:
+        job.status = "failed"
+        job.error = e.detail
+        _remove_file(job.path)
+    except Exception as e:
+        print(f"Batch print job {job.id} failed: {e}")
+        job.status = "failed"
+        job.error = str(e)
+        _remove_file(job.path)
+    finally:
+        job.finished_at = time.time()
+
+
+async def _render_with_retry(render, *args) -> bytes:
+    """await render(*args), retrying while the render pool answers 503 (busy)."""
+    for attempt in range(RENDER_RETRIES):
+        try:
+            return await render(*args)
+        except HTTPException as e:
+            if e.status_code != 503 or attempt == RENDER_RETRIES - 1:
+                raise
+            await asyncio.sleep(0.5 * (attempt + 1))
+
+
+async def _write_zip(job: BatchJob, spec: dict, docs: list):
+    # One in-flight render per worker, so interactive downloads still get in
+    slots = asyncio.Semaphore(render_pool.workers)
+    write_lock = asyncio.Lock()
+
+    # PDFs are already compressed: store them as-is
+    archive = zipfile.ZipFile(job.path, "w", compression=zipfile.ZIP_STORED)
+
+    async def render(doc):
+        async with slots:
+            try:
+                pdf = await _render_with_retry(spec["render_one"], doc)
+            except HTTPException as e:
+                job.failed.append({"id": spec["doc_id"](doc), "detail": e.detail})
+                return
+        async with write_lock:
+            await run_in_threadpool(archive.writestr, spec["filename"](doc), pdf)
+        job.completed += 1
+
+    try:
+        await asyncio.gather(*(render(d) for d in docs))
+    finally:
+        await run_in_threadpool(archive.close)
+
+    if not job.completed:
+        raise HTTPException(status_code=500, detail="No document could be rendered")
+
+
+async def _write_merged(job: BatchJob, spec: dict, docs: list):
+    pdf = await _render_with_retry(render_pool.run, spec["render_merged"], docs)
+
+    def write():
+        with open(job.path, "wb") as f:
+            f.write(pdf)
+
+    await run_in_threadpool(write)
+    job.completed = len(docs)
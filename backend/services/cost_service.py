@@ -0,0 +1,187 @@
+"""
+Inventory costing (weighted average).
+
+product_costs holds one running average cost per product. It changes
+only on receipts:
+
+    new_avg = (stock_before * avg + received_value) / stock_after
+
+Exits and stock adjustments leave the average as it is, so an exit is
+costed with one primary-key lookup per product. The dashboard value
+(product_values / dashboard_categories) follows product_costs through
+triggers (migration 9), so valuation reports never replay history.
+"""
+import sqlite3
+from datetime import date, timedelta
+
+from backend.core.database import db_connection
+from backend.core.pagination import encode_cursor, decode_cursor
+
+
+# ============================================================
+# WRITES (inside the caller's transaction)
+# ============================================================
+
+def apply_po_receipt(cur: sqlite3.Cursor, po_number: int):
+    """
+    Folds a received PO into the average cost of its products.
+    Call after products.stock has been incremented for the PO.
+    """
+    cur.execute("""
+        INSERT INTO product_costs (product_code, avg_cost, updated_at)
+        SELECT p.code,
+               CASE
+                   WHEN c.avg_cost IS NULL OR p.stock - t.qty <= 0 OR p.stock <= 0
+                       THEN t.value / t.qty
+                   ELSE ((p.stock - t.qty) * c.avg_cost + t.value) / p.stock
+               END,
+               CURRENT_TIMESTAMP
+        FROM (
+            SELECT item_code, SUM(qty) AS qty, SUM(COALESCE(line_total, 0)) AS value
+            FROM po_items
+            WHERE po_number = ?
+            GROUP BY item_code
+        ) t
+        JOIN products p ON p.code = t.item_code
+        LEFT JOIN product_costs c ON c.product_code = p.code
+        WHERE t.qty > 0
+        ON CONFLICT(product_code) DO UPDATE SET
+            avg_cost = excluded.avg_cost,
+            updated_at = excluded.updated_at
+    """, (po_number,))
+
+
+def average_costs(cur: sqlite3.Cursor, codes: list) -> dict:
+    """{code: avg_cost} for the given products (missing ones are omitted)."""
+    if not codes:
+        return {}
+    placeholders = ", ".join("?" * len(codes))
+    cur.execute(f"""
+        SELECT product_code, avg_cost
+        FROM product_costs
+        WHERE product_code IN ({placeholders})
+    """, list(codes))
+    return {row[0]: row[1] for row in cur.fetchall()}
+
+
+# ============================================================
+# REPORTS
+# ============================================================
+
+def _money(v) -> float:
+    return round(v or 0.0, 2)
+
+
+def get_valuation(category: str = None, limit: int = 1000, cursor: str = None) -> dict:
+    """
+    Current stock valued at average cost, per product (code order,
+    keyset-paginated) plus totals per category.
+    """
+    where = []
+    params = []
+    if category is not None:
+        where.append("COALESCE(p.category, '') = ?")
+        params.append(category)
+    if cursor:
+        (after,) = decode_cursor(cursor, 1)
+        where.append("p.code > ?")
+        params.append(after)
+
+    sql = """
+        SELECT p.code, p.description, p.category, p.unit, p.stock,
+               c.avg_cost, c.updated_at AS cost_updated_at,
+               COALESCE(v.value, 0) AS value
+        FROM products p
+        LEFT JOIN product_costs c ON c.product_code = p.code
+        LEFT JOIN product_values v ON v.product_code = p.code
+    """
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY p.code LIMIT ?"
+    params.append(limit + 1)
+
+    with db_connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+        cat_sql = """
+            SELECT category, product_count, stock_qty, stock_value
+            FROM dashboard_categories
+            WHERE product_count > 0
+        """
+        cat_params = []
+        if category is not None:
+            cat_sql += " AND category = ?"
+            cat_params.append(category)
+        categories = conn.execute(cat_sql + " ORDER BY category", cat_params).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "total_value": _money(sum(r["stock_value"] for r in categories)),
+        "categories": [
+            {
+                "category": r["category"],
+                "products": r["product_count"],
+                "stock_qty": r["stock_qty"],
+                "value": _money(r["stock_value"]),
+            }
+            for r in categories
+        ],
+        "products": [
+            {
+                "code": r["code"],
+                "description": r["description"],
+                "category": r["category"],
+                "unit": r["unit"],
+                "stock": r["stock"],
+                "avg_cost": r["avg_cost"],
+                "value": _money(r["value"]),
+                "cost_updated_at": r["cost_updated_at"],
+            }
+            for r in rows
+        ],
+        "next_cursor": encode_cursor(rows[-1]["code"]) if has_more and rows else None
+    }
+
+
+def get_cost_of_goods(date_from: date = None, date_to: date = None) -> dict:
+    """
+    Cost of goods issued (exit line totals) per product over a
+    created_at range, date_to inclusive.
+    """
+    where, params = [], []
+    if date_from:
+        where.append("x.created_at >= ?")
+        params.append(date_from.isoformat())
+    if date_to:
+        where.append("x.created_at < ?")
+        params.append((date_to + timedelta(days=1)).isoformat())
+
+    sql = """
+        SELECT it.product_code, MAX(it.description) AS description,
+               SUM(it.qty) AS qty, SUM(COALESCE(it.line_total, 0)) AS cost
+        FROM exits x
+        JOIN exit_items it ON it.exit_id = x.id
+    """
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " GROUP BY it.product_code ORDER BY cost DESC, it.product_code"
+
+    with db_connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    return {
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "total_cost": _money(sum(r["cost"] for r in rows)),
+        "products": [
+            {
+                "product_code": r["product_code"],
+                "description": r["description"],
+                "qty": r["qty"],
+                "cost": _money(r["cost"]),
+            }
+            for r in rows
+        ],
+    }
@@ -0,0 +1,86 @@
+"""
+Dashboard summary.
+
+Reads only the summary tables maintained by triggers (migration 8), so
+the cost is bounded by the number of categories, PO statuses and days
+requested, not by how much history has accumulated.
+"""
+from datetime import datetime, timedelta, timezone
+
+from backend.core.database import db_connection
+
+
+OPEN_PO_STATUSES = ("OPEN", "APPROVED")
+
+
+def _money(v) -> float:
+    return round(v or 0.0, 2)
+
+
+def get_summary(days: int = 30) -> dict:
+    # Summary days are UTC dates (SQLite CURRENT_TIMESTAMP)
+    today = datetime.now(timezone.utc).date()
+    since = (today - timedelta(days=days - 1)).isoformat()
+
+    with db_connection() as conn:
+        categories = conn.execute("""
+            SELECT category, product_count, stock_qty, stock_value
+            FROM dashboard_categories
+            WHERE product_count > 0
+            ORDER BY category
+        """).fetchall()
+
+        statuses = conn.execute("""
+            SELECT status, po_count, total_value
+            FROM dashboard_po_status
+            WHERE po_count > 0
+        """).fetchall()
+
+        daily = conn.execute("""
+            SELECT day, entry_lines, entry_qty, entry_value, exit_count, exit_lines, exit_qty
+            FROM dashboard_daily
+            WHERE day >= ?
+            ORDER BY day
+        """, (since,)).fetchall()
+
+    purchase_orders = {
+        r["status"]: {"count": r["po_count"], "value": _money(r["total_value"])}
+        for r in statuses
+    }
+    open_pos = [purchase_orders[s] for s in OPEN_PO_STATUSES if s in purchase_orders]
+
+    return {
+        "inventory": {
+            "products": sum(r["product_count"] for r in categories),
+            "stock_qty": sum(r["stock_qty"] for r in categories),
+            "stock_value": _money(sum(r["stock_value"] for r in categories)),
+        },
+        "categories": [
+            {
+                "category": r["category"],
+                "products": r["product_count"],
+                "stock_qty": r["stock_qty"],
+                "stock_value": _money(r["stock_value"]),
+            }
+            for r in categories
+        ],
+        "purchase_orders": {
+            "by_status": purchase_orders,
+            "open": {
+                "count": sum(p["count"] for p in open_pos),
+                "value": _money(sum(p["value"] for p in open_pos)),
+            },
+        },
+        "daily": [
+            {
+                "day": r["day"],
+                "entry_lines": r["entry_lines"],
+                "entry_qty": r["entry_qty"],
+                "entry_value": _money(r["entry_value"]),
+                "exits": r["exit_count"],
+                "exit_lines": r["exit_lines"],
+                "exit_qty": r["exit_qty"],
+            }
+            for r in daily
+        ],
+    }
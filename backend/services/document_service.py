@@ -0,0 +1,55 @@
+"""
+Cached PO / exit PDFs.
+
+Looks up the rendered-document cache by content digest and only falls
+back to the render worker pool on a miss. Documents that can no longer
+change (exits, RECEIVED / CANCELLED POs) are also written to the disk
+tier.
+"""
+from fastapi.concurrency import run_in_threadpool
+
+from backend.core.doc_cache import doc_cache, document_digest
+from backend.core.executors import render_pool
+from backend.core.pdf_templates import template_signature
+from backend.services.pdf_service import RENDER_VERSION, render_po_pdf, render_exit_pdf
+
+
+FINAL_PO_STATUSES = ("RECEIVED", "CANCELLED")
+
+
+def po_digest(doc: dict) -> str:
+    return document_digest("po", RENDER_VERSION, template_signature("po"), doc["header"], doc["items"])
+
+
+def exit_digest(details: dict) -> str:
+    return document_digest("exit", RENDER_VERSION, template_signature("exit"), details["exit"], details["items"])
+
+
+async def _cached_render(kind: str, doc_id, digest: str, persist: bool, render_fn, *args) -> bytes:
+    pdf = await run_in_threadpool(doc_cache.get, kind, doc_id, digest)
+    if pdf is not None:
+        return pdf
+
+    pdf = await render_pool.run(render_fn, *args)
+    await run_in_threadpool(doc_cache.put, kind, doc_id, digest, pdf, persist)
+    return pdf
+
+
+async def get_po_pdf(doc: dict, digest: str) -> bytes:
+    header = doc["header"]
+    persist = header.get("status") in FINAL_PO_STATUSES
+    return await _cached_render(
+        "po", header["po_number"], digest, persist, render_po_pdf, header, doc["items"]
+    )
+
+
+async def get_exit_pdf(details: dict, digest: str) -> bytes:
+    header = details["exit"]
+    return await _cached_render(
+        "exit", header["id"], digest, True, render_exit_pdf, header, details["items"] or []
+    )
+
+
+def invalidate_po(po_number: int):
+    """Call after any change to a PO header or its items."""
+    doc_cache.invalidate("po", po_number)
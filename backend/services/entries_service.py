@@ -0,0 +1,142 @@
+import sqlite3
+from datetime import date, timedelta
+
+from backend.core.database import db_connection
+from backend.core.exports import stream_export, check_format
+from backend.core.pagination import encode_cursor, decode_cursor, like_pattern
+
+
+EXPORT_COLUMNS = [
+    "id", "received_at", "po_number", "supplier_cnpj", "supplier_name",
+    "product_code", "description", "unit",
+    "qty", "unit_cost", "line_total",
+]
+
+EXPORT_COLUMN_TYPES = {
+    "id": "int", "po_number": "int",
+    "qty": "float", "unit_cost": "float", "line_total": "float",
+}
+
+EXPORT_PAGE_SIZE = 5000
+
+
+ENTRY_COLUMNS = """
+    eh.id, eh.received_at, eh.po_number, eh.supplier_cnpj, eh.supplier_name,
+    eh.product_code, eh.description, eh.unit,
+    eh.qty, eh.unit_cost, eh.line_total
+"""
+
+
+def _entry_filters(date_from: date = None, date_to: date = None, supplier: str = None,
+                   product_code: str = None, po_number: int = None):
+    """
+    WHERE clause for entries_history (alias eh).
+    date_to is inclusive; supplier matches the CNPJ exactly or the
+    supplier name partially.
+    """
+    where, params = [], []
+
+    if date_from:
+        where.append("eh.received_at >= ?")
+        params.append(date_from.isoformat())
+
+    if date_to:
+        where.append("eh.received_at < ?")
+        params.append((date_to + timedelta(days=1)).isoformat())
+
+    if supplier:
+        where.append("(eh.supplier_cnpj = ? OR eh.supplier_name LIKE ? ESCAPE '\\')")
+        params.extend([supplier, like_pattern(supplier)])
+
+    if product_code:
+        where.append("eh.product_code = ?")
+        params.append(product_code)
+
+    if po_number is not None:
+        where.append("eh.po_number = ?")
+        params.append(po_number)
+
+    return where, params
+
+
+def _entries_page(where: list, params: list, after=None, limit: int = None,
+                  conn: sqlite3.Connection = None) -> list:
+    """One page newest first, strictly after the (received_at, id) key `after`."""
+    where, params = list(where), list(params)
+    if after is not None:
+        where.append("(eh.received_at, eh.id) < (?, ?)")
+        params.extend(after)
+
+    sql = f"SELECT {ENTRY_COLUMNS} FROM entries_history eh"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY eh.received_at DESC, eh.id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    with db_connection(conn) as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def list_entries(date_from: date = None, date_to: date = None, supplier: str = None,
+                 product_code: str = None, po_number: int = None,
+                 limit: int = None, cursor: str = None, conn: sqlite3.Connection = None):
+    """
+    Entries newest first, keyset-paginated on (received_at, id).
+    Without `limit` every matching row is returned (old behaviour).
+    Returns {"entries", "next_cursor"}.
+    """
+    where, params = _entry_filters(date_from, date_to, supplier, product_code, po_number)
+    after = decode_cursor(cursor, 2) if cursor else None
+
+    if limit is None:
+        rows = _entries_page(where, params, after, conn=conn)
+        return {"entries": [dict(r) for r in rows], "next_cursor": None}
+
+    # One extra row tells us whether a next page exists
+    rows = _entries_page(where, params, after, limit + 1, conn=conn)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(rows[-1]["received_at"], rows[-1]["id"])
+
+    return {"entries": [dict(r) for r in rows], "next_cursor": next_cursor}
+
+
+def iter_entry_pages(date_from: date = None, date_to: date = None, supplier: str = None,
+                     product_code: str = None, po_number: int = None,
+                     page_size: int = EXPORT_PAGE_SIZE):
+    """
+    Entries (newest first) as lists of row tuples, `page_size` rows at a
+    time. Each page is a separate keyset query on (received_at, id), so
+    no read transaction or pooled connection is held while the client
+    consumes the previous page.
+    """
+    where, params = _entry_filters(date_from, date_to, supplier, product_code, po_number)
+
+    after = None
+    while True:
+        rows = _entries_page(where, params, after, page_size)
+        if not rows:
+            return
+
+        yield [tuple(r) for r in rows]
+
+        if len(rows) < page_size:
+            return
+        after = (rows[-1]["received_at"], rows[-1]["id"])
+
+
+def export_entries(fmt: str = "xlsx", date_from: date = None, date_to: date = None,
+                   supplier: str = None, product_code: str = None, po_number: int = None):
+    """
+    Byte-chunk iterator of the entries history in `fmt` (xlsx, csv or
+    parquet). The format is validated before anything is streamed.
+    """
+    check_format(fmt)
+    pages = iter_entry_pages(date_from, date_to, supplier, product_code, po_number)
+    return stream_export(fmt, EXPORT_COLUMNS, pages, sheet_name="Entries",
+                         column_types=EXPORT_COLUMN_TYPES)
@@ -1,148 +1,328 @@
 import sqlite3
-from datetime import datetime
+from datetime import date, timedelta
 
 from fastapi import HTTPException                     # <-- REQUIRED IMPORT FIX
 
-from backend.core.database import get_connection
-from backend.services.product_service import subtract_quantity
+from backend.core.database import db_connection
+from backend.core.pagination import encode_cursor, decode_cursor, like_pattern
+from backend.core.sequences import next_code, next_codes
+from backend.core.writer import writer
+from backend.services.cost_service import average_costs
+from backend.services.stock_service import record_movements
+
+
+def _create_exit_locked(cur, exit_code: str, destination: str, items: list,
+                        notes: str = None, created_by: int = None) -> int:
+    """
+    Creates one exit inside the caller's write transaction.
+
+    Quantities are aggregated per product first, so a product repeated on
+    several lines is checked against its total, and stock is validated
+    for all products with a single SELECT. Returns the new exit id.
+    """
+
+    # ------------------------------------------------------
+    # 1. NORMALIZE + AGGREGATE LINES
+    # ------------------------------------------------------
+    if not items:
+        raise ValueError("Exit has no items")
+
+    lines = []
+    totals = {}
+    for item in items:
+        product_code = item["product_code"]
+        qty = float(item["qty"])
+        if qty <= 0:
+            raise ValueError(f"Quantity must be greater than zero for {product_code}")
+
+        unit_cost = item.get("unit_cost")           # None -> average cost below
+        lines.append((product_code, qty, unit_cost))
+        totals[product_code] = totals.get(product_code, 0.0) + qty
+
+    # ------------------------------------------------------
+    # 2. VALIDATE ALL PRODUCTS + STOCK IN ONE QUERY
+    # ------------------------------------------------------
+    codes = list(totals)
+    placeholders = ", ".join("?" * len(codes))
+    cur.execute(f"""
+        SELECT code, description, unit, stock
+        FROM products
+        WHERE code IN ({placeholders})
+    """, codes)
+    products = {row["code"]: row for row in cur.fetchall()}
+
+    for product_code, qty in totals.items():
+        prod = products.get(product_code)
+        if not prod:
+            raise ValueError(f"Product not found: {product_code}")
+        if qty > prod["stock"]:
+            raise ValueError(f"Insufficient stock for {product_code}")
+
+    # Lines without a cost are valued at the product's average cost
+    avg_costs = average_costs(cur, codes)
+    lines = [
+        (code, qty, unit_cost if unit_cost is not None else avg_costs.get(code, 0.0))
+        for code, qty, unit_cost in lines
+    ]
+
+    # ------------------------------------------------------
+    # 3. HEADER
+    # ------------------------------------------------------
+    cur.execute("""
+        INSERT INTO exits (exit_code, destination, created_by, notes)
+        VALUES (?, ?, ?, ?)
+    """, (exit_code, destination, created_by, notes))
+
+    exit_id = cur.lastrowid
+
+    # ------------------------------------------------------
+    # 4. CONDITIONAL STOCK DECREMENT (one row per product)
+    # ------------------------------------------------------
+    cur.executemany("""
+        UPDATE products
+        SET stock = stock - ?
+        WHERE code = ? AND stock >= ?
+    """, [(qty, code, qty) for code, qty in totals.items()])
+
+    if cur.rowcount != len(totals):
+        raise ValueError("Stock changed while creating the exit, please retry")
+
+    record_movements(cur, {code: -qty for code, qty in totals.items()}, "exit", exit_id)
+
+    # ------------------------------------------------------
+    # 5. BULK INSERT ITEMS + AUDIT LOG
+    # ------------------------------------------------------
+    cur.executemany("""
+        INSERT INTO exit_items (exit_id, product_code, description, unit, qty, unit_cost, line_total)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (exit_id, code, products[code]["description"], products[code]["unit"],
+         qty, unit_cost, unit_cost * qty)
+        for code, qty, unit_cost in lines
+    ])
+
+    cur.executemany("""
+        INSERT INTO exits_history (exit_id, product_code, qty, changed_by, action)
+        VALUES (?, ?, ?, ?, ?)
+    """, [(exit_id, code, qty, created_by, "CREATE_EXIT") for code, qty, _ in lines])
+
+    return exit_id
 
 
 def create_exit(destination: str, items: list, notes: str = None, created_by: int = None):
     """
     Safely creates an exit with items and subtracts stock.
     Prevents 500 errors by validating every component.
+    Runs as one job on the database writer (group-committed with others).
     """
 
-    conn = get_connection()
-    try:
-        conn.execute("BEGIN IMMEDIATE")
-        cur = conn.cursor()
-
-        # ------------------------------------------------------
-        # 1. CREATE HEADER
-        # ------------------------------------------------------
-        exit_code = f"EX-{int(datetime.utcnow().timestamp())}"
-
-        cur.execute("""
-            INSERT INTO exits (exit_code, destination, created_by, notes)
-            VALUES (?, ?, ?, ?)
-        """, (exit_code, destination, created_by, notes))
-
-        exit_id = cur.lastrowid
-
-        # ------------------------------------------------------
-        # 2. PROCESS ITEMS
-        # ------------------------------------------------------
-        for item in items:
-            product_code = item["product_code"]
-            qty = float(item["qty"])
-            unit_cost = item.get("unit_cost") or 0.0   # SAFE DEFAULT
-
-            # --- VALIDATE PRODUCT EXISTS ---
-            cur.execute("SELECT description, unit, stock FROM products WHERE code = ?", (product_code,))
-            prod = cur.fetchone()
-            if not prod:
-                raise ValueError(f"Product not found: {product_code}")
-
-            description = prod["description"]
-            unit = prod["unit"]
-
-            # --- VALIDATE STOCK ---
-            if qty > prod["stock"]:
-                raise ValueError(f"Insufficient stock for {product_code}")
-
-            # --- UPDATE STOCK ---
-            new_stock = prod["stock"] - qty
-            cur.execute("UPDATE products SET stock = ? WHERE code = ?", (new_stock, product_code))
-
-            # --- INSERT ITEM ---
-            line_total = unit_cost * qty
-
-            cur.execute("""
-                INSERT INTO exit_items (exit_id, product_code, description, unit, qty, unit_cost, line_total)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (exit_id, product_code, description, unit, qty, unit_cost, line_total))
-
-            # --- AUDIT LOG ---
-            cur.execute("""
-                INSERT INTO exits_history (exit_id, product_code, qty, changed_by, action)
-                VALUES (?, ?, ?, ?, ?)
-            """, (exit_id, product_code, qty, created_by, "CREATE_EXIT"))
-
-        # Commit final
-        conn.commit()
-
-        # ------------------------------------------------------
-        # 3. RETURN EXIT
-        # ------------------------------------------------------
-        cur.execute("SELECT * FROM exits WHERE id = ?", (exit_id,))
-        exit_header = dict(cur.fetchone())
-
-        cur.execute("SELECT * FROM exit_items WHERE exit_id = ?", (exit_id,))
-        exit_items = [dict(row) for row in cur.fetchall()]
-
-        return {"exit": exit_header, "items": exit_items}
+    exit_code = next_code("EX")          # allocated before queueing the write
 
+    try:
+        exit_id = writer.run(_create_exit_locked, exit_code, destination, items, notes, created_by)
+    except HTTPException:
+        raise
     except Exception as e:
-        conn.rollback()
         print("EXIT CREATION ERROR:", e)
         raise HTTPException(status_code=400, detail=str(e))
 
-    finally:
-        conn.close()
+    # ------------------------------------------------------
+    # RETURN EXIT
+    # ------------------------------------------------------
+    return get_exit_details(exit_id)
 
 
-def get_all_exits():
+def _create_exits_locked(cur, exits: list, exit_codes: list, created_by: int = None) -> dict:
     """
-    Returns all exits with no filters.
+    Each exit runs in its own SAVEPOINT, so a failing exit is reported
+    in "failed" without discarding the others.
     """
+    created, failed = [], []
 
-    conn = get_connection()
-    cur = conn.cursor()
+    for index, ex in enumerate(exits):
+        exit_code = exit_codes[index]
 
-    cur.execute("""
-        SELECT id, exit_code, destination, created_by, created_at, notes
-        FROM exits
-        ORDER BY created_at DESC
-    """)
+        cur.execute("SAVEPOINT create_exit")
+        try:
+            exit_id = _create_exit_locked(
+                cur, exit_code, ex["destination"], ex["items"], ex.get("notes"), created_by
+            )
+            cur.execute("RELEASE create_exit")
+            created.append({"index": index, "id": exit_id, "exit_code": exit_code})
+        except (ValueError, sqlite3.IntegrityError) as e:
+            cur.execute("ROLLBACK TO create_exit")
+            cur.execute("RELEASE create_exit")
+            failed.append({"index": index, "detail": str(e)})
 
-    rows = cur.fetchall()
-    conn.close()
+    return {"created": created, "failed": failed}
 
-    return [dict(row) for row in rows]
+
+def create_exits(exits: list, created_by: int = None):
+    """
+    Creates many exits (scanner batches) in one write transaction.
+    Exits that fail validation are returned under "failed" by index.
+    """
+
+    exit_codes = next_codes("EX", len(exits))
+
+    try:
+        return writer.run(_create_exits_locked, exits, exit_codes, created_by)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print("EXIT BULK CREATION ERROR:", e)
+        raise HTTPException(status_code=400, detail=str(e))
 
 
-def get_exit_details(exit_id: int):
+def _exit_filters(destination: str = None, product_code: str = None,
+                  date_from: date = None, date_to: date = None):
     """
-    Fetch a complete exit (header + items).
+    Builds the WHERE clause shared by the exit list and its COUNT.
+    date_to is inclusive (the whole day is matched).
+    """
+    where, params = [], []
+
+    if destination:
+        # casefold() is registered on every connection (database.py)
+        where.append("casefold(e.destination) LIKE ? ESCAPE '\\'")
+        params.append(like_pattern(destination.casefold()))
+
+    if date_from:
+        where.append("e.created_at >= ?")
+        params.append(date_from.isoformat())
+
+    if date_to:
+        where.append("e.created_at < ?")
+        params.append((date_to + timedelta(days=1)).isoformat())
+
+    if product_code:
+        where.append("e.id IN (SELECT exit_id FROM exit_items WHERE product_code = ?)")
+        params.append(product_code)
+
+    return where, params
+
+
+def list_exits(
+    destination: str = None,
+    product_code: str = None,
+    date_from: date = None,
+    date_to: date = None,
+    sort: str = "desc",
+    page: int = 1,
+    limit: int = 50,
+    cursor: str = None,
+    with_total: bool = True,
+    conn: sqlite3.Connection = None
+):
     """
+    Filtered, sorted and paginated exit headers, computed in SQLite.
 
-    conn = get_connection()
-    cur = conn.cursor()
+    Pagination is OFFSET-based by `page`, or keyset-based on
+    (created_at, id) when a `cursor` from a previous page is given.
+    Returns {"data", "total", "next_cursor"}; total is None when
+    with_total is False.
+    """
+    where, params = _exit_filters(destination, product_code, date_from, date_to)
+    order = "DESC" if sort == "desc" else "ASC"
+
+    page_where, page_params = list(where), list(params)
+    offset = (page - 1) * limit
+
+    if cursor:
+        last_created_at, last_id = decode_cursor(cursor, 2)
+        op = "<" if order == "DESC" else ">"
+        page_where.append(f"(e.created_at, e.id) {op} (?, ?)")
+        page_params += [last_created_at, last_id]
+        offset = 0
+
+    sql = """
+        SELECT e.id, e.exit_code, e.destination, e.created_by, e.created_at, e.notes
+        FROM exits e
+    """
+    if page_where:
+        sql += " WHERE " + " AND ".join(page_where)
+    sql += f" ORDER BY e.created_at {order}, e.id {order} LIMIT ? OFFSET ?"
 
-    # Header
-    cur.execute("""
-        SELECT id, exit_code, destination, created_by, created_at, notes
-        FROM exits
-        WHERE id = ?
-    """, (exit_id,))
-    header = cur.fetchone()
+    with db_connection(conn) as conn:
+        rows = conn.execute(sql, page_params + [limit + 1, offset]).fetchall()
 
-    if not header:
-        conn.close()
-        return None
+        total = None
+        if with_total:
+            count_sql = "SELECT COUNT(*) FROM exits e"
+            if where:
+                count_sql += " WHERE " + " AND ".join(where)
+            total = conn.execute(count_sql, params).fetchone()[0]
 
-    # Items
-    cur.execute("""
-        SELECT product_code, description, unit, qty, unit_cost, line_total
-        FROM exit_items
-        WHERE exit_id = ?
-    """, (exit_id,))
-    items = cur.fetchall()
+    # One extra row tells us whether a next page exists
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
-    conn.close()
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    return {
+        "data": [dict(r) for r in rows],
+        "total": total,
+        "next_cursor": next_cursor
+    }
+
+
+def get_exit_details(exit_id: int, conn: sqlite3.Connection = None):
+    """
+    Fetch a complete exit (header + items).
+    """
+
+    with db_connection(conn) as conn:
+        # Header
+        header = conn.execute("""
+            SELECT id, exit_code, destination, created_by, created_at, notes
+            FROM exits
+            WHERE id = ?
+        """, (exit_id,)).fetchone()
+
+        if not header:
+            return None
+
+        # Items
+        items = conn.execute("""
+            SELECT product_code, description, unit, qty, unit_cost, line_total
+            FROM exit_items
+            WHERE exit_id = ?
+        """, (exit_id,)).fetchall()
 
     return {
         "exit": dict(header),
         "items": [dict(i) for i in items]
     }
+
+
+def get_exit_documents(exit_ids: list) -> list:
+    """
+    Header + items for several exits, in the order given, using one
+    query for the headers and one for the items. Unknown ids are skipped.
+    """
+    if not exit_ids:
+        return []
+
+    marks = ",".join("?" * len(exit_ids))
+    with db_connection() as conn:
+        headers = conn.execute(f"""
+            SELECT id, exit_code, destination, created_by, created_at, notes
+            FROM exits
+            WHERE id IN ({marks})
+        """, exit_ids).fetchall()
+
+        items = conn.execute(f"""
+            SELECT exit_id, product_code, description, unit, qty, unit_cost, line_total
+            FROM exit_items
+            WHERE exit_id IN ({marks})
+            ORDER BY exit_id, id
+        """, exit_ids).fetchall()
+
+    docs = {h["id"]: {"exit": dict(h), "items": []} for h in headers}
+    for it in items:
+        line = dict(it)
+        docs[line.pop("exit_id")]["items"].append(line)
+
+    return [docs[i] for i in dict.fromkeys(exit_ids) if i in docs]
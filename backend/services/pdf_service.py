@@ -0,0 +1,325 @@
+# backend/services/pdf_service.py
+"""
+PDF renderers for purchase orders and exit requests.
+
+Pure functions: they take already-loaded header/items dicts and return
+the PDF bytes, so they can run in a worker process (see
+backend/core/executors.py) without touching the database.
+"""
+import io
+from datetime import datetime
+from typing import List
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib import colors
+from reportlab.lib.units import mm
+
+from backend.core.pdf_templates import draw_background
+
+
+# Bump when the layout changes so cached documents are re-rendered
+RENDER_VERSION = 2
+
+
+# ======================================================
+# PURCHASE ORDER
+# ======================================================
+
+def po_file_number(header: dict) -> str:
+    """PO number as printed on the document and used in the file name."""
+    po_raw = header.get("po_code") or header.get("po_number")
+    return str(po_raw).replace("PO", "")
+
+
+def _draw_po(c: canvas.Canvas, header: dict, items: List[dict]):
+    """
+    Draws one Purchase Order over po_template.png (A4 portrait),
+    closing its last page.
+    """
+    PAGE_WIDTH, PAGE_HEIGHT = A4
+    c.setPageSize(A4)
+
+    # Background template
+    draw_background(c, "po", PAGE_WIDTH, PAGE_HEIGHT)
+
+    # Format money helper
+    def fmt(v):
+        try:
+            return f"R$ {float(v):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        except:
+            return str(v)
+
+    c.setFont("Helvetica", 9)
+
+    # MANUAL COORDINATES — EDIT FREELY
+    pix_x = 65; pix_y = PAGE_HEIGHT - 162
+    date_x = 190; date_y = PAGE_HEIGHT - 162
+    seller_name_x = 375; seller_name_y = PAGE_HEIGHT - 162
+    seller_phone_x = 455; seller_phone_y = PAGE_HEIGHT - 162
+
+    supplier_center_x = 170
+    buyer_center_x    = 420
+
+    supplier_start_y = PAGE_HEIGHT - 80
+    buyer_start_y    = PAGE_HEIGHT - 80
+
+    line_spacing = 12
+
+    # DRAW TOP FIELDS
+    supplier_contact = header.get("supplier_contact", "")
+    parts = supplier_contact.split("-")
+
+    seller_name = parts[0].strip() if len(parts) > 0 else ""
+    seller_phone = parts[1].strip() if len(parts) > 1 else ""
+
+    c.drawString(pix_x, pix_y, header.get("supplier_pix",""))
+    c.drawString(date_x, date_y, header.get("created_at","")[:10])
+    c.drawString(seller_name_x, seller_name_y, seller_name)
+    c.drawString(seller_phone_x, seller_phone_y, seller_phone)
+
+    # CENTERED SUPPLIER BLOCK
+    y = supplier_start_y
+
+    def center(text, cx, y_pos):
+        c.drawCentredString(cx, y_pos, text)
+
+    center(header.get("supplier_cnpj",""), supplier_center_x, y); y -= line_spacing
+    center(header.get("supplier_name",""), supplier_center_x, y); y -= line_spacing
+    center(header.get("supplier_address",""), supplier_center_x, y); y -= line_spacing
+    center(
+        f"{header.get('supplier_neighborhood','')} - "
+        f"{header.get('supplier_city','')} - "
+        f"{header.get('supplier_state','')}",
+        supplier_center_x, y
+    ); y -= line_spacing
+    center(header.get("supplier_cep",""), supplier_center_x, y); y -= line_spacing
+
+    # CENTERED BUYER BLOCK
+    y = buyer_start_y
+
+    center(header.get("buyer_cnpj",""), buyer_center_x, y); y -= line_spacing
+    center(header.get("buyer_name",""), buyer_center_x, y); y -= line_spacing
+    center(header.get("buyer_address",""), buyer_center_x, y); y -= line_spacing
+    center(
+        f"{header.get('buyer_neighborhood','')} - "
+        f"{header.get('buyer_city','')} - "
+        f"{header.get('buyer_state','')}",
+        buyer_center_x, y
+    ); y -= line_spacing
+    center(header.get("buyer_cep",""), buyer_center_x, y); y -= line_spacing
+
+    # PO NUMBER
+    po_clean = po_file_number(header)
+
+    po_x = 485
+    po_y = PAGE_HEIGHT - 48
+
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(po_x, po_y, po_clean)
+    c.setFont("Helvetica", 9)
+
+    # ITEMS TABLE
+    table_xs = {
+        "code": 58,
+        "desc": 105,
+        "unit": 312,
+        "qty": 348,
+        "unit_price": 400,
+        "total": 480
+    }
+    table_y_start = PAGE_HEIGHT - 240
+    row_height = 18
+    max_rows_per_page = 18
+
+    c.setFont("Helvetica", 9)
+    y = table_y_start - row_height
+    subtotal = 0.0
+    row_count = 0
+
+    for it in items:
+        if row_count >= max_rows_per_page:
+            c.showPage()
+            draw_background(c, "po", PAGE_WIDTH, PAGE_HEIGHT)
+
+            c.setFont("Helvetica-Bold", 9)
+            c.drawString(table_xs["code"], table_y_start, "Code")
+            c.drawString(table_xs["desc"], table_y_start, "Description")
+            c.drawString(table_xs["unit"], table_y_start, "Unit")
+            c.drawString(table_xs["qty"], table_y_start, "Qty")
+            c.drawString(table_xs["unit_price"], table_y_start, "Unit Price")
+            c.drawString(table_xs["total"], table_y_start, "Total")
+
+            c.setFont("Helvetica", 9)
+            y = table_y_start - row_height
+            row_count = 0
+
+        code  = it.get("item_code") or it.get("code") or ""
+        desc  = (it.get("description") or "")[:80]
+        unit  = it.get("unit") or ""
+        qty   = it.get("qty") or 0
+        price = it.get("unit_price") or it.get("price") or 0
+        total = it.get("line_total") or (float(qty) * float(price))
+
+        c.drawString(table_xs["code"], y, str(code))
+        c.drawString(table_xs["desc"], y, desc)
+        c.drawString(table_xs["unit"], y, unit)
+        c.drawRightString(table_xs["qty"] + 20, y, str(qty))
+        c.drawRightString(table_xs["unit_price"] + 40, y, fmt(price))
+        c.drawRightString(table_xs["total"] + 40, y, fmt(total))
+
+        subtotal += float(total or 0)
+        y -= row_height
+        row_count += 1
+
+    # TOTAL
+    total_x = 397.5
+    total_y = 100.5
+
+    c.setFillColorRGB(1, 1, 1)
+    c.setFont("Helvetica-Bold", 10)
+    c.drawRightString(total_x + 120, total_y - 18, fmt(subtotal))
+
+    c.showPage()
+
+
+def render_po_pdf(header: dict, items: List[dict]) -> bytes:
+    """
+    Purchase Order PDF drawn over po_template.png (A4 portrait).
+    """
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    _draw_po(c, header, items)
+    c.save()
+
+    return buffer.getvalue()
+
+
+def render_po_batch_pdf(docs: List[dict]) -> bytes:
+    """
+    Several POs ({"header", "items"}) in one multi-page PDF; the
+    background is embedded once for the whole file.
+    """
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    for doc in docs:
+        _draw_po(c, doc["header"], doc["items"])
+    c.save()
+
+    return buffer.getvalue()
+
+
+# ======================================================
+# EXIT REQUEST
+# ======================================================
+
+def _draw_exit(c: canvas.Canvas, header: dict, items: List[dict]):
+    """
+    Draws one Exit Request using EXITS-MODEL.png in LANDSCAPE mode,
+    closing its last page.
+    Prints only DATE + SECTOR in header and repeats DATE + SECTOR on every row.
+    """
+    items = items or []
+
+    page_w, page_h = landscape(A4)
+    c.setPageSize(landscape(A4))
+
+    draw_background(c, "exit", page_w, page_h)
+
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica", 8)
+
+    # FORMAT DATE (Brazilian)
+    raw_date = header.get("created_at", "")
+    try:
+        dt = datetime.fromisoformat(raw_date)
+        created_at_br = dt.strftime("%d/%m/%Y")
+    except:
+        created_at_br = raw_date
+
+    destination = header.get("destination", "")
+
+    # HEADER COORDS
+    coords = {
+        "date":   (52 * mm, page_h - 26.6 * mm),
+        "sector": (80 * mm, page_h - 26.6 * mm)
+    }
+
+    # TABLE SETUP
+    table_start_y = page_h - 22.2 * mm
+    row_height = 4.3 * mm
+    max_rows_per_page = int((table_start_y - 20 * mm) // row_height)
+
+    col_x = {
+        "date":        52 * mm,
+        "sector":      80 * mm,
+        "code":        107 * mm,
+        "description": 140 * mm,
+        "unit":        218 * mm,
+        "qty":         240 * mm,
+    }
+
+    c.setFont("Helvetica", 8)
+    y = table_start_y - row_height
+    row_count = 0
+
+    # TABLE ROWS — DATE + SECTOR REPEATED
+    for item in items:
+
+        if row_count >= max_rows_per_page:
+            c.showPage()
+            draw_background(c, "exit", page_w, page_h)
+            c.setFont("Helvetica", 8)
+            y = table_start_y - row_height
+            row_count = 0
+
+        code = str(item.get("product_code", ""))
+        desc = str(item.get("description", ""))
+        unit = str(item.get("unit", ""))
+        qty = str(item.get("qty", ""))
+
+        # DATE + SECTOR repeated on every line
+        c.drawString(col_x["date"], y, created_at_br)
+        c.drawString(col_x["sector"], y, destination)
+
+        # Product data
+        c.drawString(col_x["code"], y, code)
+
+        if len(desc) > 70:
+            c.drawString(col_x["description"], y, desc[:70])
+            c.drawString(col_x["description"], y - 10, desc[70:140])
+        else:
+            c.drawString(col_x["description"], y, desc)
+
+        c.drawString(col_x["unit"], y, unit)
+        c.drawString(col_x["qty"], y, qty)
+
+        y -= row_height
+        row_count += 1
+
+    c.showPage()
+
+
+def render_exit_pdf(header: dict, items: List[dict]) -> bytes:
+    """
+    Exit Request PDF using EXITS-MODEL.png in LANDSCAPE mode.
+    """
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=landscape(A4))
+    _draw_exit(c, header, items)
+    c.save()
+
+    return buffer.getvalue()
+
+
+def render_exit_batch_pdf(docs: List[dict]) -> bytes:
+    """
+    Several exits ({"exit", "items"}) in one multi-page PDF.
+    """
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=landscape(A4))
+    for doc in docs:
+        _draw_exit(c, doc["exit"], doc["items"])
+    c.save()
+
+    return buffer.getvalue()
@@ -1,158 +1,502 @@
-from backend.core.database import get_connection
+import sqlite3
+from datetime import date, timedelta
+
+from backend.core.database import db_connection
+from backend.core.pagination import encode_cursor, decode_cursor, like_pattern
+from backend.core.writer import writer
+from backend.services.document_service import invalidate_po
+from backend.services.cost_service import apply_po_receipt
+from backend.services.stock_service import record_po_receipt
 from fastapi import HTTPException
 
 
-def receive_po(po_number: int):
+PO_DOCUMENT_COLUMNS = """
+    po_number, po_code,
+    supplier_cnpj, supplier_name, supplier_address, supplier_neighborhood,
+    supplier_city, supplier_state, supplier_cep, supplier_pix, supplier_contact,
+    buyer_cnpj, buyer_name, buyer_address, buyer_neighborhood,
+    buyer_city, buyer_state, buyer_cep, buyer_pix, buyer_contact,
+    created_at, status, notes
+"""
+
+
+def get_po_document(po_number: int):
     """
-    Receives a Purchase Order:
-    - Validates status is APPROVED
-    - Creates po_received header record
-    - Copies items into po_received_items
-    - Inserts into entries_history
-    - Updates product stock
-    - Marks PO as RECEIVED
+    Header + items needed to print a PO, or None if it does not exist.
     """
+    with db_connection() as conn:
+        row = conn.execute(f"""
+            SELECT {PO_DOCUMENT_COLUMNS}
+            FROM purchase_orders
+            WHERE po_number = ?
+        """, (po_number,)).fetchone()
 
-    conn = get_connection()
-    cur = conn.cursor()
+        if not row:
+            return None
 
-    try:
-        # ------------------------------------------
-        # 1. Load PO header
-        # ------------------------------------------
-        cur.execute("""
-            SELECT
-                po_number, po_code,
-                supplier_cnpj, supplier_name,
-                buyer_cnpj, buyer_name,
-                status, notes
-            FROM purchase_orders
+        items = conn.execute("""
+            SELECT item_code, description, unit, qty, unit_price, line_total
+            FROM po_items
             WHERE po_number = ?
-        """, (po_number,))
-        po = cur.fetchone()
+            ORDER BY id
+        """, (po_number,)).fetchall()
 
-        if not po:
-            raise HTTPException(status_code=404, detail="PO not found")
+    return {"header": dict(row), "items": [dict(r) for r in items]}
 
-        if po["status"] != "APPROVED":
-            raise HTTPException(status_code=400, detail="PO must be APPROVED before receiving")
 
-        # ------------------------------------------
-        # 2. Load PO items
-        # ------------------------------------------
-        cur.execute("""
+def get_po_details(po_number: int, conn: sqlite3.Connection = None) -> dict:
+    """
+    Header (with item_count / total_value) + items for the PO screen.
+    Header is None when the PO does not exist.
+    """
+    with db_connection(conn) as conn:
+        header = conn.execute(f"""
+            SELECT {PO_DOCUMENT_COLUMNS}, item_count, total_value
+            FROM purchase_orders
+            WHERE po_number = ?
+        """, (po_number,)).fetchone()
+
+        items = conn.execute("""
             SELECT item_code, description, unit, qty, unit_price, line_total
             FROM po_items
             WHERE po_number = ?
-        """, (po_number,))
-        items = cur.fetchall()
-
-        if not items:
-            raise HTTPException(status_code=400, detail="PO has no items to receive")
-
-        # ------------------------------------------
-        # 3. Calculate total
-        # ------------------------------------------
-        total_value = sum(float(i["line_total"] or 0) for i in items)
-
-        # ------------------------------------------
-        # 4. Create po_received header
-        # ------------------------------------------
-        cur.execute("""
-            INSERT INTO po_received (
-                po_number, supplier_cnpj, supplier_name,
-                buyer_cnpj, buyer_name,
-                total_value, notes
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            po["po_number"],
-            po["supplier_cnpj"], po["supplier_name"],
-            po["buyer_cnpj"], po["buyer_name"],
-            total_value,
-            po["notes"]
+            ORDER BY id
+        """, (po_number,)).fetchall()
+
+    return {"header": dict(header) if header else None, "items": [dict(r) for r in items]}
+
+
+def get_po_documents(po_numbers: list) -> list:
+    """
+    Printable documents for several POs, in the order given, using one
+    query for the headers and one for the items. Unknown numbers are skipped.
+    """
+    if not po_numbers:
+        return []
+
+    marks = ",".join("?" * len(po_numbers))
+    with db_connection() as conn:
+        headers = conn.execute(f"""
+            SELECT {PO_DOCUMENT_COLUMNS}
+            FROM purchase_orders
+            WHERE po_number IN ({marks})
+        """, po_numbers).fetchall()
+
+        items = conn.execute(f"""
+            SELECT po_number, item_code, description, unit, qty, unit_price, line_total
+            FROM po_items
+            WHERE po_number IN ({marks})
+            ORDER BY po_number, id
+        """, po_numbers).fetchall()
+
+    docs = {h["po_number"]: {"header": dict(h), "items": []} for h in headers}
+    for it in items:
+        line = dict(it)
+        docs[line.pop("po_number")]["items"].append(line)
+
+    return [docs[n] for n in dict.fromkeys(po_numbers) if n in docs]
+
+
+PO_LIST_COLUMNS = """
+    po_number, po_code, supplier_cnpj, supplier_name,
+    created_at, status, item_count, total_value
+"""
+
+
+def _po_filters(status: str = None, supplier: str = None,
+                date_from: date = None, date_to: date = None):
+    """
+    WHERE clause shared by the PO list and its COUNT.
+    `supplier` matches the CNPJ exactly or the name as a substring;
+    date_to is inclusive.
+    """
+    where, params = [], []
+
+    if status:
+        where.append("status = ?")
+        params.append(status)
+
+    if supplier:
+        where.append("(supplier_cnpj = ? OR supplier_name LIKE ? ESCAPE '\\')")
+        params += [supplier, like_pattern(supplier)]
+
+    if date_from:
+        where.append("created_at >= ?")
+        params.append(date_from.isoformat())
+
+    if date_to:
+        where.append("created_at < ?")
+        params.append((date_to + timedelta(days=1)).isoformat())
+
+    return where, params
+
+
+def list_pos(
+    status: str = None,
+    supplier: str = None,
+    date_from: date = None,
+    date_to: date = None,
+    sort: str = "desc",
+    limit: int = 100,
+    cursor: str = None,
+    with_total: bool = False,
+    conn: sqlite3.Connection = None
+):
+    """
+    Filtered PO headers with their item count and value, keyset-paginated
+    on (created_at, po_number). Returns {"data", "total", "next_cursor"};
+    total is None unless with_total is set.
+    """
+    where, params = _po_filters(status, supplier, date_from, date_to)
+    order = "DESC" if sort == "desc" else "ASC"
+
+    page_where, page_params = list(where), list(params)
+    if cursor:
+        last_created_at, last_number = decode_cursor(cursor, 2)
+        op = "<" if order == "DESC" else ">"
+        page_where.append(f"(created_at, po_number) {op} (?, ?)")
+        page_params += [last_created_at, last_number]
+
+    sql = f"SELECT {PO_LIST_COLUMNS} FROM purchase_orders"
+    if page_where:
+        sql += " WHERE " + " AND ".join(page_where)
+    sql += f" ORDER BY created_at {order}, po_number {order} LIMIT ?"
+
+    with db_connection(conn) as conn:
+        rows = conn.execute(sql, page_params + [limit + 1]).fetchall()
+
+        total = None
+        if with_total:
+            count_sql = "SELECT COUNT(*) FROM purchase_orders"
+            if where:
+                count_sql += " WHERE " + " AND ".join(where)
+            total = conn.execute(count_sql, params).fetchone()[0]
+
+    # One extra row tells us whether a next page exists
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["po_number"])
+
+    return {
+        "data": [dict(r) for r in rows],
+        "total": total,
+        "next_cursor": next_cursor
+    }
+
+
+PO_PARTY_FIELDS = (
+    "supplier_cnpj", "supplier_name", "supplier_address", "supplier_neighborhood",
+    "supplier_city", "supplier_state", "supplier_cep", "supplier_pix", "supplier_contact",
+    "buyer_cnpj", "buyer_name", "buyer_address", "buyer_neighborhood",
+    "buyer_city", "buyer_state", "buyer_cep", "buyer_pix", "buyer_contact",
+)
+
+
+def _create_po_locked(cur, po: dict) -> dict:
+    """
+    Creates one OPEN PO inside the caller's write transaction.
+
+    Every item code (and unit, when given) is checked against products
+    with a single SELECT before anything is written; blank descriptions
+    and units are taken from the catalog. The code is derived from the
+    new po_number, so a failed create leaves no gap between the two.
+    Returns {"po_number", "po_code"}.
+    """
+    items = po.get("items") or []
+    if not items:
+        raise ValueError("PO has no items")
+
+    # ------------------------------------------
+    # 1. Validate all item codes + units in one query
+    # ------------------------------------------
+    codes = list(dict.fromkeys(it["code"] for it in items))
+    placeholders = ", ".join("?" * len(codes))
+    cur.execute(f"""
+        SELECT code, description, unit
+        FROM products
+        WHERE code IN ({placeholders})
+    """, codes)
+    products = {row["code"]: row for row in cur.fetchall()}
+
+    missing = [code for code in codes if code not in products]
+    if missing:
+        raise ValueError(f"Product not found: {', '.join(missing)}")
+
+    lines = []
+    for it in items:
+        prod = products[it["code"]]
+        unit = (it.get("unit") or "").strip() or prod["unit"]
+        if unit.upper() != (prod["unit"] or "").upper():
+            raise ValueError(f"Unit {unit} does not match {prod['unit']} for {it['code']}")
+
+        qty = float(it["qty"])
+        price = float(it["price"])
+        lines.append((
+            it["code"],
+            (it.get("description") or "").strip() or prod["description"],
+            prod["unit"],
+            qty,
+            price,
+            qty * price,
         ))
 
-        po_received_id = cur.lastrowid
-
-        # ------------------------------------------
-        # 5. Insert each received item
-        # ------------------------------------------
-        for it in items:
-            cur.execute("""
-                INSERT INTO po_received_items (
-                    po_received_id,
-                    product_code, description, unit,
-                    qty, unit_price, line_total
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                po_received_id,
-                it["item_code"],
-                it["description"],
-                it["unit"],
-                it["qty"],
-                it["unit_price"],
-                it["line_total"]
-            ))
-
-        # ------------------------------------------
-        # 6. Insert into entries_history
-        # ------------------------------------------
-        for it in items:
-            cur.execute("""
-                INSERT INTO entries_history (
-                    po_number, supplier_cnpj,
-                    product_code, description, unit,
-                    qty, unit_cost, line_total
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                po_number,
-                po["supplier_cnpj"],
-                it["item_code"],
-                it["description"],
-                it["unit"],
-                it["qty"],
-                it["unit_price"],
-                it["line_total"]
-            ))
-
-        # ------------------------------------------
-        # 7. Update inventory table -> products.stock
-        # ------------------------------------------
-        for it in items:
-            cur.execute("""
-                UPDATE products
-                SET stock = stock + ?
-                WHERE code = ?
-            """, (
-                it["qty"],
-                it["item_code"]
-            ))
-
-        # ------------------------------------------
-        # 8. Mark PO as RECEIVED
-        # ------------------------------------------
-        cur.execute("""
-            UPDATE purchase_orders
-            SET status = 'RECEIVED', received_at = CURRENT_TIMESTAMP
-            WHERE po_number = ?
-        """, (po_number,))
+    # ------------------------------------------
+    # 2. Header, then its code from the po_number it got
+    # ------------------------------------------
+    cur.execute(f"""
+        INSERT INTO purchase_orders ({", ".join(PO_PARTY_FIELDS)}, notes)
+        VALUES ({", ".join("?" * len(PO_PARTY_FIELDS))}, ?)
+    """, (*(po.get(f) for f in PO_PARTY_FIELDS), po.get("notes") or ""))
 
-        # Commit everything
-        conn.commit()
+    po_number = cur.lastrowid
+    po_code = f"PO{po_number:06d}"
+    cur.execute("UPDATE purchase_orders SET po_code = ? WHERE po_number = ?", (po_code, po_number))
 
-        return {
-            "status": "RECEIVED",
-            "po_number": po_number,
-            "po_received_id": po_received_id,
-            "total_received": total_value
-        }
+    # ------------------------------------------
+    # 3. Lines in one executemany
+    # ------------------------------------------
+    cur.executemany("""
+        INSERT INTO po_items (po_number, item_code, description, unit, qty, unit_price, line_total)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [(po_number, *line) for line in lines])
+
+    return {"po_number": po_number, "po_code": po_code}
+
+
+def create_po(po: dict):
+    """
+    Creates a draft (OPEN) purchase order with its lines.
+    Raises 400 when an item code or unit is not in the catalog.
+    """
+
+    try:
+        return writer.run(_create_po_locked, po)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except HTTPException:
+        raise
 
     except Exception as e:
-        conn.rollback()
-        raise e
+        print("PO CREATION ERROR:", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _create_pos_locked(cur, pos: list) -> dict:
+    """
+    Each PO runs in its own SAVEPOINT, so an invalid PO is reported in
+    "failed" (by index) without discarding the others.
+    """
+    created, failed = [], []
+
+    for index, po in enumerate(pos):
+        cur.execute("SAVEPOINT create_po")
+        try:
+            ids = _create_po_locked(cur, po)
+            cur.execute("RELEASE create_po")
+            created.append({"index": index, **ids})
+        except (ValueError, sqlite3.IntegrityError) as e:
+            cur.execute("ROLLBACK TO create_po")
+            cur.execute("RELEASE create_po")
+            failed.append({"index": index, "detail": str(e)})
+
+    return {"created": created, "failed": failed}
+
+
+def create_pos(pos: list):
+    """Creates many draft POs in one write transaction."""
+
+    try:
+        return writer.run(_create_pos_locked, pos)
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        print("PO BULK CREATION ERROR:", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _set_po_status_locked(cur, po_number: int, new_status: str):
+    cur.execute("SELECT status FROM purchase_orders WHERE po_number = ?", (po_number,))
+    row = cur.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="PO not found")
+
+    # Business rules
+    if row["status"] != "OPEN":
+        raise HTTPException(status_code=400, detail="Cannot change status of non-OPEN PO")
+
+    cur.execute("""
+        UPDATE purchase_orders
+        SET status = ?
+        WHERE po_number = ?
+    """, (new_status, po_number))
+
+
+def set_po_status(po_number: int, new_status: str):
+    """OPEN -> APPROVED / CANCELLED."""
+    if new_status not in ("OPEN", "APPROVED", "CANCELLED"):
+        raise HTTPException(status_code=400, detail="Invalid status")
+
+    writer.run(_set_po_status_locked, po_number, new_status)
+    invalidate_po(po_number)
+
+
+def _receive_po_locked(cur, po_number: int):
+    """
+    Receives one PO inside the caller's write transaction.
+    Every step is a single set-based statement over po_items, so the
+    cost per PO no longer grows with one round trip per line.
+    """
+
+    # ------------------------------------------
+    # 1. Guarded status transition (claims the PO)
+    # ------------------------------------------
+    cur.execute("""
+        UPDATE purchase_orders
+        SET status = 'RECEIVED', received_at = CURRENT_TIMESTAMP
+        WHERE po_number = ? AND status = 'APPROVED'
+    """, (po_number,))
+
+    if cur.rowcount == 0:
+        cur.execute("SELECT status FROM purchase_orders WHERE po_number = ?", (po_number,))
+        if not cur.fetchone():
+            raise HTTPException(status_code=404, detail="PO not found")
+        raise HTTPException(status_code=400, detail="PO must be APPROVED before receiving")
+
+    # ------------------------------------------
+    # 2. Item count + total (kept on the header by triggers)
+    # ------------------------------------------
+    cur.execute("""
+        SELECT item_count, total_value
+        FROM purchase_orders
+        WHERE po_number = ?
+    """, (po_number,))
+    totals = cur.fetchone()
+
+    if totals["item_count"] == 0:
+        raise HTTPException(status_code=400, detail="PO has no items to receive")
+
+    total_value = float(totals["total_value"])
+
+    # ------------------------------------------
+    # 3. po_received header
+    # ------------------------------------------
+    cur.execute("""
+        INSERT INTO po_received (
+            po_number, supplier_cnpj, supplier_name,
+            buyer_cnpj, buyer_name,
+            total_value, notes
+        )
+        SELECT po_number, supplier_cnpj, supplier_name,
+               buyer_cnpj, buyer_name,
+               ?, notes
+        FROM purchase_orders
+        WHERE po_number = ?
+    """, (total_value, po_number))
+
+    po_received_id = cur.lastrowid
+
+    # ------------------------------------------
+    # 4. Received items + entries_history (INSERT ... SELECT)
+    # ------------------------------------------
+    cur.execute("""
+        INSERT INTO po_received_items (
+            po_received_id,
+            product_code, description, unit,
+            qty, unit_price, line_total
+        )
+        SELECT ?, item_code, description, unit, qty, unit_price, line_total
+        FROM po_items
+        WHERE po_number = ?
+        ORDER BY id
+    """, (po_received_id, po_number))
+
+    # Registered supplier name first: the precedence migration 6 used for older rows
+    cur.execute("""
+        INSERT INTO entries_history (
+            po_number, supplier_cnpj, supplier_name,
+            product_code, description, unit,
+            qty, unit_cost, line_total
+        )
+        SELECT i.po_number, po.supplier_cnpj,
+               COALESCE((SELECT s.name FROM suppliers s WHERE s.cnpj = po.supplier_cnpj), po.supplier_name),
+               i.item_code, i.description, i.unit,
+               i.qty, i.unit_price, i.line_total
+        FROM po_items i
+        JOIN purchase_orders po ON po.po_number = i.po_number
+        WHERE i.po_number = ?
+        ORDER BY i.id
+    """, (po_number,))
+
+    # ------------------------------------------
+    # 5. products.stock — one UPDATE, quantities summed per product
+    # ------------------------------------------
+    cur.execute("""
+        UPDATE products
+        SET stock = stock + (
+            SELECT SUM(i.qty) FROM po_items i
+            WHERE i.po_number = ? AND i.item_code = products.code
+        )
+        WHERE code IN (SELECT item_code FROM po_items WHERE po_number = ?)
+    """, (po_number, po_number))
+
+    record_po_receipt(cur, po_number)
+    apply_po_receipt(cur, po_number)
+
+    return {
+        "status": "RECEIVED",
+        "po_number": po_number,
+        "po_received_id": po_received_id,
+        "total_received": total_value
+    }
+
+
+def receive_po(po_number: int):
+    """
+    Receives a Purchase Order:
+    - Validates status is APPROVED (atomically, under the write lock)
+    - Creates po_received header record
+    - Copies items into po_received_items
+    - Inserts into entries_history
+    - Updates product stock
+    - Marks PO as RECEIVED
+    """
+
+    result = writer.run(_receive_po_locked, po_number)
+    invalidate_po(po_number)
+    return result
+
+
+def _receive_pos_locked(cur, po_numbers: list) -> dict:
+    received, failed = [], []
+
+    for po_number in dict.fromkeys(po_numbers):      # de-duplicated, order kept
+        cur.execute("SAVEPOINT receive_po")
+        try:
+            received.append(_receive_po_locked(cur, po_number))
+            cur.execute("RELEASE receive_po")
+        except HTTPException as e:
+            cur.execute("ROLLBACK TO receive_po")
+            cur.execute("RELEASE receive_po")
+            failed.append({"po_number": po_number, "detail": e.detail})
+
+    return {"received": received, "failed": failed}
+
+
+def receive_pos(po_numbers: list):
+    """
+    Receives many POs in one write transaction. Each PO runs in its own
+    SAVEPOINT, so one invalid PO is reported without undoing the others.
+    Returns {"received": [...], "failed": [{"po_number", "detail"}]}.
+    """
 
-    finally:
-        conn.close()
+    result = writer.run(_receive_pos_locked, po_numbers)
+    for r in result["received"]:
+        invalidate_po(r["po_number"])
+    return result
@@ -1,46 +1,185 @@
-from backend.core.database import get_connection
+from backend.core.database import db_connection
+from backend.core.pagination import encode_cursor, decode_cursor
+from backend.core.writer import writer
+from backend.services.stock_service import record_movements
+import os
 import sqlite3
+import re
 
+from fastapi import HTTPException
 
-def get_all_products():
-    conn = get_connection()
-    cur = conn.cursor()
 
-    cur.execute("""
-        SELECT code, category, subcategory, description, unit, stock 
-        FROM products
-    """)
+PRODUCT_FIELDS = ("code", "category", "subcategory", "description", "unit", "stock")
 
-    rows = cur.fetchall()
-    conn.close()
 
-    products = [
-        {
-            "code": r["code"],
-            "category": r["category"],
-            "subcategory": r["subcategory"],
-            "description": r["description"],
-            "unit": r["unit"],
-            "stock": r["stock"]
-        }
-        for r in rows
-    ]
+# ============================================================
+# CATALOG LISTING (filters, projection, keyset pagination)
+# ============================================================
 
-    return products
+def get_catalog_version(conn: sqlite3.Connection = None) -> int:
+    """
+    Monotonic counter bumped by triggers on every products change.
+    """
+    with db_connection(conn) as conn:
+        row = conn.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()
+    return row["version"] if row else 0
 
 
-def get_product_by_code(code: str):
-    conn = get_connection()
-    cur = conn.cursor()
+def _project_fields(fields: list = None) -> list:
+    if not fields:
+        return list(PRODUCT_FIELDS)
 
-    cur.execute("""
-        SELECT code, category, subcategory, description, unit, stock
-        FROM products
-        WHERE code = ?
-    """, (code,))
+    unknown = [f for f in fields if f not in PRODUCT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown product fields: {', '.join(unknown)}")
+
+    # code is the pagination key, so it is always returned
+    return ["code"] + [f for f in fields if f != "code"]
+
+
+def _catalog_query(columns: list, category: str = None, subcategory: str = None,
+                   low_stock: float = None, after_code: str = None):
+    where, params = [], []
+
+    if category:
+        where.append("category = ?")
+        params.append(category)
+    if subcategory:
+        where.append("subcategory = ?")
+        params.append(subcategory)
+    if low_stock is not None:
+        where.append("stock <= ?")
+        params.append(low_stock)
+    if after_code is not None:
+        where.append("code > ?")
+        params.append(after_code)
 
-    row = cur.fetchone()
-    conn.close()
+    sql = f"SELECT {', '.join(columns)} FROM products"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY code"
+
+    return sql, params
+
+
+def list_products(category: str = None, subcategory: str = None, low_stock: float = None,
+                  fields: list = None, limit: int = None, cursor: str = None,
+                  conn: sqlite3.Connection = None):
+    """
+    Catalog page ordered by code. Without `limit` the whole (filtered)
+    catalog is returned in one list and next_cursor is None.
+    Returns {"products", "next_cursor"}.
+    """
+    columns = _project_fields(fields)
+    after_code = decode_cursor(cursor, 1)[0] if cursor else None
+    sql, params = _catalog_query(columns, category, subcategory, low_stock, after_code)
+
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+
+    with db_connection(conn) as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["code"])
+
+    return {
+        "products": [dict(r) for r in rows],
+        "next_cursor": next_cursor
+    }
+
+
+def iter_products(category: str = None, subcategory: str = None, low_stock: float = None,
+                  fields: list = None, batch_size: int = 1000):
+    """
+    Returns an iterator of product dicts in code order, fetching
+    `batch_size` rows at a time so full dumps run in constant memory.
+    Arguments are validated up front, before anything is streamed.
+    """
+    columns = _project_fields(fields)
+    sql, params = _catalog_query(columns, category, subcategory, low_stock)
+
+    def rows():
+        with db_connection() as conn:
+            cur = conn.execute(sql, params)
+            while True:
+                batch = cur.fetchmany(batch_size)
+                if not batch:
+                    break
+                for r in batch:
+                    yield dict(r)
+
+    return rows()
+
+
+# ============================================================
+# FULL-TEXT SEARCH (products_fts, kept in sync by triggers)
+# ============================================================
+
+def _fts_query(text: str) -> str:
+    """
+    Turns user input into an FTS5 query: every term must match,
+    each one as a prefix ("parafu sext" -> "parafu"* AND "sext"*).
+    """
+    terms = [t for t in re.split(r"\s+", text.strip()) if t]
+    return " ".join('"' + t.replace('"', '""') + '"*' for t in terms)
+
+
+SEARCH_RANK_LIMIT = 1000     # above this many matches, skip bm25 ranking
+
+
+def search_products(text: str, limit: int = 20, conn: sqlite3.Connection = None):
+    """
+    Prefix search over code, description, category and subcategory,
+    best matches first (code weighs most, then description).
+
+    Ranking costs time proportional to the number of matches, so very
+    broad prefixes (one or two letters on a large catalog) return the
+    first `limit` matches unranked; typeahead narrows them as the user
+    keeps typing.
+    """
+    query = _fts_query(text)
+    if not query:
+        return []
+
+    with db_connection(conn) as conn:
+        matches = conn.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM products_fts WHERE products_fts MATCH ? LIMIT ?
+            )
+        """, (query, SEARCH_RANK_LIMIT + 1)).fetchone()[0]
+
+        order = "" if matches > SEARCH_RANK_LIMIT else "ORDER BY bm25(products_fts, 10.0, 5.0, 1.0, 1.0)"
+
+        # Rank inside the FTS table first, then join only the top rows
+        rows = conn.execute(f"""
+            SELECT p.code, p.category, p.subcategory, p.description, p.unit, p.stock
+            FROM (
+                SELECT code, row_number() OVER () AS pos
+                FROM (
+                    SELECT code FROM products_fts
+                    WHERE products_fts MATCH ?
+                    {order}
+                    LIMIT ?
+                )
+            ) f
+            JOIN products p ON p.code = f.code
+            ORDER BY f.pos
+        """, (query, limit)).fetchall()
+
+    return [dict(r) for r in rows]
+
+
+def get_product_by_code(code: str, conn: sqlite3.Connection = None):
+    with db_connection(conn) as conn:
+        row = conn.execute("""
+            SELECT code, category, subcategory, description, unit, stock
+            FROM products
+            WHERE code = ?
+        """, (code,)).fetchone()
 
     if not row:
         return None
@@ -55,125 +194,287 @@ def get_product_by_code(code: str):
     }
 
 
-def insert_product(code, category, subcategory, description, unit, stock):
-    conn = get_connection()
-    cur = conn.cursor()
-
+def _insert_product_locked(cur, code, category, subcategory, description, unit, stock):
     cur.execute("""
         INSERT INTO products (code, category, subcategory, description, unit, stock)
         VALUES (?, ?, ?, ?, ?, ?)
     """, (code, category, subcategory, description, unit, stock))
+    record_movements(cur, {code: stock}, "initial")
 
-    conn.commit()
-    conn.close()
 
+def insert_product(code, category, subcategory, description, unit, stock):
+    writer.run(_insert_product_locked, code, category, subcategory, description, unit, stock)
 
-def update_product(code, category, subcategory, description, unit, stock):
-    conn = get_connection()
-    cur = conn.cursor()
 
+def _update_product_locked(cur, code, category, subcategory, description, unit, stock):
+    row = cur.execute("SELECT stock FROM products WHERE code=?", (code,)).fetchone()
     cur.execute("""
         UPDATE products
         SET category=?, subcategory=?, description=?, unit=?, stock=?
         WHERE code=?
     """, (category, subcategory, description, unit, stock, code))
+    if row is not None:
+        record_movements(cur, {code: stock - (row["stock"] or 0)}, "adjustment")
+
 
-    conn.commit()
-    conn.close()
+def update_product(code, category, subcategory, description, unit, stock):
+    writer.run(_update_product_locked, code, category, subcategory, description, unit, stock)
 
 
 # ============================================================
-# NEW FUNCTION: Subtract stock for EXITS module
+# BULK IMPORT (CSV / XLSX upsert)
 # ============================================================
 
-def subtract_quantity(product_code: str, quantity: float, conn: sqlite3.Connection = None):
+IMPORT_BATCH_SIZE = int(os.environ.get("PRODUCT_IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_ERRORS = 1000           # errors listed in the report (all are counted)
+
+IMPORT_REQUIRED = ("code", "category", "description", "unit")
+
+# Optional fields a missing column or blank cell leaves untouched on existing products
+IMPORT_KEEP_WHEN_BLANK = ("subcategory", "stock")
+
+# Header aliases (lower-case) -> product field
+IMPORT_ALIASES = {
+    "codigo": "code", "código": "code", "sku": "code",
+    "categoria": "category",
+    "subcategoria": "subcategory",
+    "descricao": "description", "descrição": "description",
+    "unidade": "unit", "un": "unit",
+    "estoque": "stock", "quantidade": "stock", "qty": "stock",
+}
+
+
+def _import_columns(header: list) -> dict:
+    """Product field -> column index. 400 if a required column is missing."""
+    columns = {}
+    for i, name in enumerate(header):
+        key = str(name or "").strip().lower()
+        field = key if key in PRODUCT_FIELDS else IMPORT_ALIASES.get(key)
+        if field and field not in columns:
+            columns[field] = i
+
+    missing = [f for f in IMPORT_REQUIRED if f not in columns]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing columns: {', '.join(missing)}")
+    return columns
+
+
+def _import_row(values: list, columns: dict):
+    """(product dict, errors). subcategory / stock are None when the file leaves them out."""
+    def cell(field):
+        i = columns.get(field)
+        return values[i] if i is not None and i < len(values) else None
+
+    product, errors = {}, []
+    for field in ("code", "category", "subcategory", "description", "unit"):
+        value = cell(field)
+        product[field] = str(value) if value is not None else None
+        if field in IMPORT_REQUIRED and product[field] is None:
+            errors.append(f"{field} is required")
+
+    stock = cell("stock")
+    if stock is not None:
+        try:
+            stock = float(str(stock).replace(",", ".")) if isinstance(stock, str) else float(stock)
+            if stock < 0 or not stock.is_integer():
+                raise ValueError
+            stock = int(stock)
+        except ValueError:
+            errors.append(f"stock must be a whole number >= 0 (got {cell('stock')!r})")
+            stock = None
+    product["stock"] = stock
+
+    return product, errors
+
+
+def _apply_import_batch(cur: sqlite3.Cursor, batch: list, dry_run: bool) -> dict:
     """
-    Safely subtracts stock for a product.
-    Works both inside an existing transaction or standalone.
+    Classifies and (unless dry_run) upserts one batch of valid rows.
+    Unchanged rows are skipped, so re-importing a catalog writes nothing.
+    """
+    codes = [p["code"] for p in batch]
+    placeholders = ", ".join("?" * len(codes))
+    cur.execute(f"""
+        SELECT code, category, subcategory, description, unit, stock
+        FROM products
+        WHERE code IN ({placeholders})
+    """, codes)
+    existing = {row["code"]: row for row in cur.fetchall()}
+
+    changed, deltas = [], {}
+    counts = {"created": 0, "updated": 0, "unchanged": 0}
+    for p in batch:
+        old = existing.get(p["code"])
+        if old is None:
+            counts["created"] += 1
+            deltas[p["code"]] = p["stock"] or 0
+        elif any(p[f] is not None and p[f] != old[f] for f in IMPORT_KEEP_WHEN_BLANK) \
+                or any(p[f] != old[f] for f in ("category", "description", "unit")):
+            counts["updated"] += 1
+            if p["stock"] is not None:
+                deltas[p["code"]] = p["stock"] - (old["stock"] or 0)
+        else:
+            counts["unchanged"] += 1
+            continue
+        changed.append(p)
+
+    if changed and not dry_run:
+        cur.executemany("""
+            INSERT INTO products (code, category, subcategory, description, unit, stock)
+            VALUES (:code, :category, :subcategory, :description, :unit, COALESCE(:stock, 0))
+            ON CONFLICT(code) DO UPDATE SET
+                category = excluded.category,
+                subcategory = COALESCE(excluded.subcategory, products.subcategory),
+                description = excluded.description,
+                unit = excluded.unit,
+                stock = COALESCE(:stock, products.stock)
+        """, changed)
+        record_movements(cur, deltas, "import")
+
+    return counts
+
+
+def import_products(header: list, rows, dry_run: bool = False) -> dict:
+    """
+    Upserts products from (row_number, values) rows, IMPORT_BATCH_SIZE
+    rows per write transaction. Invalid rows (and repeated codes) are
+    reported and skipped; a missing subcategory or stock column (or a
+    blank cell) keeps the existing product's value. With dry_run nothing
+    is written and no write lock is taken.
+
+    Batches commit independently: a database error aborts the import but
+    keeps the batches already committed (reported as "committed").
+    """
+    columns = _import_columns(header)
 
-    RETURNS (always this structure):
-    {
-        "product_code": "...",
-        "description": "...",
-        "unit": "...",
-        "previous_stock": 20,
-        "new_stock": 15
+    report = {
+        "dry_run": dry_run, "rows": 0, "created": 0, "updated": 0,
+        "unchanged": 0, "failed": 0, "committed": 0, "errors": [],
     }
-    """
+    seen = {}
+
+    def fail(row_number, code, messages):
+        report["failed"] += 1
+        if len(report["errors"]) < IMPORT_MAX_ERRORS:
+            report["errors"].append({"row": row_number, "code": code, "errors": messages})
+
+    def flush(batch):
+        if dry_run:
+            # Read-only: classify against one snapshot, no write lock
+            with db_connection() as conn:
+                cur = conn.cursor()
+                try:
+                    cur.execute("BEGIN")
+                    counts = _apply_import_batch(cur, batch, True)
+                finally:
+                    conn.rollback()
+        else:
+            counts = writer.run(_apply_import_batch, batch, False)
+        for key, n in counts.items():
+            report[key] += n
+        if not dry_run:
+            report["committed"] += len(batch)
+
+    batch = []
+    for row_number, values in rows:
+        report["rows"] += 1
+        product, errors = _import_row(values, columns)
+
+        code = product["code"]
+        if code is not None:
+            if code in seen:
+                errors.append(f"duplicate code (first seen on row {seen[code]})")
+            else:
+                seen[code] = row_number
+
+        if errors:
+            fail(row_number, code, errors)
+            continue
+
+        batch.append(product)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush(batch)
+            batch = []
+
+    if batch:
+        flush(batch)
+
+    report["errors_truncated"] = report["failed"] > len(report["errors"])
+    return report
+
 
-    own_conn = False
+# ============================================================
+# NEW FUNCTION: Subtract stock for EXITS module
+# ============================================================
 
+def _subtract_quantity_locked(cur, product_code: str, quantity: float) -> dict:
     # ---------------------------------------------------------
-    # If no connection provided, create and manage our own
+    # 1. Fetch current product row
     # ---------------------------------------------------------
-    if conn is None:
-        conn = get_connection()
-        own_conn = True
-        conn.execute("BEGIN IMMEDIATE")
-
-    try:
-        cur = conn.cursor()
-
-        # ---------------------------------------------------------
-        # 1. Fetch current product row
-        # ---------------------------------------------------------
-        cur.execute("""
-            SELECT code, description, unit, stock
-            FROM products
-            WHERE code = ?
-        """, (product_code,))
-        product = cur.fetchone()
-
-        if not product:
-            raise ValueError(f"Product '{product_code}' does not exist.")
-
-        previous_stock = float(product["stock"])
-        qty = float(quantity)
+    cur.execute("""
+        SELECT code, description, unit, stock
+        FROM products
+        WHERE code = ?
+    """, (product_code,))
+    product = cur.fetchone()
 
-        # ---------------------------------------------------------
-        # 2. Validate stock quantity
-        # ---------------------------------------------------------
-        if qty <= 0:
-            raise ValueError("Quantity must be greater than zero.")
+    if not product:
+        raise ValueError(f"Product '{product_code}' does not exist.")
 
-        if qty > previous_stock:
-            raise ValueError(
-                f"Insufficient stock for '{product_code}'. "
-                f"Available: {previous_stock}, Requested: {qty}"
-            )
+    previous_stock = float(product["stock"])
+    qty = float(quantity)
 
-        # ---------------------------------------------------------
-        # 3. Subtract stock
-        # ---------------------------------------------------------
-        new_stock = previous_stock - qty
+    # ---------------------------------------------------------
+    # 2. Validate stock quantity
+    # ---------------------------------------------------------
+    if qty <= 0:
+        raise ValueError("Quantity must be greater than zero.")
 
-        cur.execute("""
-            UPDATE products
-            SET stock = ?
-            WHERE code = ?
-        """, (new_stock, product_code))
+    if qty > previous_stock:
+        raise ValueError(
+            f"Insufficient stock for '{product_code}'. "
+            f"Available: {previous_stock}, Requested: {qty}"
+        )
 
-        if own_conn:
-            conn.commit()
+    # ---------------------------------------------------------
+    # 3. Subtract stock
+    # ---------------------------------------------------------
+    new_stock = previous_stock - qty
 
-        # ---------------------------------------------------------
-        # 4. Return full structured object (REQUIRED for exits)
-        # ---------------------------------------------------------
-        return {
-            "product_code": product["code"],
-            "description": product["description"],
-            "unit": product["unit"],
-            "previous_stock": previous_stock,
-            "new_stock": new_stock
-        }
+    cur.execute("""
+        UPDATE products
+        SET stock = ?
+        WHERE code = ?
+    """, (new_stock, product_code))
+    record_movements(cur, {product_code: -qty}, "exit")
 
-    except Exception as e:
-        if own_conn:
-            conn.rollback()
-        raise e
+    # ---------------------------------------------------------
+    # 4. Return full structured object (REQUIRED for exits)
+    # ---------------------------------------------------------
+    return {
+        "product_code": product["code"],
+        "description": product["description"],
+        "unit": product["unit"],
+        "previous_stock": previous_stock,
+        "new_stock": new_stock
+    }
 
-    finally:
-        if own_conn:
-            conn.close()
 
+def subtract_quantity(product_code: str, quantity: float, conn: sqlite3.Connection = None):
+    """
+    Safely subtracts stock for a product.
+    Works both inside an existing transaction (conn=...) or standalone,
+    as one job on the database writer.
 
+    RETURNS (always this structure):
+    {
+        "product_code": "...",
+        "description": "...",
+        "unit": "...",
+        "previous_stock": 20,
+        "new_stock": 15
+    }
+    """
+    if conn is not None:
+        return _subtract_quantity_locked(conn.cursor(), product_code, quantity)
+    return writer.run(_subtract_quantity_locked, product_code, quantity)
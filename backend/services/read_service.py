@@ -0,0 +1,30 @@
+"""
+Async read path.
+
+Read-heavy endpoints are `async def` and run their queries on the reader
+pool (executors.py): a fixed set of threads, each holding one read-only
+WAL connection, so concurrent reads neither wait for Starlette's shared
+thread pool nor for a pooled connection, and never block behind the
+writer. Any service function that takes `conn=` can be awaited:
+
+    result = await read(list_exits, destination="Obra A", limit=50)
+
+The reader connection is passed as `conn`; functions must only read
+(the connection is query_only) and must not close it.
+"""
+from backend.core.database import reader_connection
+from backend.core.executors import reader_pool
+
+
+def _call(fn, args, kwargs):
+    conn = reader_connection()
+    try:
+        return fn(*args, conn=conn, **kwargs)
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+
+
+async def read(fn, *args, **kwargs):
+    """Awaits fn(*args, conn=<reader connection>, **kwargs) on the reader pool."""
+    return await reader_pool.run(_call, fn, args, kwargs, task=fn.__name__)
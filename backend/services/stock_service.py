@@ -0,0 +1,249 @@
+"""
+Stock movement ledger.
+
+Every change to products.stock appends a row to stock_movements
+(delta + resulting balance) inside the same transaction as the change:
+
+    reason     ref
+    ---------  ---------
+    opening    -          (ledger start, migration 7)
+    initial    -          insert_product
+    adjustment -          update_product (stock overwritten)
+    import     -          import_products (new or changed stock)
+    receive    po_number  receive_po
+    exit       exit id    create_exit
+
+stock_checkpoints holds periodic snapshots of products.stock. Stock at
+time T is the later of the last movement and the last checkpoint at or
+before T, two index seeks per product instead of replaying history.
+"""
+import asyncio
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from backend.core.database import db_connection
+from backend.core.pagination import encode_cursor, decode_cursor
+from backend.core.writer import writer
+
+
+CHECKPOINT_INTERVAL_SECONDS = float(os.environ.get("STOCK_CHECKPOINT_HOURS", "24")) * 3600
+
+
+# ============================================================
+# WRITES (inside the caller's transaction)
+# ============================================================
+
+def record_movements(cur: sqlite3.Cursor, deltas: dict, reason: str, ref: int = None):
+    """
+    Appends one movement per product in `deltas` ({code: delta}).
+    Call after products.stock has been updated: balance_after is read
+    from the row as it is now.
+    """
+    cur.executemany("""
+        INSERT INTO stock_movements (product_code, delta, balance_after, reason, ref)
+        SELECT code, ?, stock, ?, ? FROM products WHERE code = ?
+    """, [(delta, reason, ref, code) for code, delta in deltas.items() if delta])
+
+
+def record_po_receipt(cur: sqlite3.Cursor, po_number: int):
+    """Movements for a received PO, quantities summed per product."""
+    cur.execute("""
+        INSERT INTO stock_movements (product_code, delta, balance_after, reason, ref)
+        SELECT p.code, t.qty, p.stock, 'receive', ?
+        FROM (
+            SELECT item_code, SUM(qty) AS qty
+            FROM po_items
+            WHERE po_number = ?
+            GROUP BY item_code
+        ) t
+        JOIN products p ON p.code = t.item_code
+        WHERE t.qty != 0
+    """, (po_number, po_number))
+
+
+# ============================================================
+# CHECKPOINTS
+# ============================================================
+
+def _create_checkpoint_locked(cur) -> dict:
+    last_id = cur.execute("SELECT COALESCE(MAX(id), 0) FROM stock_movements").fetchone()[0]
+
+    drift = cur.execute("""
+        SELECT COUNT(*)
+        FROM products p
+        JOIN stock_movements m ON m.id = (
+            SELECT id FROM stock_movements
+            WHERE product_code = p.code
+            ORDER BY created_at DESC, id DESC LIMIT 1
+        )
+        WHERE m.balance_after != p.stock
+    """).fetchone()[0]
+
+    cur.execute("""
+        INSERT INTO stock_checkpoints (product_code, balance, last_movement_id)
+        SELECT p.code, p.stock, ?
+        FROM products p
+        LEFT JOIN stock_checkpoints c ON c.id = (
+            SELECT id FROM stock_checkpoints
+            WHERE product_code = p.code
+            ORDER BY taken_at DESC, id DESC LIMIT 1
+        )
+        WHERE c.id IS NULL
+           OR c.balance != p.stock
+           OR EXISTS (
+               SELECT 1 FROM stock_movements m
+               WHERE m.product_code = p.code AND m.id > c.last_movement_id
+           )
+    """, (last_id,))
+
+    return {"checkpoints": cur.rowcount, "drift": drift, "last_movement_id": last_id}
+
+
+def create_checkpoint(conn: sqlite3.Connection = None) -> dict:
+    """
+    Snapshots products.stock for every product that moved since its last
+    checkpoint, or whose stock no longer matches the ledger (changed
+    outside the service layer). Returns counts.
+    """
+    if conn is not None:
+        return _create_checkpoint_locked(conn.cursor())
+    return writer.run(_create_checkpoint_locked)
+
+
+async def run_checkpoints(interval_seconds: float = CHECKPOINT_INTERVAL_SECONDS):
+    """Background task started by the app lifespan."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await run_in_threadpool(create_checkpoint)
+            if result["checkpoints"] or result["drift"]:
+                print(f"Stock checkpoint: {result}")
+        except Exception as e:
+            print(f"Stock checkpoint failed: {e}")
+
+
+# ============================================================
+# POINT-IN-TIME READS
+# ============================================================
+
+def _as_of(at: datetime) -> str:
+    # Timestamps are stored as SQLite CURRENT_TIMESTAMP (UTC, second precision)
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return at.strftime("%Y-%m-%d %H:%M:%S")
+
+
+_STOCK_AT_SQL = """
+    SELECT p.code, p.description, p.unit,
+           m.id AS movement_id, m.balance_after, m.created_at AS moved_at,
+           c.last_movement_id, c.balance AS checkpoint_balance, c.taken_at
+    FROM products p
+    LEFT JOIN stock_movements m ON m.id = (
+        SELECT id FROM stock_movements
+        WHERE product_code = p.code AND created_at <= :at
+        ORDER BY created_at DESC, id DESC LIMIT 1
+    )
+    LEFT JOIN stock_checkpoints c ON c.id = (
+        SELECT id FROM stock_checkpoints
+        WHERE product_code = p.code AND taken_at <= :at
+        ORDER BY taken_at DESC, id DESC LIMIT 1
+    )
+"""
+
+
+def _resolve(row) -> dict:
+    """Picks the newer of the movement and the checkpoint found for a product."""
+    use_checkpoint = row["last_movement_id"] is not None and (
+        row["movement_id"] is None or row["last_movement_id"] >= row["movement_id"]
+    )
+    if use_checkpoint:
+        stock, source, since = row["checkpoint_balance"], "checkpoint", row["taken_at"]
+    elif row["movement_id"] is not None:
+        stock, source, since = row["balance_after"], "movement", row["moved_at"]
+    else:
+        # Before the product (or the ledger) existed
+        stock, source, since = None, None, None
+
+    return {
+        "code": row["code"],
+        "description": row["description"],
+        "unit": row["unit"],
+        "stock": stock,
+        "source": source,
+        "since": since,
+    }
+
+
+def stock_at(code: str, at: datetime) -> dict:
+    with db_connection() as conn:
+        row = conn.execute(_STOCK_AT_SQL + " WHERE p.code = :code", {
+            "at": _as_of(at), "code": code
+        }).fetchone()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return _resolve(row)
+
+
+def stock_at_all(at: datetime, category: str = None, limit: int = 1000, cursor: str = None) -> dict:
+    """
+    Stock of every product at `at`, in code order, keyset-paginated.
+    Returns {"as_of", "products", "next_cursor"}.
+    """
+    where = []
+    params = {"at": _as_of(at), "limit": limit + 1}
+    if category:
+        where.append("p.category = :category")
+        params["category"] = category
+    if cursor:
+        (params["after"],) = decode_cursor(cursor, 1)
+        where.append("p.code > :after")
+
+    sql = _STOCK_AT_SQL
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY p.code LIMIT :limit"
+
+    with db_connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "as_of": params["at"],
+        "products": [_resolve(r) for r in rows],
+        "next_cursor": encode_cursor(rows[-1]["code"]) if has_more and rows else None
+    }
+
+
+def list_movements(code: str, limit: int = 100, cursor: str = None) -> dict:
+    """Ledger of one product, newest first (keyset on created_at, id)."""
+    sql = """
+        SELECT id, product_code, delta, balance_after, reason, ref, created_at
+        FROM stock_movements
+        WHERE product_code = ?
+    """
+    params = [code]
+    if cursor:
+        last_created_at, last_id = decode_cursor(cursor, 2)
+        sql += " AND (created_at, id) < (?, ?)"
+        params += [last_created_at, last_id]
+    sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    with db_connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    return {"movements": [dict(r) for r in rows], "next_cursor": next_cursor}
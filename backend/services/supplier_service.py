@@ -0,0 +1,36 @@
+import sqlite3
+
+from backend.core.database import db_connection
+from backend.core.writer import writer
+
+
+SUPPLIER_COLUMNS = "cnpj, name, address, neighborhood, city, state, cep, seller, cellphone, pix"
+
+
+def list_suppliers(conn: sqlite3.Connection = None) -> list:
+    with db_connection(conn) as conn:
+        rows = conn.execute(f"SELECT {SUPPLIER_COLUMNS} FROM suppliers").fetchall()
+    return [dict(row) for row in rows]
+
+
+def _register_supplier_locked(cur, item: dict):
+    cur.execute(f"""
+        INSERT INTO suppliers ({SUPPLIER_COLUMNS})
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        item["cnpj"],
+        item["name"],
+        item.get("address", ""),
+        item.get("neighborhood", ""),
+        item.get("city", ""),
+        item.get("state", ""),
+        item.get("cep", ""),
+        item.get("seller", ""),
+        item.get("cellphone", ""),
+        item.get("pix", "")
+    ))
+
+
+def register_supplier(item: dict):
+    """Inserts one supplier (a job on the database writer)."""
+    writer.run(_register_supplier_locked, item)
@@ -0,0 +1,80 @@
+"""
+Compares two benchmark result files (e.g. main vs a branch).
+
+    python -m benchmarks.compare results/base.json results/head.json --threshold 10
+
+Prints p50/p95/p99 and throughput per scenario with the relative change,
+and exits with status 1 when any scenario's p95 got slower by more than
+--threshold percent (or started failing requests).
+"""
+import argparse
+import json
+import sys
+
+
+def _change(base: float, head: float) -> float:
+    if not base:
+        return 0.0
+    return (head - base) / base * 100
+
+
+def compare(base: dict, head: dict, threshold: float) -> tuple:
+    rows, regressions = [], []
+    for name, h in head["scenarios"].items():
+        b = base["scenarios"].get(name)
+        if b is None:
+            rows.append((name, "new", "", "", "", ""))
+            continue
+
+        cells = []
+        for q in ("p50", "p95", "p99"):
+            bv, hv = b["latency_ms"][q], h["latency_ms"][q]
+            cells.append(f"{bv:.1f} -> {hv:.1f} ({_change(bv, hv):+.0f}%)")
+        cells.append(f"{b['throughput_rps']:.0f} -> {h['throughput_rps']:.0f} "
+                     f"({_change(b['throughput_rps'], h['throughput_rps']):+.0f}%)")
+        cells.append(f"{b['errors']} -> {h['errors']}")
+        rows.append((name, *cells))
+
+        if _change(b["latency_ms"]["p95"], h["latency_ms"]["p95"]) > threshold:
+            regressions.append(f"{name}: p95 {b['latency_ms']['p95']:.1f} -> {h['latency_ms']['p95']:.1f} ms")
+        if h["errors"] > b["errors"]:
+            regressions.append(f"{name}: errors {b['errors']} -> {h['errors']}")
+
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed p95 slowdown in percent")
+    args = parser.parse_args(argv)
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    for label, report in (("base", base), ("head", head)):
+        meta = report["meta"]
+        db = meta.get("database", {})
+        print(f"{label}: {meta.get('commit') or '?'}{' (dirty)' if meta.get('dirty') else ''} "
+              f"scale={db.get('scale')} concurrency={meta.get('concurrency')}")
+    if base["meta"].get("database", {}).get("scale") != head["meta"].get("database", {}).get("scale"):
+        print("warning: the two runs used different database scales")
+
+    rows, regressions = compare(base, head, args.threshold)
+    header = ("scenario", "p50 ms", "p95 ms", "p99 ms", "req/s", "errors")
+    widths = [max(len(str(r[i])) for r in [header, *rows]) for i in range(len(header))]
+    for row in [header, *rows]:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:g}%:")
+        for r in regressions:
+            print(f"  {r}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
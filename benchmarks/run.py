@@ -0,0 +1,227 @@
+"""
+Benchmark runner.
+
+    python -m benchmarks.run --scale 10k --requests 500 --concurrency 8 \
+        --output results/HEAD.json
+
+Seeds (or reuses, with --reuse) a synthetic database, starts the real
+app with its lifespan, and drives it through an in-process ASGI client
+(httpx.ASGITransport). Each scenario reports throughput and
+p50/p95/p99 latency; writer scenarios are repeated at every
+--writer-concurrency level and also report write-lock wait, the
+writer queue's group-commit batch size and queue wait (from
+backend.core.metrics) and failed requests, which is where write
+contention shows up.
+
+Results are JSON, meant to be compared with benchmarks.compare.
+Needs httpx (not an app dependency: pip install httpx).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    # Nearest-rank
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))]
+
+
+def summarize(latencies: list, statuses: Counter, elapsed: float) -> dict:
+    values = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3)
+    return {
+        "requests": len(values),
+        "errors": sum(n for code, n in statuses.items() if code >= 400),
+        "status": {str(code): n for code, n in sorted(statuses.items())},
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": ms(_percentile(values, 0.50)),
+            "p95": ms(_percentile(values, 0.95)),
+            "p99": ms(_percentile(values, 0.99)),
+            "mean": ms(sum(values) / len(values)) if values else 0.0,
+            "max": ms(values[-1]) if values else 0.0,
+        },
+    }
+
+
+async def run_scenario(client, scenario, ctx: dict, requests: int, concurrency: int) -> dict:
+    from backend.core import metrics
+
+    if scenario.setup is not None:
+        scenario.setup(ctx, requests)
+
+    latencies = []
+    statuses = Counter()
+    samples = []
+    next_index = iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            method, url, kwargs = scenario.build(ctx, i)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+            if response.status_code >= 400 and len(samples) < 3:
+                samples.append({"status": response.status_code, "body": response.text[:300]})
+
+    lock_before = metrics.db_lock_wait.totals()
+    batch_before, wait_before = metrics.writer_batch_size.totals(), metrics.writer_queue_wait.totals()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - started
+    lock_after = metrics.db_lock_wait.totals()
+    batch_after, wait_after = metrics.writer_batch_size.totals(), metrics.writer_queue_wait.totals()
+
+    result = summarize(latencies, statuses, elapsed)
+    result["concurrency"] = concurrency
+    result["description"] = scenario.description
+    if scenario.writer:
+        waits = lock_after[0] - lock_before[0]
+        result["lock_wait"] = {
+            "transactions": waits,
+            "total_ms": round((lock_after[1] - lock_before[1]) * 1000, 3),
+            "mean_ms": round((lock_after[1] - lock_before[1]) * 1000 / waits, 3) if waits else 0.0,
+        }
+        batches, jobs = batch_after[0] - batch_before[0], batch_after[1] - batch_before[1]
+        queued = wait_after[0] - wait_before[0]
+        result["writer"] = {
+            "batches": batches,
+            "mean_batch": round(jobs / batches, 3) if batches else 0.0,
+            "queue_wait_mean_ms": round((wait_after[1] - wait_before[1]) * 1000 / queued, 3) if queued else 0.0,
+        }
+    if samples:
+        result["error_samples"] = samples
+    return result
+
+
+def _git_info() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+async def run(args) -> dict:
+    import httpx
+    from benchmarks.scenarios import SCENARIOS
+    from benchmarks.seed import BENCH_USER, BENCH_PASSWORD, CATEGORIES
+
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)} (available: {', '.join(SCENARIOS)})")
+
+    from backend.main import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            r = await client.post("/auth/login", json={"username": BENCH_USER, "password": BENCH_PASSWORD})
+            r.raise_for_status()
+
+            ctx = {
+                **args.seed_info,
+                "db_path": args.db,
+                "headers": {"Authorization": f"Bearer {r.json()['access_token']}"},
+                "categories": CATEGORIES,
+                "rnd": random.Random(args.seed),
+            }
+
+            for name in names:
+                scenario = SCENARIOS[name]
+                requests = max(1, int(args.requests * scenario.weight))
+                levels = args.writer_concurrency if scenario.writer else [args.concurrency]
+                for level in levels:
+                    key = name if len(levels) == 1 else f"{name}@c{level}"
+                    print(f"  {key}: {requests} requests, concurrency {level}", file=sys.stderr)
+                    results[key] = await run_scenario(client, scenario, ctx, requests, level)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API hot-path benchmarks")
+    parser.add_argument("--scale", default="10k", help="1k | 10k | 100k | 1m")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default=None, help="benchmark database path (default: temp dir)")
+    parser.add_argument("--reuse", action="store_true", help="reuse --db if it was seeded with the same scale/seed")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario (scaled by its weight)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--writer-concurrency", default="1,4,16",
+                        help="comma-separated concurrency levels for writer scenarios")
+    parser.add_argument("--scenarios", default=None, help="comma-separated subset (default: all)")
+    parser.add_argument("--output", default=None, help="write JSON here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    from benchmarks.seed import SCALES
+    if args.scale not in SCALES:
+        parser.error(f"--scale must be one of {', '.join(SCALES)}")
+    args.writer_concurrency = [int(c) for c in args.writer_concurrency.split(",") if c]
+
+    if args.db is None:
+        args.db = os.path.join(tempfile.mkdtemp(prefix="inventory-bench-"), "bench.db")
+    args.db = os.path.abspath(args.db)
+
+    # Must be set before anything under backend/ is imported
+    os.environ["INVENTORY_DB_PATH"] = args.db
+    os.environ.setdefault("DOC_CACHE_DIR", os.path.join(os.path.dirname(args.db), "doc_cache"))
+    os.environ.setdefault("STOCK_CHECKPOINT_HOURS", "0")
+
+    from benchmarks.seed import seed_database, existing_seed
+
+    seed_info = existing_seed(args.db, args.scale, args.seed) if args.reuse else None
+    if seed_info is None:
+        print(f"Seeding {args.scale} database at {args.db} ...", file=sys.stderr)
+        seed_info = seed_database(args.db, args.scale, args.seed)
+        print(f"  done in {seed_info['seconds']}s", file=sys.stderr)
+    args.seed_info = seed_info
+
+    started = time.time()
+    scenarios = asyncio.run(run(args))
+
+    report = {
+        "meta": {
+            **_git_info(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started)),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "database": seed_info,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "writer_concurrency": args.writer_concurrency,
+        },
+        "scenarios": scenarios,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
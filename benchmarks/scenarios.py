@@ -0,0 +1,200 @@
+"""
+Benchmark scenarios: one hot path each.
+
+A scenario builds the i-th request of a run from the shared context
+(`ctx`: auth headers, seeded counts, ids reserved by setup). Requests go
+through the full app (routing, auth dependency, validation, thread /
+process pools), only the socket is skipped.
+"""
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.seed import BENCH_USER, BENCH_PASSWORD, PO_PARTY_FIELDS, product_code
+
+
+class Scenario:
+
+    def __init__(self, name: str, build, description: str = "", setup=None,
+                 weight: float = 1.0, writer: bool = False):
+        self.name = name
+        self.build = build              # (ctx, i) -> (method, url, request kwargs)
+        self.description = description
+        self.setup = setup              # (ctx, requests) -> None, before timing starts
+        self.weight = weight            # share of --requests this scenario runs
+        self.writer = writer            # also run at every --writer-concurrency level
+
+
+def _product(ctx, rnd: random.Random) -> str:
+    return product_code(rnd.randint(1, ctx["products"]))
+
+
+# ======================================================
+# READS
+# ======================================================
+
+def _login(ctx, i):
+    return "POST", "/auth/login", {"json": {"username": BENCH_USER, "password": BENCH_PASSWORD}}
+
+
+def _auth_cached(ctx, i):
+    return "GET", f"/api/products/{_product(ctx, ctx['rnd'])}", {"headers": ctx["headers"]}
+
+
+def _auth_uncached(ctx, i):
+    # A different token and an evicted user every request: JWT decode + user lookup each time
+    # (at concurrency > 1 a request in flight may refill the cache in between)
+    from backend.services.auth_service import invalidate_user
+    invalidate_user(BENCH_USER)
+    headers = {"Authorization": f"Bearer {ctx['tokens'][i % len(ctx['tokens'])]}"}
+    return "GET", f"/api/products/{_product(ctx, ctx['rnd'])}", {"headers": headers}
+
+
+def _setup_tokens(ctx, requests):
+    from backend.services.auth_service import invalidate_user
+    from backend.services.jwt_service import create_access_token
+    invalidate_user(BENCH_USER)
+    ctx["tokens"] = [create_access_token({"sub": BENCH_USER, "n": n}) for n in range(requests)]
+
+
+def _products_page(ctx, i):
+    category = ctx["categories"][i % len(ctx["categories"])]
+    return "GET", f"/api/products/?limit=100&category={category}", {"headers": ctx["headers"]}
+
+
+def _products_search(ctx, i):
+    term = ctx["rnd"].choice(["parafuso", "cabo", "tinta", "broca", "disjuntor"])
+    return "GET", f"/api/products/search?q={term}", {"headers": ctx["headers"]}
+
+
+def _exits_list(ctx, i):
+    return "GET", "/api/exits/list?limit=50", {"headers": ctx["headers"]}
+
+
+def _exits_list_cursor(ctx, i):
+    return "GET", "/api/exits/list?limit=50&with_total=false", {"headers": ctx["headers"]}
+
+
+def _exits_by_product(ctx, i):
+    return "GET", f"/api/exits/list?limit=50&product_code={_product(ctx, ctx['rnd'])}", {"headers": ctx["headers"]}
+
+
+def _entries_export_csv(ctx, i):
+    since = (datetime.utcnow() - timedelta(days=30)).date().isoformat()
+    return "GET", f"/api/entries/export?format=csv&date_from={since}", {"headers": ctx["headers"]}
+
+
+def _entries_export_xlsx(ctx, i):
+    since = (datetime.utcnow() - timedelta(days=30)).date().isoformat()
+    return "GET", f"/api/entries/export?format=xlsx&date_from={since}", {"headers": ctx["headers"]}
+
+
+def _po_list(ctx, i):
+    # Unfiltered every 4th request, otherwise one status
+    status = ("", "OPEN", "APPROVED", "RECEIVED")[i % 4]
+    url = f"/api/po/?limit=100&status={status}" if status else "/api/po/?limit=100"
+    return "GET", url, {"headers": ctx["headers"]}
+
+
+def _dashboard(ctx, i):
+    return "GET", "/api/dashboard/summary?days=30", {"headers": ctx["headers"]}
+
+
+# ======================================================
+# PDF
+# ======================================================
+
+def _po_pdf(ctx, i):
+    # Distinct POs: first render of each one (document cache cold)
+    po_number = ctx["pdf_pos"][i % len(ctx["pdf_pos"])]
+    return "GET", f"/api/po/{po_number}/pdf/", {"headers": ctx["headers"]}
+
+
+def _po_pdf_cached(ctx, i):
+    return "GET", "/api/po/1/pdf/", {"headers": ctx["headers"]}
+
+
+def _exit_pdf(ctx, i):
+    exit_id = ctx["pdf_exits"][i % len(ctx["pdf_exits"])]
+    return "GET", f"/api/exits-print/{exit_id}/pdf/", {"headers": ctx["headers"]}
+
+
+def _setup_pdf_ids(ctx, requests):
+    # Distinct ids, same ones for the same seed
+    rnd = random.Random(ctx["seed"])
+    ctx["pdf_pos"] = rnd.sample(range(1, ctx["purchase_orders"] + 1), min(requests, ctx["purchase_orders"]))
+    ctx["pdf_exits"] = rnd.sample(range(1, ctx["exits"] + 1), min(requests, ctx["exits"]))
+
+
+# ======================================================
+# WRITES
+# ======================================================
+
+def _exit_create(ctx, i):
+    rnd = ctx["rnd"]
+    items = [{"product_code": _product(ctx, rnd), "qty": 1} for _ in range(rnd.randint(1, 3))]
+    return "POST", "/api/exits/create", {
+        "headers": ctx["headers"],
+        "json": {"destination": "Benchmark", "items": items},
+    }
+
+
+def _setup_receive(ctx, requests):
+    """Inserts `requests` APPROVED POs (10 lines each) to be received."""
+    import sqlite3
+    rnd = random.Random(ctx["seed"] + 1)
+    conn = sqlite3.connect(ctx["db_path"], timeout=30)
+    try:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        pos = []
+        for _ in range(requests):
+            cur.execute("""
+                INSERT INTO purchase_orders (supplier_cnpj, supplier_name, status, {})
+                VALUES ('10000000000001', 'Fornecedor 1', 'APPROVED', {})
+            """.format(", ".join(PO_PARTY_FIELDS), ", ".join("?" * len(PO_PARTY_FIELDS))),
+                tuple(PO_PARTY_FIELDS.values()))
+            po_number = cur.lastrowid
+            lines = []
+            for _ in range(10):
+                code = _product(ctx, rnd)
+                qty, price = rnd.randint(1, 50), round(rnd.uniform(0.5, 200), 2)
+                lines.append((po_number, code, f"Item {code}", "UN", qty, price, round(qty * price, 2)))
+            cur.executemany("""
+                INSERT INTO po_items (po_number, item_code, description, unit, qty, unit_price, line_total)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, lines)
+            pos.append(po_number)
+        conn.commit()
+    finally:
+        conn.close()
+    ctx["receive_pos"] = pos
+
+
+def _receive_po(ctx, i):
+    return "PUT", f"/api/po/{ctx['receive_pos'][i]}/receive", {"headers": ctx["headers"]}
+
+
+# ======================================================
+# REGISTRY
+# ======================================================
+
+SCENARIOS = {s.name: s for s in [
+    Scenario("login", _login, "POST /auth/login (bcrypt on the auth pool)", weight=0.2),
+    Scenario("auth_cached", _auth_cached, "get_current_user with a cached token + product by code"),
+    Scenario("auth_uncached", _auth_uncached, "get_current_user with a new token and no cached user every request", setup=_setup_tokens),
+    Scenario("products_page", _products_page, "GET /api/products/ (100 per page, by category)"),
+    Scenario("products_search", _products_search, "GET /api/products/search (FTS)"),
+    Scenario("exits_list", _exits_list, "list_exits_route, first page with total"),
+    Scenario("exits_list_keyset", _exits_list_cursor, "list_exits_route without COUNT"),
+    Scenario("exits_by_product", _exits_by_product, "list_exits_route filtered by product"),
+    Scenario("entries_export_csv", _entries_export_csv, "GET /api/entries/export, last 30 days, CSV", weight=0.1),
+    Scenario("entries_export_xlsx", _entries_export_xlsx, "GET /api/entries/export, last 30 days, XLSX", weight=0.1),
+    Scenario("po_list", _po_list, "GET /api/po/ (100 per page, by status)"),
+    Scenario("dashboard", _dashboard, "GET /api/dashboard/summary"),
+    Scenario("po_pdf", _po_pdf, "PO PDF, cold document cache", setup=_setup_pdf_ids, weight=0.2),
+    Scenario("po_pdf_cached", _po_pdf_cached, "PO PDF, warm document cache"),
+    Scenario("exit_pdf", _exit_pdf, "Exit PDF, cold document cache", setup=_setup_pdf_ids, weight=0.2),
+    Scenario("exit_create", _exit_create, "POST /api/exits/create (1-3 lines)", writer=True),
+    Scenario("receive_po", _receive_po, "PUT /api/po/{n}/receive (10 lines)", setup=_setup_receive,
+             weight=0.5, writer=True),
+]}
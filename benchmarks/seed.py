@@ -0,0 +1,250 @@
+"""
+Synthetic database for the benchmark suite.
+
+Builds the schema through the app's own migrations, then bulk-loads
+products, suppliers, received POs (po_items + entries_history) and exits
+with plain executemany batches. Summary tables and FTS are kept
+consistent by the app's triggers; the ledger and average costs get the
+same one-off backfill a migrated database would have.
+
+Data is deterministic for a given scale and seed, so two commits are
+measured against identical databases.
+"""
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+
+# scale -> row counts (entries = PO lines, exits have 1-3 lines each)
+SCALES = {
+    "1k": {"products": 1_000, "entries": 1_000, "exits": 1_000},
+    "10k": {"products": 10_000, "entries": 10_000, "exits": 10_000},
+    "100k": {"products": 100_000, "entries": 100_000, "exits": 100_000},
+    "1m": {"products": 1_000_000, "entries": 1_000_000, "exits": 1_000_000},
+}
+
+BENCH_USER = "bench"
+BENCH_PASSWORD = "bench-password"
+
+CATEGORIES = ["ELETRICA", "HIDRAULICA", "FERRAGENS", "PINTURA", "FERRAMENTAS", "EPI", "MADEIRA", "LIMPEZA"]
+UNITS = ["UN", "KG", "M", "CX", "L"]
+WORDS = ["Parafuso", "Porca", "Arruela", "Cabo", "Tubo", "Joelho", "Luva", "Tinta", "Broca", "Fita",
+         "Disjuntor", "Tomada", "Lixa", "Rolo", "Pincel", "Martelo", "Serra", "Bucha", "Prego", "Cola"]
+DESTINATIONS = [f"Obra {n}" for n in range(1, 41)]
+
+# Address block printed on every PO (the PDF expects all of them)
+PO_PARTY_FIELDS = {
+    "supplier_address": "Rua das Flores, 100", "supplier_neighborhood": "Centro",
+    "supplier_city": "Sao Paulo", "supplier_state": "SP", "supplier_cep": "01000-000",
+    "supplier_pix": "pix@fornecedor.com", "supplier_contact": "Vendas - 11 99999-0000",
+    "buyer_cnpj": "20000000000001", "buyer_name": "Construtora Benchmark",
+    "buyer_address": "Av. Paulista, 1000", "buyer_neighborhood": "Bela Vista",
+    "buyer_city": "Sao Paulo", "buyer_state": "SP", "buyer_cep": "01310-100",
+    "buyer_pix": "", "buyer_contact": "Compras - 11 98888-0000",
+}
+
+LINES_PER_PO = 10
+INITIAL_STOCK = 1_000_000       # exits never run out during a run
+HISTORY_DAYS = 365
+BATCH = 10_000
+
+
+def product_code(n: int) -> str:
+    return f"P{n:07d}"
+
+
+def _batches(rows, size: int = BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _timestamps(count: int, start: datetime, end: datetime):
+    step = (end - start) / max(count, 1)
+    for i in range(count):
+        yield (start + step * i).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _seed_products(cur, rnd: random.Random, n: int):
+    def rows():
+        for i in range(1, n + 1):
+            category = CATEGORIES[i % len(CATEGORIES)]
+            desc = f"{rnd.choice(WORDS)} {rnd.choice(WORDS).lower()} {i}"
+            yield (product_code(i), category, f"{category[:3]}-{i % 25}", desc, rnd.choice(UNITS), INITIAL_STOCK)
+
+    for batch in _batches(rows()):
+        cur.executemany("""
+            INSERT INTO products (code, category, subcategory, description, unit, stock)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, batch)
+
+
+def _seed_suppliers(cur, count: int = 50) -> list:
+    suppliers = [(f"{10_000_000_000_000 + i}", f"Fornecedor {i}") for i in range(1, count + 1)]
+    cur.executemany("INSERT INTO suppliers (cnpj, name, city, state) VALUES (?, ?, 'Sao Paulo', 'SP')", suppliers)
+    return suppliers
+
+
+def _seed_pos(cur, rnd: random.Random, products: int, entries: int, suppliers: list, start, end):
+    po_count = max(1, entries // LINES_PER_PO)
+    created = list(_timestamps(po_count, start, end))
+
+    po_rows, item_rows, entry_rows = [], [], []
+    for po_number in range(1, po_count + 1):
+        cnpj, name = suppliers[po_number % len(suppliers)]
+        ts = created[po_number - 1]
+        po_rows.append((po_number, f"PO{po_number:06d}", cnpj, name, ts, ts))
+        for _ in range(LINES_PER_PO):
+            code = product_code(rnd.randint(1, products))
+            qty = rnd.randint(1, 50)
+            price = round(rnd.uniform(0.5, 200), 2)
+            total = round(qty * price, 2)
+            item_rows.append((po_number, code, f"Item {code}", "UN", qty, price, total))
+            entry_rows.append((po_number, cnpj, name, code, f"Item {code}", "UN", qty, price, total, ts))
+
+        if len(item_rows) >= BATCH:
+            _flush_pos(cur, po_rows, item_rows, entry_rows)
+
+    _flush_pos(cur, po_rows, item_rows, entry_rows)
+    return po_count
+
+
+def _flush_pos(cur, po_rows, item_rows, entry_rows):
+    cur.executemany("""
+        INSERT INTO purchase_orders (po_number, po_code, supplier_cnpj, supplier_name,
+                                     created_at, received_at, status, {})
+        VALUES (?, ?, ?, ?, ?, ?, 'RECEIVED', {})
+    """.format(", ".join(PO_PARTY_FIELDS), ", ".join("?" * len(PO_PARTY_FIELDS))),
+        [row + tuple(PO_PARTY_FIELDS.values()) for row in po_rows])
+    cur.executemany("""
+        INSERT INTO po_items (po_number, item_code, description, unit, qty, unit_price, line_total)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, item_rows)
+    cur.executemany("""
+        INSERT INTO entries_history (po_number, supplier_cnpj, supplier_name, product_code, description,
+                                     unit, qty, unit_cost, line_total, received_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, entry_rows)
+    po_rows.clear()
+    item_rows.clear()
+    entry_rows.clear()
+
+
+def _seed_exits(cur, rnd: random.Random, products: int, exits: int, user_id: int, start, end):
+    header_rows, item_rows = [], []
+    for exit_id, ts in enumerate(_timestamps(exits, start, end), start=1):
+        header_rows.append((exit_id, f"EX-{exit_id:06d}", rnd.choice(DESTINATIONS), user_id, ts))
+        for _ in range(rnd.randint(1, 3)):
+            code = product_code(rnd.randint(1, products))
+            qty = rnd.randint(1, 10)
+            cost = round(rnd.uniform(0.5, 200), 2)
+            item_rows.append((exit_id, code, f"Item {code}", "UN", qty, cost, round(qty * cost, 2)))
+
+        if len(item_rows) >= BATCH:
+            _flush_exits(cur, header_rows, item_rows)
+
+    _flush_exits(cur, header_rows, item_rows)
+
+
+def _flush_exits(cur, header_rows, item_rows):
+    cur.executemany("""
+        INSERT INTO exits (id, exit_code, destination, created_by, created_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, header_rows)
+    cur.executemany("""
+        INSERT INTO exit_items (exit_id, product_code, description, unit, qty, unit_cost, line_total)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, item_rows)
+    header_rows.clear()
+    item_rows.clear()
+
+
+def seed_database(db_path: str, scale: str = "10k", seed: int = 42) -> dict:
+    """
+    Creates a fresh benchmark database at `db_path`.
+    INVENTORY_DB_PATH must already point at it (backend reads it on import).
+    """
+    from backend.core.database import initialize_database, pool
+    from backend.services.auth_service import hash_password
+
+    counts = SCALES[scale]
+    rnd = random.Random(seed)
+    started = time.perf_counter()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    initialize_database()
+    pool.close_all()
+
+    end = datetime.utcnow().replace(microsecond=0)
+    start = end - timedelta(days=HISTORY_DAYS)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous = OFF")
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN")
+        cur.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                    (BENCH_USER, hash_password(BENCH_PASSWORD)))
+        user_id = cur.lastrowid
+
+        _seed_products(cur, rnd, counts["products"])
+        suppliers = _seed_suppliers(cur)
+        po_count = _seed_pos(cur, rnd, counts["products"], counts["entries"], suppliers, start, end)
+        _seed_exits(cur, rnd, counts["products"], counts["exits"], user_id, start, end)
+
+        # What migrations 7 and 9 backfill on an existing database
+        cur.execute("""
+            INSERT INTO stock_movements (product_code, delta, balance_after, reason)
+            SELECT code, stock, stock, 'opening' FROM products
+        """)
+        cur.execute("""
+            INSERT INTO product_costs (product_code, avg_cost)
+            SELECT product_code, SUM(line_total) / SUM(qty)
+            FROM entries_history
+            GROUP BY product_code
+            HAVING SUM(qty) > 0
+        """)
+        cur.execute("UPDATE document_sequences SET next_value = ? WHERE prefix = 'EX'", (counts["exits"] + 1,))
+        conn.commit()
+
+        cur.execute("ANALYZE")
+        cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    info = {
+        "scale": scale,
+        "seed": seed,
+        **counts,
+        "purchase_orders": po_count,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    with open(db_path + ".seed.json", "w") as f:
+        json.dump(info, f)
+    return info
+
+
+def existing_seed(db_path: str, scale: str, seed: int):
+    """Seed info of a database built earlier with the same parameters, or None."""
+    try:
+        with open(db_path + ".seed.json") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not os.path.exists(db_path) or info.get("scale") != scale or info.get("seed") != seed:
+        return None
+    return info
@@ -0,0 +1,82 @@
+/* ============================================
+   DASHBOARD SUMMARY — dashboard.js
+   One request to /api/dashboard/summary (server-side aggregates)
+============================================ */
+
+function fmtMoney(v) {
+    return "R$ " + Number(v || 0).toLocaleString("pt-BR", {
+        minimumFractionDigits: 2,
+        maximumFractionDigits: 2
+    });
+}
+
+function fmtQty(v) {
+    return Number(v || 0).toLocaleString("pt-BR");
+}
+
+/* =======================
+   Load + Render
+   ======================= */
+async function loadDashboardSummary() {
+    const box = document.getElementById("dashboardSummary");
+    if (!box) return;
+
+    const data = await apiGET("/api/dashboard/summary?days=14");
+    if (!data) {
+        box.innerHTML = `<div style="color:red;">Failed to load summary.</div>`;
+        return;
+    }
+
+    const inv = data.inventory;
+    const po = data.purchase_orders;
+    const approved = po.by_status.APPROVED || { count: 0, value: 0 };
+
+    const tiles = [
+        ["Inventory value", fmtMoney(inv.stock_value)],
+        ["Products", fmtQty(inv.products)],
+        ["Open POs", `${po.open.count} · ${fmtMoney(po.open.value)}`],
+        ["Approved POs", `${approved.count} · ${fmtMoney(approved.value)}`]
+    ];
+
+    const catRows = data.categories.map(c => `
+        <tr>
+            <td>${escapeHtml(c.category || "—")}</td>
+            <td>${fmtQty(c.products)}</td>
+            <td>${fmtQty(c.stock_qty)}</td>
+            <td>${fmtMoney(c.stock_value)}</td>
+        </tr>`).join("");
+
+    const dayRows = data.daily.slice().reverse().map(d => `
+        <tr>
+            <td>${escapeHtml(d.day)}</td>
+            <td>${fmtQty(d.entry_lines)}</td>
+            <td>${fmtMoney(d.entry_value)}</td>
+            <td>${fmtQty(d.exits)}</td>
+            <td>${fmtQty(d.exit_qty)}</td>
+        </tr>`).join("");
+
+    box.innerHTML = `
+        <div style="display:grid; grid-template-columns:repeat(4, 1fr); gap:15px; margin-bottom:20px;">
+            ${tiles.map(([label, value]) => `
+                <div class="card" style="margin:0;">
+                    <div style="opacity:0.7; font-size:13px;">${label}</div>
+                    <div style="font-size:20px; margin-top:6px;">${value}</div>
+                </div>`).join("")}
+        </div>
+
+        <div class="card">
+            <h3 style="margin-top:0;">Stock per category</h3>
+            <table>
+                <thead><tr><th>Category</th><th>Products</th><th>Stock</th><th>Value</th></tr></thead>
+                <tbody>${catRows || "<tr><td colspan='4'>No products.</td></tr>"}</tbody>
+            </table>
+        </div>
+
+        <div class="card">
+            <h3 style="margin-top:0;">Last 14 days</h3>
+            <table>
+                <thead><tr><th>Day</th><th>Entry lines</th><th>Entries value</th><th>Exits</th><th>Exit qty</th></tr></thead>
+                <tbody>${dayRows || "<tr><td colspan='5'>No movements.</td></tr>"}</tbody>
+            </table>
+        </div>`;
+}
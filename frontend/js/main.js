@@ -65,7 +65,8 @@ function loadDefaultScreen() {
     // ⛔ Inventory no longer loads automatically
     // ⛔ Do NOT call safeCall("loadInventory")
 
-    // Leave blank = landing page stays visible
+    // Landing page: summary tiles only (one small request)
+    safeCall("loadDashboardSummary");
     console.log("Dashboard loaded. Awaiting user action.");
 }
 
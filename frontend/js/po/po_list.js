@@ -6,8 +6,11 @@
 /* =======================
    GLOBALS
    ======================= */
-let poList = [];        // Full list from backend
+let poList = [];        // Pages loaded so far
 let filteredPOs = [];   // Filtered list
+let poNextCursor = null;
+
+const PO_PAGE_SIZE = 200;
 
 /* =======================
    PAGE LOADER
@@ -36,22 +39,28 @@ function loadPOs() {
 /* =======================
    LOAD PO DATA
    ======================= */
-async function loadPOList() {
+async function loadPOList(more = false) {
     try {
-        const data = await apiGET("/api/po/");
+        let url = `/api/po/?limit=${PO_PAGE_SIZE}`;
+        if (more && poNextCursor) url += `&cursor=${encodeURIComponent(poNextCursor)}`;
+
+        const data = await apiGET(url);
         if (!data || !data.purchase_orders) throw new Error("Failed to fetch POs");
 
-        poList = data.purchase_orders || [];
-        filteredPOs = poList.slice();
+        poList = more ? poList.concat(data.purchase_orders) : data.purchase_orders;
+        poNextCursor = data.next_cursor || null;
+
+        const btn = document.getElementById("poLoadMore");
+        if (btn) btn.style.display = poNextCursor ? "" : "none";
 
-        renderPOList();
+        applyPOFilters();
 
     } catch (err) {
         console.error("Error loading PO list:", err);
         const tb = document.getElementById("poListBody");
         if (tb) {
             tb.innerHTML =
-                "<tr><td colspan='5' style='padding:20px;text-align:center;'>Failed to load POs</td></tr>";
+                "<tr><td colspan='7' style='padding:20px;text-align:center;'>Failed to load POs</td></tr>";
         }
     }
 }
@@ -87,7 +96,7 @@ function renderPOList() {
     if (filteredPOs.length === 0) {
         tbody.innerHTML = `
             <tr>
-                <td colspan="5" style="text-align:center; padding:12px;">
+                <td colspan="7" style="text-align:center; padding:12px;">
                     No purchase orders found.
                 </td>
             </tr>
@@ -101,6 +110,8 @@ function renderPOList() {
             <td>${escapeHtml(po.supplier_name)}</td>
             <td>${new Date(po.created_at).toLocaleDateString()}</td>
             <td>${escapeHtml(po.status)}</td>
+            <td>${po.item_count}</td>
+            <td>R$ ${Number(po.total_value || 0).toLocaleString("pt-BR", { minimumFractionDigits: 2, maximumFractionDigits: 2 })}</td>
             <td>
                 <button class="btn ghost" onclick="openPO(${po.po_number})">
                     Open
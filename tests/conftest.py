@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# backend.core.database reads the path on import: never touch the real database
+os.environ.setdefault("INVENTORY_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="inventory-tests-"), "inventory.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
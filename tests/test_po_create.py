@@ -0,0 +1,59 @@
+"""
+PO creation (backend/services/po_service.py) against the test database:
+failed creates, single or inside a bulk request, must not open a gap
+between po_number and the printed po_code.
+"""
+import pytest
+from fastapi import HTTPException
+
+from backend.core.database import db_connection, initialize_database
+from backend.core.writer import writer
+from backend.services.po_service import PO_PARTY_FIELDS, create_po, create_pos
+from backend.services.product_service import insert_product
+
+
+@pytest.fixture(scope="module", autouse=True)
+def database():
+    initialize_database()
+    insert_product("POT1", "CAT", "SUB", "Parafuso", "UN", 10)
+    yield
+    writer.stop()
+
+
+def _po(code: str = "POT1", unit: str = "UN") -> dict:
+    po = {f: "x" for f in PO_PARTY_FIELDS}
+    po["items"] = [{"code": code, "unit": unit, "qty": 2, "price": 1.5}]
+    return po
+
+
+def _codes() -> list:
+    with db_connection() as conn:
+        return [tuple(r) for r in conn.execute("SELECT po_number, po_code FROM purchase_orders ORDER BY po_number")]
+
+
+def _assert_codes_follow_numbers():
+    codes = _codes()
+    assert codes
+    assert all(code == f"PO{number:06d}" for number, code in codes), codes
+
+
+def test_failed_create_leaves_no_gap():
+    create_po(_po())
+    for bad in (_po(code="MISSING"), _po(unit="KG")):
+        with pytest.raises(HTTPException) as exc:
+            create_po(bad)
+        assert exc.value.status_code == 400
+
+    created = create_po(_po())
+
+    assert created["po_code"] == f"PO{created['po_number']:06d}"
+    _assert_codes_follow_numbers()
+
+
+def test_bulk_failures_leave_no_gap():
+    result = create_pos([_po(), _po(code="MISSING"), _po(), _po(unit="KG"), _po()])
+
+    assert [f["index"] for f in result["failed"]] == [1, 3]
+    numbers = [c["po_number"] for c in result["created"]]
+    assert numbers == list(range(numbers[0], numbers[0] + 3))
+    _assert_codes_follow_numbers()
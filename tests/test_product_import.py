@@ -0,0 +1,61 @@
+"""
+Product bulk import (backend/services/product_service.py) against the
+test database: optional columns the file leaves out keep their values.
+"""
+import io
+
+import pytest
+
+from backend.core.database import db_connection, initialize_database
+from backend.core.imports import read_table
+from backend.core.writer import writer
+from backend.services.product_service import import_products
+
+
+@pytest.fixture(scope="module", autouse=True)
+def database():
+    initialize_database()
+    yield
+    writer.stop()
+
+
+def _import(text: str, dry_run: bool = False) -> dict:
+    header, rows = read_table("csv", io.BytesIO(text.encode("utf-8")))
+    return import_products(header, rows, dry_run=dry_run)
+
+
+def _product(code: str) -> dict:
+    with db_connection() as conn:
+        row = conn.execute(
+            "SELECT code, category, subcategory, description, unit, stock FROM products WHERE code = ?", (code,)
+        ).fetchone()
+    return dict(row)
+
+
+def test_missing_subcategory_column_keeps_existing_value():
+    report = _import("code,category,subcategory,description,unit,stock\nIMP1,CAT,SUB,Desc,UN,5\n")
+    assert report["created"] == 1
+
+    report = _import("code,category,description,unit\nIMP1,CAT,Desc,UN\n")
+
+    assert (report["updated"], report["unchanged"]) == (0, 1)
+    assert _product("IMP1") == {"code": "IMP1", "category": "CAT", "subcategory": "SUB",
+                                "description": "Desc", "unit": "UN", "stock": 5}
+
+
+def test_blank_subcategory_cell_keeps_existing_value():
+    _import("code,category,subcategory,description,unit\nIMP2,CAT,SUB,Desc,UN\n")
+
+    report = _import("code,category,subcategory,description,unit\nIMP2,CAT,,New desc,UN\n")
+
+    assert report["updated"] == 1
+    product = _product("IMP2")
+    assert (product["subcategory"], product["description"]) == ("SUB", "New desc")
+
+
+def test_dry_run_counts_match_the_real_import():
+    _import("code,category,subcategory,description,unit\nIMP3,CAT,SUB,Desc,UN\n")
+    text = "code,category,description,unit\nIMP3,CAT,Desc,UN\n"
+
+    assert _import(text, dry_run=True)["unchanged"] == 1
+    assert _import(text)["unchanged"] == 1
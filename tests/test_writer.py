@@ -0,0 +1,163 @@
+"""
+WriteQueue (backend/core/writer.py) against a throwaway database:
+savepoint isolation inside a batch, the one-job-at-a-time fallback,
+inline nested jobs and the queue limit.
+"""
+import sqlite3
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from backend.core.database import PooledConnection
+from backend.core.writer import WriteQueue
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "writer.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x INTEGER UNIQUE)")
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def queue(db_path):
+    q = WriteQueue(db_path, max_batch=64, linger=0)
+    yield q
+    q.stop()
+
+
+def _values(db_path) -> list:
+    conn = sqlite3.connect(db_path)
+    try:
+        return [r[0] for r in conn.execute("SELECT x FROM t ORDER BY x")]
+    finally:
+        conn.close()
+
+
+def _insert(cur, x):
+    cur.execute("INSERT INTO t (x) VALUES (?)", (x,))
+    return x
+
+
+def _insert_then_fail(cur, x):
+    cur.execute("INSERT INTO t (x) VALUES (?)", (x,))
+    raise ValueError("boom")
+
+
+def _insert_then_lose_transaction(cur, x):
+    cur.execute("INSERT INTO t (x) VALUES (?)", (x,))
+    cur.execute("ROLLBACK")
+    raise ValueError("lost")
+
+
+class _Gate:
+    """A job that holds the writer thread until opened, so the next jobs queue up as one batch."""
+
+    def __init__(self):
+        self.running = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, cur):
+        self.running.set()
+        assert self.release.wait(10)
+
+
+def _batched(queue, jobs: list) -> list:
+    gate = _Gate()
+    blocker = queue.submit(gate)
+    assert gate.running.wait(10)
+    futures = [queue.submit(fn, *args) for fn, *args in jobs]
+    gate.release.set()
+    blocker.result(10)
+    return futures
+
+
+def test_failing_job_rolls_back_only_its_savepoint(queue, db_path):
+    ok1, bad, ok2 = _batched(queue, [(_insert, 1), (_insert_then_fail, 2), (_insert, 3)])
+
+    assert ok1.result(10) == 1
+    assert ok2.result(10) == 3
+    with pytest.raises(ValueError, match="boom"):
+        bad.result(10)
+
+    assert _values(db_path) == [1, 3]
+    stats = queue.stats()
+    assert stats["largest_batch"] == 3
+    assert stats["retried_batches"] == 0
+    assert (stats["committed"], stats["failed"]) == (3, 1)      # gate + 2 inserts, 1 failure
+
+
+def test_lost_transaction_retries_jobs_alone(queue, db_path):
+    ok1, bad, ok2 = _batched(queue, [(_insert, 1), (_insert_then_lose_transaction, 2), (_insert, 3)])
+
+    assert ok1.result(10) == 1
+    assert ok2.result(10) == 3
+    with pytest.raises(ValueError, match="lost"):
+        bad.result(10)
+
+    assert _values(db_path) == [1, 3]
+    assert queue.stats()["retried_batches"] == 1
+
+
+def test_commit_failure_retries_jobs_alone(queue, db_path, monkeypatch):
+    real_commit = PooledConnection.commit
+    armed, failures = [], []
+
+    def commit_failing_once(self):
+        if armed and not failures:
+            failures.append(True)
+            raise sqlite3.OperationalError("disk I/O error")
+        real_commit(self)
+
+    def arm(cur):
+        # Makes the COMMIT of the batch this job is in fail
+        armed.append(True)
+
+    monkeypatch.setattr(PooledConnection, "commit", commit_failing_once)
+    a, armer, b = _batched(queue, [(_insert, 1), (arm,), (_insert, 2)])
+
+    assert (a.result(10), armer.result(10), b.result(10)) == (1, None, 2)
+    assert failures == [True]
+    assert _values(db_path) == [1, 2]
+    assert queue.stats()["retried_batches"] == 1
+
+
+def test_nested_run_executes_inline(queue, db_path):
+    def outer(cur):
+        assert queue.run(_insert, 1) == 1
+        with pytest.raises(ValueError):
+            queue.run(_insert_then_fail, 2)        # only the nested savepoint is undone
+        return threading.get_ident()
+
+    writer_ident = queue.run(outer)
+
+    assert writer_ident != threading.get_ident()
+    assert _values(db_path) == [1]
+    assert queue.stats()["batches"] == 1
+
+
+def test_full_queue_rejects_with_503(db_path):
+    q = WriteQueue(db_path, linger=0, max_queue=1)
+    gate = _Gate()
+    try:
+        blocker = q.submit(gate)
+        assert gate.running.wait(10)
+        queued = q.submit(_insert, 1)
+
+        with pytest.raises(HTTPException) as exc:
+            q.submit(_insert, 2)
+        assert exc.value.status_code == 503
+        assert exc.value.headers["Retry-After"] == "1"
+        assert q.stats()["rejected"] == 1
+
+        gate.release.set()
+        blocker.result(10)
+        assert queued.result(10) == 1
+    finally:
+        gate.release.set()
+        q.stop()
+
+    assert _values(db_path) == [1]